@@ -4,18 +4,43 @@
 # ============================================================================
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.express as px
 from scipy.stats import norm
+from scipy.special import ndtr
+from scipy.optimize import least_squares
 from datetime import datetime, timedelta
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.csv as pa_csv
+import pyarrow.compute as pc
 import requests
 import time
 import json
-from dataclasses import dataclass
-from typing import Optional, Dict, List, Tuple
+import os
+import bisect
+import socket
+import socketserver
+import errno
+import fcntl
+import struct
+import io
+import gzip
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import deque, defaultdict, OrderedDict
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, List, Tuple, Iterator, Iterable
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -319,8 +344,214 @@ SYMBOL_CONFIG = {
     "BANKNIFTY": {"contract_size": 15, "strike_interval": 100, "lot_size": 15},
     "FINNIFTY": {"contract_size": 40, "strike_interval": 50, "lot_size": 40},
     "MIDCPNIFTY": {"contract_size": 75, "strike_interval": 25, "lot_size": 75},
+    "SENSEX": {"contract_size": 20, "strike_interval": 100, "lot_size": 20},
 }
 
+# ============================================================================
+# INSTRUMENT MASTER
+# ============================================================================
+
+INSTRUMENT_MASTER_URL = os.environ.get("GEX_INSTRUMENT_URL", "https://images.dhan.co/api-data/api-scrip-master-detailed.csv")
+INSTRUMENT_DIR = os.environ.get("GEX_INSTRUMENT_DIR", "instruments")
+INSTRUMENT_CACHE_FILE = 'instruments.arrow'
+INSTRUMENT_CHECKED_FILE = 'CHECKED'
+# Scrip-master columns kept in the cache, by their cache names
+INSTRUMENT_COLUMNS = {
+    'EXCH_ID': 'exchange', 'SEGMENT': 'segment', 'SECURITY_ID': 'security_id', 'INSTRUMENT': 'instrument',
+    'UNDERLYING_SECURITY_ID': 'underlying_id', 'UNDERLYING_SYMBOL': 'underlying', 'DISPLAY_NAME': 'display_name',
+    'LOT_SIZE': 'lot_size', 'SM_EXPIRY_DATE': 'expiry', 'STRIKE_PRICE': 'strike', 'OPTION_TYPE': 'option_type',
+    'TICK_SIZE': 'tick_size',
+}
+DERIVATIVE_INSTRUMENTS = ['OPTIDX', 'OPTSTK', 'FUTIDX', 'FUTSTK']
+# Option-chain API segment for an underlying, by its options' instrument type
+UNDERLYING_SEGMENTS = {'OPTIDX': 'IDX_I', 'OPTSTK': '{exchange}_FNO'}
+
+def build_instrument_cache(csv_path: Path, out_path: Path, today: str = None, source: Dict = None) -> Path:
+    # Parses only the derivative rows of the scrip master into an uncompressed Arrow IPC
+    # file sorted by (underlying, expiry, strike, option type). The schema metadata holds
+    # the per-underlying index: row span, span per expiry, lot size and strike step.
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    table = pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(
+        include_columns=list(INSTRUMENT_COLUMNS), column_types={c: pa.string() for c in INSTRUMENT_COLUMNS}))
+    table = table.filter(pc.is_in(table['INSTRUMENT'], value_set=pa.array(DERIVATIVE_INSTRUMENTS)))
+    df = table.rename_columns([INSTRUMENT_COLUMNS[c] for c in table.column_names]).to_pandas()
+    df['expiry'] = df['expiry'].str[:10]
+    df = df[df['expiry'] >= today]
+    for col, dtype in (('security_id', np.int64), ('underlying_id', np.int64), ('lot_size', np.int32)):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).round().astype(dtype)
+    for col in ('strike', 'tick_size'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+    # An underlying listed on both exchanges keeps the exchange with more option contracts
+    options = df['instrument'].str.startswith('OPT')
+    counts = df[options].groupby(['underlying', 'exchange']).size().sort_values().reset_index()
+    primary = counts.drop_duplicates('underlying', keep='last').set_index('underlying')['exchange']
+    df = df[df['exchange'] == df['underlying'].map(primary)]
+    df = df.sort_values(['underlying', 'expiry', 'strike', 'option_type'], kind='stable').reset_index(drop=True)
+    
+    index = {'refreshed': today, 'source': source or {}, 'rows': len(df), 'underlyings': {}}
+    underlyings = df['underlying'].to_numpy()
+    bounds = np.flatnonzero(underlyings[1:] != underlyings[:-1]) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(df)]):
+        group = df.iloc[start:end]
+        opts = group[group['instrument'].str.startswith('OPT')]
+        if opts.empty:
+            continue
+        nearest = opts[opts['expiry'] == opts['expiry'].iloc[0]]
+        steps = np.diff(np.unique(nearest['strike'].to_numpy()))
+        steps, counts = np.unique(steps[steps > 0], return_counts=True)
+        expiries = group['expiry'].to_numpy()
+        cuts = np.flatnonzero(expiries[1:] != expiries[:-1]) + 1
+        first = opts.iloc[0]
+        index['underlyings'][str(first['underlying'])] = {
+            'security_id': int(first['underlying_id']), 'exchange': first['exchange'],
+            'segment': UNDERLYING_SEGMENTS.get(first['instrument'], 'IDX_I').format(exchange=first['exchange']),
+            'instrument': first['instrument'], 'lot_size': int(first['lot_size']),
+            'strike_interval': float(steps[np.argmax(counts)]) if len(steps) else 0.0,
+            'rows': [int(start), int(end)],
+            'expiries': {str(expiries[a]): [int(start + a), int(start + b)]
+                         for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(group)])},
+            'option_expiries': sorted(opts['expiry'].unique().tolist()),
+        }
+    out = pa.Table.from_pandas(df, preserve_index=False)
+    out = out.replace_schema_metadata({b'gex_instruments': json.dumps(index).encode()})
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, out.schema) as writer:
+        writer.write_table(out)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+class InstrumentMaster:
+    # Memory-mapped reader over the instrument cache. Underlying lookups are dict hits on the
+    # index in the schema metadata; a contract lookup is a binary search inside one expiry's
+    # row span. refresh() swaps in a rebuilt file; readers of the old mapping are unaffected.
+    def __init__(self, root: str = INSTRUMENT_DIR, url: str = INSTRUMENT_MASTER_URL):
+        self.root = Path(root)
+        self.path = self.root / INSTRUMENT_CACHE_FILE
+        self.url = url
+        self.table = None
+        self.index = {'rows': 0, 'source': {}, 'underlyings': {}}
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        table = pa.ipc.open_file(pa.memory_map(str(self.path), 'r')).read_all()
+        self.table, self.index = table, json.loads(table.schema.metadata[b'gex_instruments'])
+        return True
+
+    def __len__(self) -> int:
+        return self.index['rows']
+
+    @property
+    def checked(self) -> Optional[str]:
+        try:
+            return (self.root / INSTRUMENT_CHECKED_FILE).read_text().strip()
+        except OSError:
+            return None
+
+    def underlyings(self) -> List[str]:
+        return list(self.index['underlyings'])
+
+    def underlying(self, symbol: str) -> Optional[Dict]:
+        return self.index['underlyings'].get(symbol)
+
+    def expiries(self, symbol: str) -> List[str]:
+        info = self.underlying(symbol)
+        today = datetime.now().strftime('%Y-%m-%d')
+        return [e for e in info['option_expiries'] if e >= today] if info else []
+
+    def contracts(self, symbol: str, expiry: str = None) -> Optional[pa.Table]:
+        info = self.underlying(symbol)
+        span = (info['expiries'].get(expiry) if expiry else info['rows']) if info else None
+        return self.table.slice(span[0], span[1] - span[0]) if span else None
+
+    def contract(self, symbol: str, expiry: str, strike: float, option_type: str) -> Optional[Dict]:
+        rows = self.contracts(symbol, expiry)
+        if rows is None:
+            return None
+        strikes = rows['strike'].to_numpy()
+        lo, hi = np.searchsorted(strikes, strike, side='left'), np.searchsorted(strikes, strike, side='right')
+        for row in rows.slice(lo, hi - lo).to_pylist():
+            if row['option_type'] == option_type:
+                return row
+        return None
+
+    def refresh(self, timeout: float = 60) -> bool:
+        # Conditional download keyed on the previous ETag / Last-Modified; an unchanged
+        # master (304 or same digest) only records today's check. Returns True on rebuild.
+        today = datetime.now().strftime('%Y-%m-%d')
+        source = self.index['source']
+        headers = {}
+        if self.table is not None and source.get('etag'):
+            headers['If-None-Match'] = source['etag']
+        if self.table is not None and source.get('last_modified'):
+            headers['If-Modified-Since'] = source['last_modified']
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_csv = self.root / f".scrip-master.{os.getpid()}.csv"
+        rebuilt = False
+        try:
+            with requests.get(self.url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    digest = hashlib.sha256()
+                    with open(tmp_csv, 'wb') as f:
+                        for chunk in response.iter_content(1 << 20):
+                            digest.update(chunk)
+                            f.write(chunk)
+                    fresh = {'etag': response.headers.get('ETag'), 'sha256': digest.hexdigest(),
+                             'last_modified': response.headers.get('Last-Modified')}
+                    if fresh['sha256'] != source.get('sha256') or self.table is None:
+                        with get_perf_recorder().span('instruments.build'):
+                            build_instrument_cache(tmp_csv, self.path, today, fresh)
+                        rebuilt = self.load()
+            (self.root / INSTRUMENT_CHECKED_FILE).write_text(today)
+        finally:
+            tmp_csv.unlink(missing_ok=True)
+        return rebuilt
+
+    def refresh_if_stale(self) -> None:
+        # At most one background refresh per day; lookups keep using the current mapping.
+        if not self.url or self.checked == datetime.now().strftime('%Y-%m-%d'):
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_job, daemon=True, name='instrument-refresh').start()
+
+    def _refresh_job(self) -> None:
+        try:
+            self.refresh()
+        except (requests.RequestException, OSError, pa.ArrowInvalid, KeyError, ValueError) as e:
+            get_perf_recorder().record_error('instruments.refresh', e)
+        finally:
+            self._refreshing = False
+
+@st.cache_resource
+def get_instrument_master() -> InstrumentMaster:
+    return InstrumentMaster()
+
+def symbol_config(symbol: str) -> Dict:
+    # Exchange lot size and strike step when the instrument master lists the underlying,
+    # else the hand-maintained table (NIFTY's for unknown symbols).
+    info = get_instrument_master().underlying(symbol)
+    if info and info['lot_size'] > 0 and info['strike_interval'] > 0:
+        return {'contract_size': info['lot_size'], 'strike_interval': info['strike_interval'], 'lot_size': info['lot_size']}
+    return SYMBOL_CONFIG.get(symbol, SYMBOL_CONFIG["NIFTY"])
+
+def underlying_scrip(symbol: str) -> Tuple[int, str]:
+    info = get_instrument_master().underlying(symbol)
+    if info and info['security_id'] > 0:
+        return info['security_id'], info['segment']
+    return DHAN_SECURITY_IDS.get(symbol, 13), EXCHANGE_SEGMENTS.get(symbol, "IDX_I")
+
+def available_symbols() -> List[str]:
+    listed = get_instrument_master().underlyings()
+    return list(DHAN_SECURITY_IDS) + sorted(s for s in listed if s not in DHAN_SECURITY_IDS)
+
 # ============================================================================
 # BLACK-SCHOLES CALCULATOR
 # ============================================================================
@@ -418,63 +649,510 @@ class BlackScholesCalculator:
             return 0
 
 # ============================================================================
-# DHAN API DATA FETCHER
+# VECTORIZED CHAIN KERNEL
 # ============================================================================
 
-class DhanAPIFetcher:
-    def __init__(self, config: DhanConfig):
-        self.config = config
-        self.headers = {
+CHAIN_LEG_FIELDS = {'oi': 'oi', 'previous_oi': 'previous_oi', 'volume': 'volume',
+                    'iv': 'implied_volatility', 'ltp': 'last_price'}
+
+def parse_option_chain(option_chain: Dict, futures_price: float, strike_interval: float,
+                       strikes_range: int) -> Optional[Dict]:
+    strikes, legs = [], {'ce': [], 'pe': []}
+    for strike_str, strike_data in option_chain.items():
+        try:
+            strike = float(strike_str)
+        except (TypeError, ValueError):
+            continue
+        if strike == 0 or abs(strike - futures_price) / strike_interval > strikes_range:
+            continue
+        strikes.append(strike)
+        for side in ('ce', 'pe'):
+            leg = strike_data.get(side, {}) or {}
+            legs[side].append([leg.get(field, 0) or 0 for field in CHAIN_LEG_FIELDS.values()])
+    if not strikes:
+        return None
+    raw = {'strikes': np.array(strikes, dtype=np.float64)}
+    for side, rows in legs.items():
+        values = np.array(rows, dtype=np.float64)
+        raw[side] = {name: values[:, i] for i, name in enumerate(CHAIN_LEG_FIELDS)}
+    return raw
+
+def iv_to_decimal(iv: np.ndarray) -> np.ndarray:
+    return np.where(iv > 1, iv / 100, np.where(iv > 0, iv, 0.15))
+
+def chain_greeks(F: float, K: np.ndarray, T: float, r: float, call_iv: np.ndarray, put_iv: np.ndarray,
+                 higher_order: bool = True) -> Dict:
+    # Same formulas as BlackScholesCalculator, evaluated over all strikes at once
+    # (zero where the scalar versions would bail out on T/sigma/S/K <= 0).
+    # Speed, zomma, color and vomma reuse the same d1/d2/pdf arrays: a few extra
+    # array ops per side rather than another pricing pass. F and T may also be
+    # (B, 1) columns against (B, N) strikes to price several chains in one pass.
+    greeks = {}
+    S = np.where(F > 0, F, 1.0)
+    T_safe = np.where(T > 0, T, 1.0)
+    sqrt_T = np.sqrt(T_safe)
+    for side, iv in (('call', call_iv), ('put', put_iv)):
+        sigma = iv_to_decimal(np.asarray(iv, dtype=np.float64))
+        valid = (T > 0) & (sigma > 0) & (F > 0) & (K > 0)
+        sigma_safe = np.where(valid, sigma, 1.0)
+        K_safe = np.where(valid, K, S)
+        sig_sqrt_T = sigma_safe * sqrt_T
+        d1 = (np.log(S / K_safe) + (r + 0.5 * sigma_safe ** 2) * T) / sig_sqrt_T
+        d2 = d1 - sig_sqrt_T
+        pdf = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+        cdf = ndtr(d1)
+        greeks[f'{side}_gamma'] = np.where(valid, pdf / (S * sig_sqrt_T), 0.0)
+        greeks[f'{side}_delta'] = np.where(valid, cdf if side == 'call' else cdf - 1, 0.0)
+        greeks[f'{side}_vanna'] = np.where(valid, -pdf * d2 / sigma_safe, 0.0)
+        greeks[f'{side}_charm'] = np.where(valid, -pdf * (2 * r * T - d2 * sig_sqrt_T) / (2 * T_safe * sig_sqrt_T) / 365, 0.0)
+        if higher_order:
+            gamma = greeks[f'{side}_gamma']
+            d1_d2 = d1 * d2
+            # dGamma/dS, dGamma/dsigma, dGamma per day passing (as charm) and dVega/dsigma (vega per 1.00 vol)
+            greeks[f'{side}_speed'] = -gamma / S * (d1 / sig_sqrt_T + 1)
+            greeks[f'{side}_zomma'] = gamma * (d1_d2 - 1) / sigma_safe
+            greeks[f'{side}_color'] = np.where(valid, pdf / (2 * S * T_safe * sig_sqrt_T) * (1 + d1 * (2 * r * T - d2 * sig_sqrt_T) / sig_sqrt_T) / 365, 0.0)
+            greeks[f'{side}_vomma'] = np.where(valid, S * pdf * sqrt_T * d1_d2 / sigma_safe, 0.0)
+    return greeks
+
+def chain_columns(raw: Dict, greeks: Dict, futures_price: float, contract_size: float) -> Dict[str, np.ndarray]:
+    ce, pe = raw['ce'], raw['pe']
+    F, cs = futures_price, contract_size
+    call_oi_change = ce['oi'] - ce['previous_oi']
+    put_oi_change = pe['oi'] - pe['previous_oi']
+    call_gex = ce['oi'] * greeks['call_gamma'] * F**2 * cs / 1e9
+    put_gex = -(pe['oi'] * greeks['put_gamma'] * F**2 * cs) / 1e9
+    call_dex = ce['oi'] * greeks['call_delta'] * F * cs / 1e9
+    put_dex = pe['oi'] * greeks['put_delta'] * F * cs / 1e9
+    call_vanna_exp = ce['oi'] * greeks['call_vanna'] * F * cs / 1e9
+    put_vanna_exp = pe['oi'] * greeks['put_vanna'] * F * cs / 1e9
+    call_charm_exp = ce['oi'] * greeks['call_charm'] * F * cs / 1e9
+    put_charm_exp = pe['oi'] * greeks['put_charm'] * F * cs / 1e9
+    call_flow_gex = call_oi_change * greeks['call_gamma'] * F**2 * cs / 1e9
+    put_flow_gex = -(put_oi_change * greeks['put_gamma'] * F**2 * cs) / 1e9
+    call_flow_dex = call_oi_change * greeks['call_delta'] * F * cs / 1e9
+    put_flow_dex = put_oi_change * greeks['put_delta'] * F * cs / 1e9
+    # Signed like GEX (dealers long calls, short puts): how GEX moves per 1% move (speed),
+    # per vol point (zomma) and per day (color); vomma is vega per vol point gained per vol point.
+    call_speed_exp = ce['oi'] * greeks['call_speed'] * F**3 * cs / 1e11
+    put_speed_exp = -(pe['oi'] * greeks['put_speed'] * F**3 * cs) / 1e11
+    call_zomma_exp = ce['oi'] * greeks['call_zomma'] * F**2 * cs / 1e11
+    put_zomma_exp = -(pe['oi'] * greeks['put_zomma'] * F**2 * cs) / 1e11
+    call_color_exp = ce['oi'] * greeks['call_color'] * F**2 * cs / 1e9
+    put_color_exp = -(pe['oi'] * greeks['put_color'] * F**2 * cs) / 1e9
+    call_vomma_exp = ce['oi'] * greeks['call_vomma'] * cs / 1e13
+    put_vomma_exp = -(pe['oi'] * greeks['put_vomma'] * cs) / 1e13
+    
+    return {
+        'Strike': raw['strikes'], 'Call_OI': ce['oi'], 'Put_OI': pe['oi'],
+        'Call_OI_Change': call_oi_change, 'Put_OI_Change': put_oi_change,
+        'Call_Volume': ce['volume'], 'Put_Volume': pe['volume'],
+        'Total_Volume': ce['volume'] + pe['volume'],
+        'Call_IV': ce['iv'], 'Put_IV': pe['iv'],
+        'Call_LTP': ce['ltp'], 'Put_LTP': pe['ltp'],
+        'Call_Delta': greeks['call_delta'], 'Put_Delta': greeks['put_delta'],
+        'Call_Gamma': greeks['call_gamma'], 'Put_Gamma': greeks['put_gamma'],
+        'Call_Vanna': greeks['call_vanna'], 'Put_Vanna': greeks['put_vanna'],
+        'Call_Charm': greeks['call_charm'], 'Put_Charm': greeks['put_charm'],
+        'Call_GEX': call_gex, 'Put_GEX': put_gex, 'Net_GEX': call_gex + put_gex,
+        'Call_DEX': call_dex, 'Put_DEX': put_dex, 'Net_DEX': call_dex + put_dex,
+        'Call_Vanna_Exp': call_vanna_exp, 'Put_Vanna_Exp': put_vanna_exp,
+        'Net_Vanna': call_vanna_exp + put_vanna_exp,
+        'Call_Charm_Exp': call_charm_exp, 'Put_Charm_Exp': put_charm_exp,
+        'Net_Charm': call_charm_exp + put_charm_exp,
+        'Call_Flow_GEX': call_flow_gex, 'Put_Flow_GEX': put_flow_gex,
+        'Net_Flow_GEX': call_flow_gex + put_flow_gex,
+        'Call_Flow_DEX': call_flow_dex, 'Put_Flow_DEX': put_flow_dex,
+        'Net_Flow_DEX': call_flow_dex + put_flow_dex,
+        'Call_Speed': greeks['call_speed'], 'Put_Speed': greeks['put_speed'],
+        'Call_Zomma': greeks['call_zomma'], 'Put_Zomma': greeks['put_zomma'],
+        'Call_Color': greeks['call_color'], 'Put_Color': greeks['put_color'],
+        'Call_Vomma': greeks['call_vomma'], 'Put_Vomma': greeks['put_vomma'],
+        'Call_Speed_Exp': call_speed_exp, 'Put_Speed_Exp': put_speed_exp,
+        'Net_Speed': call_speed_exp + put_speed_exp,
+        'Call_Zomma_Exp': call_zomma_exp, 'Put_Zomma_Exp': put_zomma_exp,
+        'Net_Zomma': call_zomma_exp + put_zomma_exp,
+        'Call_Color_Exp': call_color_exp, 'Put_Color_Exp': put_color_exp,
+        'Net_Color': call_color_exp + put_color_exp,
+        'Call_Vomma_Exp': call_vomma_exp, 'Put_Vomma_Exp': put_vomma_exp,
+        'Net_Vomma': call_vomma_exp + put_vomma_exp,
+    }
+
+def build_chain_frame(raw: Dict, greeks: Dict, futures_price: float, contract_size: float) -> pd.DataFrame:
+    df = pd.DataFrame(chain_columns(raw, greeks, futures_price, contract_size)).sort_values('Strike').reset_index(drop=True)
+    int_columns = CHAIN_INT_COLUMNS + ['Total_Volume']
+    df[int_columns] = df[int_columns].round().astype(np.int64)
+    max_gex = df['Net_GEX'].abs().max()
+    df['Hedging_Pressure'] = (df['Net_GEX'] / max_gex * 100) if max_gex > 0 else 0
+    return df
+
+# ============================================================================
+# PERFORMANCE INSTRUMENTATION
+# ============================================================================
+
+class PerfRecorder:
+    # Spans keep a bounded window of recent durations per stage for rolling
+    # percentiles plus lifetime count/sum; counters carry optional labels.
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples = {}
+        self._count = defaultdict(int)
+        self._sum = defaultdict(float)
+        self._counters = defaultdict(int)
+        self.last_errors = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._count[stage] += 1
+            self._sum[stage] += seconds
+
+    def incr(self, name: str, value: int = 1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def counter(self, name: str, **labels) -> int:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def record_error(self, stage: str, error: Exception):
+        self.incr('errors', stage=stage, kind=type(error).__name__)
+        self.last_errors.append((datetime.now().strftime('%H:%M:%S'), stage, f"{type(error).__name__}: {error}"))
+
+    def summary(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [(stage, self._count[stage], samples[-1], *np.percentile(samples, [50, 95]), self._sum[stage])
+                    for stage, samples in self._samples.items()]
+        frame = pd.DataFrame(rows, columns=['Stage', 'Count', 'Last', 'p50', 'p95', 'Total'])
+        frame[['Last', 'p50', 'p95']] *= 1000
+        return frame.rename(columns={'Last': 'Last (ms)', 'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'Total': 'Total (s)'})
+
+    def counters(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [(name, ", ".join(f"{k}={v}" for k, v in labels), value)
+                    for (name, labels), value in sorted(self._counters.items())]
+        return pd.DataFrame(rows, columns=['Counter', 'Labels', 'Value'])
+
+    def to_prometheus(self, prefix: str = "gex") -> str:
+        lines = [f"# HELP {prefix}_stage_seconds Duration of dashboard refresh stages.",
+                 f"# TYPE {prefix}_stage_seconds summary"]
+        with self._lock:
+            for stage, samples in sorted(self._samples.items()):
+                p50, p95 = np.percentile(samples, [50, 95])
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.5"}} {p50:.6f}')
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.95"}} {p95:.6f}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {self._sum[stage]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {self._count[stage]}')
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                        lines.append(f"{prefix}_{name}_total{{{label_text}}} {value}" if label_text
+                                     else f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+@st.cache_resource
+def get_perf_recorder() -> PerfRecorder:
+    return PerfRecorder()
+
+# ============================================================================
+# DATA SOURCES
+# ============================================================================
+
+DHAN_BASE_URL = "https://api.dhan.co/v2"
+RECORDINGS_DIR = os.environ.get("GEX_RECORDINGS_DIR", "recordings")
+
+# Requests per second Dhan allows: the chart (historical) APIs are metered per
+# account, option chains once every 3 seconds per underlying.
+DHAN_RATE_LIMITS = {'charts': 5.0, 'optionchain': 1 / 3}
+# Keep-alive connections per host; enough for the backfill workers plus live sessions
+DHAN_POOL_SIZE = 16
+
+class RateLimiter:
+    # Evenly spaced request slots shared by every thread drawing on one budget. acquire()
+    # reserves the next slot under the lock and sleeps outside it, so callers are served
+    # in order; releases are also kept at least 1/rate apart, so a caller that wakes late
+    # cannot crowd the next one and no one-second window ever exceeds `rate`.
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._released = -self.interval
+        self.acquired = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        started = time.monotonic()
+        with self._lock:
+            slot = max(started, self._next)
+            self._next = slot + self.interval
+        if slot > started:
+            time.sleep(slot - started)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                gap = self._released + self.interval - now
+                if gap <= 0:
+                    self._released = now
+                    self._next = max(self._next, now + self.interval)
+                    self.acquired += 1
+                    self.waited += now - started
+                    return now - started
+            time.sleep(gap)
+
+    def backoff(self, seconds: float) -> None:
+        # After a 429, push every later slot back by `seconds`.
+        with self._lock:
+            self._next = max(self._next, time.monotonic()) + seconds
+
+class RateLimiters:
+    def __init__(self, limits: Dict[str, float] = None):
+        self.limits = limits or DHAN_RATE_LIMITS
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def for_request(self, endpoint: str, payload: Dict) -> Optional[RateLimiter]:
+        if endpoint == 'optionchain':
+            key = ('optionchain', payload.get('UnderlyingScrip'), payload.get('UnderlyingSeg'))
+        elif endpoint.startswith('charts/'):
+            key = ('charts',)
+        else:
+            return None
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = RateLimiter(self.limits[key[0]])
+            return self._limiters[key]
+
+class DhanDataSource(ABC):
+    # Raw transport for Dhan endpoints: returns (status_code, decoded JSON body).
+    # now() is the source's clock so replayed sessions compute days-to-expiry
+    # and snapshot timestamps as of the recording, not the wall clock.
+    name = "base"
+
+    @abstractmethod
+    def post(self, endpoint: str, payload: Dict) -> Tuple[int, Dict]:
+        ...
+
+    def warm(self):
+        pass
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+class LiveDataSource(DhanDataSource):
+    name = "live"
+
+    def __init__(self, config: DhanConfig, base_url: str = DHAN_BASE_URL, timeout: float = 15,
+                 limiters: RateLimiters = None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.limiters = limiters or RateLimiters()
+        self.session = requests.Session()
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=DHAN_POOL_SIZE))
+        self.session.headers.update({
             'access-token': config.access_token,
             'client-id': config.client_id,
             'Content-Type': 'application/json',
             'Accept': 'application/json'
-        }
-        self.base_url = "https://api.dhan.co/v2"
+        })
+
+    def warm(self):
+        # DNS, TCP and TLS are paid here rather than by the first viewer's request;
+        # the connection stays in the session's pool for the calls that follow.
+        self.session.head(self.base_url, timeout=self.timeout)
+
+    def post(self, endpoint: str, payload: Dict) -> Tuple[int, Dict]:
+        limiter = self.limiters.for_request(endpoint, payload)
+        if limiter is not None:
+            get_perf_recorder().observe('api.rate_wait', limiter.acquire())
+        response = self.session.post(f"{self.base_url}/{endpoint}", json=payload, timeout=self.timeout)
+        if response.status_code == 429 and limiter is not None:
+            limiter.backoff(1.0)
+        return response.status_code, response.json()
+
+def _payload_key(endpoint: str, payload: Dict) -> str:
+    return f"{endpoint}|{json.dumps(payload, sort_keys=True)}"
+
+class RecordingDataSource(DhanDataSource):
+    # Tees every response to <root>/<day>/responses.jsonl; index.jsonl holds one
+    # small line per response (time, key, status, byte offset) and is written
+    # after the body so it never points at a partial record.
+    name = "record"
+
+    def __init__(self, inner: DhanDataSource, root: str = RECORDINGS_DIR):
+        self.inner = inner
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def post(self, endpoint: str, payload: Dict) -> Tuple[int, Dict]:
+        status, body = self.inner.post(endpoint, payload)
+        ts = self.inner.now()
+        day_dir = self.root / ts.strftime('%Y-%m-%d')
+        line = (json.dumps(body, separators=(',', ':')) + "\n").encode()
+        with self._lock:
+            day_dir.mkdir(parents=True, exist_ok=True)
+            with open(day_dir / 'responses.jsonl', 'ab') as f:
+                offset = f.tell()
+                f.write(line)
+            with open(day_dir / 'index.jsonl', 'a') as f:
+                f.write(json.dumps({'ts': ts.isoformat(), 'key': _payload_key(endpoint, payload),
+                                    'status': status, 'offset': offset, 'length': len(line)}) + "\n")
+        return status, body
+
+    def warm(self):
+        self.inner.warm()
+
+    def now(self) -> datetime:
+        return self.inner.now()
+
+class ReplayDataSource(DhanDataSource):
+    # speed > 0 replays on a virtual clock running `speed` times faster than wall
+    # time from the first recorded response; speed == 0 steps deterministically,
+    # each request for a key advancing to that key's next recorded response.
+    name = "replay"
+
+    def __init__(self, root: str = RECORDINGS_DIR, speed: float = 1.0, days: List[str] = None):
+        self.root = Path(root)
+        self.speed = speed
+        self._records = defaultdict(list)
+        self._cursor = defaultdict(int)
+        self._lock = threading.Lock()
+        day_dirs = sorted(p for p in self.root.iterdir() if p.is_dir()) if self.root.exists() else []
+        for day_dir in day_dirs:
+            if days and day_dir.name not in days:
+                continue
+            index_path = day_dir / 'index.jsonl'
+            if not index_path.exists():
+                continue
+            with open(index_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._records[entry['key']].append((datetime.fromisoformat(entry['ts']), entry['status'],
+                                                        day_dir / 'responses.jsonl', entry['offset'], entry['length']))
+        for records in self._records.values():
+            records.sort(key=lambda r: r[0])
+        self._times = {key: [r[0] for r in records] for key, records in self._records.items()}
+        all_times = [r[0] for records in self._records.values() for r in records]
+        self.start_time = min(all_times) if all_times else datetime.now()
+        self.end_time = max(all_times) if all_times else self.start_time
+        self._virtual_now = self.start_time
+        self._wall_start = time.monotonic()
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._records.values())
+
+    def now(self) -> datetime:
+        if self.speed > 0:
+            return self.start_time + timedelta(seconds=(time.monotonic() - self._wall_start) * self.speed)
+        return self._virtual_now
+
+    def _read(self, path: Path, offset: int, length: int) -> Dict:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def post(self, endpoint: str, payload: Dict) -> Tuple[int, Dict]:
+        key = _payload_key(endpoint, payload)
+        records = self._records.get(key)
+        if not records:
+            return 404, {'status': 'failure', 'remarks': 'not recorded'}
+        with self._lock:
+            if self.speed > 0:
+                pos = max(0, bisect.bisect_right(self._times[key], self.now()) - 1)
+            else:
+                pos = min(self._cursor[key], len(records) - 1)
+                self._cursor[key] += 1
+                self._virtual_now = max(self._virtual_now, records[pos][0])
+        ts, status, path, offset, length = records[pos]
+        return status, self._read(path, offset, length)
+
+def create_data_source(config: DhanConfig, mode: str = None) -> DhanDataSource:
+    mode = (mode or os.environ.get("GEX_DATA_SOURCE", "live")).lower()
+    if mode == "replay":
+        return ReplayDataSource(RECORDINGS_DIR, float(os.environ.get("GEX_REPLAY_SPEED", "1.0")))
+    live = LiveDataSource(config)
+    if mode == "record":
+        return RecordingDataSource(live, RECORDINGS_DIR)
+    return live
+
+@st.cache_resource
+def get_data_source() -> DhanDataSource:
+    return create_data_source(DhanConfig())
+
+# ============================================================================
+# DHAN API DATA FETCHER
+# ============================================================================
+
+class DhanAPIFetcher:
+    def __init__(self, config: DhanConfig, source: DhanDataSource = None):
+        self.config = config
+        self.source = source or get_data_source()
         self.bs_calc = BlackScholesCalculator()
         self.risk_free_rate = 0.07
     
     def get_expiry_list(self, symbol: str) -> List[str]:
+        perf = get_perf_recorder()
+        perf.incr('api_calls', endpoint='expirylist')
         try:
-            security_id = DHAN_SECURITY_IDS.get(symbol, 13)
-            segment = EXCHANGE_SEGMENTS.get(symbol, "IDX_I")
+            security_id, segment = underlying_scrip(symbol)
             payload = {"UnderlyingScrip": security_id, "UnderlyingSeg": segment}
-            response = requests.post(
-                f"{self.base_url}/optionchain/expirylist",
-                headers=self.headers, json=payload, timeout=15
-            )
-            if response.status_code == 200:
-                data = response.json()
+            with perf.span('api.expirylist'):
+                status, data = self.source.post("optionchain/expirylist", payload)
+            if status == 200:
                 if data.get('status') == 'success':
                     return data.get('data', [])
+            perf.incr('api_bad_responses', endpoint='expirylist', status=status)
             return []
-        except Exception as e:
+        except (requests.RequestException, ValueError) as e:
+            perf.record_error('api.expirylist', e)
             return []
     
     def fetch_option_chain(self, symbol: str, expiry_date: str = None) -> Optional[Dict]:
+        perf = get_perf_recorder()
+        perf.incr('api_calls', endpoint='optionchain')
         try:
-            security_id = DHAN_SECURITY_IDS.get(symbol, 13)
-            segment = EXCHANGE_SEGMENTS.get(symbol, "IDX_I")
+            security_id, segment = underlying_scrip(symbol)
             payload = {"UnderlyingScrip": security_id, "UnderlyingSeg": segment}
             if expiry_date:
                 payload["Expiry"] = expiry_date
-            response = requests.post(
-                f"{self.base_url}/optionchain",
-                headers=self.headers, json=payload, timeout=15
-            )
-            if response.status_code == 200:
-                data = response.json()
+            with perf.span('api.optionchain'):
+                status, data = self.source.post("optionchain", payload)
+            if status == 200:
                 if 'data' in data:
                     return data['data']
+            perf.incr('api_bad_responses', endpoint='optionchain', status=status)
             return None
-        except:
+        except (requests.RequestException, ValueError) as e:
+            perf.record_error('api.optionchain', e)
             return None
     
     def calculate_futures_price(self, spot_price: float, days_to_expiry: int) -> float:
         T = days_to_expiry / 365.0
         return spot_price * np.exp(self.risk_free_rate * T)
     
-    def process_option_chain(self, symbol: str, expiry_index: int = 0, strikes_range: int = 12):
+    def fetch_raw_chain(self, symbol: str, expiry_index: int = 0, strikes_range: int = 12):
+        # Fetch and parse only; the Greeks are left to the caller so several
+        # chains can be priced together (see batch_overview).
         expiry_list = self.get_expiry_list(symbol)
         if not expiry_list:
             return None, None
@@ -483,11 +1161,10 @@ class DhanAPIFetcher:
         
         try:
             expiry_date = datetime.strptime(selected_expiry, "%Y-%m-%d")
-            days_to_expiry = max((expiry_date - datetime.now()).days, 1)
-            time_to_expiry = days_to_expiry / 365
-        except:
+            days_to_expiry = max((expiry_date - self.source.now()).days, 1)
+        except (TypeError, ValueError) as e:
+            get_perf_recorder().record_error('compute.expiry', e)
             days_to_expiry = 7
-            time_to_expiry = 7 / 365
         
         oc_data = self.fetch_option_chain(symbol, selected_expiry)
         if not oc_data:
@@ -497,222 +1174,2856 @@ class DhanAPIFetcher:
         option_chain = oc_data.get('oc', {})
         futures_price = self.calculate_futures_price(spot_price, days_to_expiry)
         
-        config = SYMBOL_CONFIG.get(symbol, SYMBOL_CONFIG["NIFTY"])
-        contract_size = config["contract_size"]
-        strike_interval = config["strike_interval"]
-        
-        all_strikes = []
-        atm_strike = None
-        min_atm_diff = float('inf')
-        atm_call_premium = 0
-        atm_put_premium = 0
-        
-        for strike_str, strike_data in option_chain.items():
-            try:
-                strike = float(strike_str)
-            except:
-                continue
-            
-            if strike == 0 or abs(strike - futures_price) / strike_interval > strikes_range:
-                continue
-            
-            ce = strike_data.get('ce', {})
-            pe = strike_data.get('pe', {})
-            
-            call_oi = ce.get('oi', 0) or 0
-            put_oi = pe.get('oi', 0) or 0
-            call_oi_change = (ce.get('oi', 0) or 0) - (ce.get('previous_oi', 0) or 0)
-            put_oi_change = (pe.get('oi', 0) or 0) - (pe.get('previous_oi', 0) or 0)
-            call_volume = ce.get('volume', 0) or 0
-            put_volume = pe.get('volume', 0) or 0
-            call_iv = ce.get('implied_volatility', 0) or 0
-            put_iv = pe.get('implied_volatility', 0) or 0
-            call_ltp = ce.get('last_price', 0) or 0
-            put_ltp = pe.get('last_price', 0) or 0
-            
-            strike_diff = abs(strike - futures_price)
-            if strike_diff < min_atm_diff:
-                min_atm_diff = strike_diff
-                atm_strike = strike
-                atm_call_premium = call_ltp
-                atm_put_premium = put_ltp
-            
-            call_iv_dec = call_iv / 100 if call_iv > 1 else (call_iv if call_iv > 0 else 0.15)
-            put_iv_dec = put_iv / 100 if put_iv > 1 else (put_iv if put_iv > 0 else 0.15)
-            
-            call_gamma = self.bs_calc.calculate_gamma(futures_price, strike, time_to_expiry, self.risk_free_rate, call_iv_dec)
-            put_gamma = self.bs_calc.calculate_gamma(futures_price, strike, time_to_expiry, self.risk_free_rate, put_iv_dec)
-            call_delta = self.bs_calc.calculate_call_delta(futures_price, strike, time_to_expiry, self.risk_free_rate, call_iv_dec)
-            put_delta = self.bs_calc.calculate_put_delta(futures_price, strike, time_to_expiry, self.risk_free_rate, put_iv_dec)
-            call_vanna = self.bs_calc.calculate_vanna(futures_price, strike, time_to_expiry, self.risk_free_rate, call_iv_dec)
-            put_vanna = self.bs_calc.calculate_vanna(futures_price, strike, time_to_expiry, self.risk_free_rate, put_iv_dec)
-            call_charm = self.bs_calc.calculate_charm(futures_price, strike, time_to_expiry, self.risk_free_rate, call_iv_dec)
-            put_charm = self.bs_calc.calculate_charm(futures_price, strike, time_to_expiry, self.risk_free_rate, put_iv_dec)
-            
-            call_gex = (call_oi * call_gamma * futures_price**2 * contract_size) / 1e9
-            put_gex = -(put_oi * put_gamma * futures_price**2 * contract_size) / 1e9
-            call_dex = (call_oi * call_delta * futures_price * contract_size) / 1e9
-            put_dex = (put_oi * put_delta * futures_price * contract_size) / 1e9
-            call_vanna_exp = (call_oi * call_vanna * futures_price * contract_size) / 1e9
-            put_vanna_exp = (put_oi * put_vanna * futures_price * contract_size) / 1e9
-            call_charm_exp = (call_oi * call_charm * futures_price * contract_size) / 1e9
-            put_charm_exp = (put_oi * put_charm * futures_price * contract_size) / 1e9
-            call_flow_gex = (call_oi_change * call_gamma * futures_price**2 * contract_size) / 1e9
-            put_flow_gex = -(put_oi_change * put_gamma * futures_price**2 * contract_size) / 1e9
-            call_flow_dex = (call_oi_change * call_delta * futures_price * contract_size) / 1e9
-            put_flow_dex = (put_oi_change * put_delta * futures_price * contract_size) / 1e9
-            
-            all_strikes.append({
-                'Strike': strike, 'Call_OI': call_oi, 'Put_OI': put_oi,
-                'Call_OI_Change': call_oi_change, 'Put_OI_Change': put_oi_change,
-                'Call_Volume': call_volume, 'Put_Volume': put_volume,
-                'Total_Volume': call_volume + put_volume,
-                'Call_IV': call_iv, 'Put_IV': put_iv,
-                'Call_LTP': call_ltp, 'Put_LTP': put_ltp,
-                'Call_Delta': call_delta, 'Put_Delta': put_delta,
-                'Call_Gamma': call_gamma, 'Put_Gamma': put_gamma,
-                'Call_Vanna': call_vanna, 'Put_Vanna': put_vanna,
-                'Call_Charm': call_charm, 'Put_Charm': put_charm,
-                'Call_GEX': call_gex, 'Put_GEX': put_gex, 'Net_GEX': call_gex + put_gex,
-                'Call_DEX': call_dex, 'Put_DEX': put_dex, 'Net_DEX': call_dex + put_dex,
-                'Call_Vanna_Exp': call_vanna_exp, 'Put_Vanna_Exp': put_vanna_exp,
-                'Net_Vanna': call_vanna_exp + put_vanna_exp,
-                'Call_Charm_Exp': call_charm_exp, 'Put_Charm_Exp': put_charm_exp,
-                'Net_Charm': call_charm_exp + put_charm_exp,
-                'Call_Flow_GEX': call_flow_gex, 'Put_Flow_GEX': put_flow_gex,
-                'Net_Flow_GEX': call_flow_gex + put_flow_gex,
-                'Call_Flow_DEX': call_flow_dex, 'Put_Flow_DEX': put_flow_dex,
-                'Net_Flow_DEX': call_flow_dex + put_flow_dex,
-            })
-        
-        if not all_strikes:
+        with get_perf_recorder().span('compute.parse'):
+            raw = parse_option_chain(option_chain, futures_price, symbol_config(symbol)["strike_interval"], strikes_range)
+        if raw is None:
             return None, None
         
-        df = pd.DataFrame(all_strikes).sort_values('Strike').reset_index(drop=True)
-        max_gex = df['Net_GEX'].abs().max()
-        df['Hedging_Pressure'] = (df['Net_GEX'] / max_gex * 100) if max_gex > 0 else 0
-        
         meta = {
             'symbol': symbol, 'spot_price': spot_price, 'futures_price': futures_price,
             'expiry': selected_expiry, 'days_to_expiry': days_to_expiry,
-            'atm_strike': atm_strike, 'atm_call_premium': atm_call_premium,
-            'atm_put_premium': atm_put_premium, 'atm_straddle': atm_call_premium + atm_put_premium,
-            'expiry_list': expiry_list, 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'expiry_list': expiry_list, 'timestamp': self.source.now().strftime(SNAPSHOT_TS_FORMAT)
         }
+        return raw, meta
+    
+    def process_option_chain(self, symbol: str, expiry_index: int = 0, strikes_range: int = 12):
+        raw, meta = self.fetch_raw_chain(symbol, expiry_index, strikes_range)
+        if raw is None:
+            return None, None
+        
+        futures_price = meta['futures_price']
+        perf = get_perf_recorder()
+        with perf.span('compute.greeks'):
+            greeks = chain_greeks(futures_price, raw['strikes'], meta['days_to_expiry'] / 365, self.risk_free_rate,
+                                  raw['ce']['iv'], raw['pe']['iv'])
+        
+        with perf.span('compute.frame'):
+            df = build_chain_frame(raw, greeks, futures_price, symbol_config(symbol)["contract_size"])
+        
+        atm = int(np.argmin(np.abs(raw['strikes'] - futures_price)))
+        atm_call_premium = float(raw['ce']['ltp'][atm])
+        atm_put_premium = float(raw['pe']['ltp'][atm])
+        meta.update({
+            'atm_strike': float(raw['strikes'][atm]), 'atm_call_premium': atm_call_premium,
+            'atm_put_premium': atm_put_premium, 'atm_straddle': atm_call_premium + atm_put_premium,
+        })
         
         return df, meta
 
-# ============================================================================
-# ANALYSIS FUNCTIONS
-# ============================================================================
+# ============================================================================
+# COMPACT CHAIN REPRESENTATION
+# ============================================================================
+
+CHAIN_INT_COLUMNS = ['Call_OI', 'Put_OI', 'Call_OI_Change', 'Put_OI_Change', 'Call_Volume', 'Put_Volume']
+
+DERIVED_CHAIN_COLUMNS = {
+    'Total_Volume': ('Call_Volume', 'Put_Volume'),
+    'Net_GEX': ('Call_GEX', 'Put_GEX'),
+    'Net_DEX': ('Call_DEX', 'Put_DEX'),
+    'Net_Vanna': ('Call_Vanna_Exp', 'Put_Vanna_Exp'),
+    'Net_Charm': ('Call_Charm_Exp', 'Put_Charm_Exp'),
+    'Net_Flow_GEX': ('Call_Flow_GEX', 'Put_Flow_GEX'),
+    'Net_Flow_DEX': ('Call_Flow_DEX', 'Put_Flow_DEX'),
+    'Net_Speed': ('Call_Speed_Exp', 'Put_Speed_Exp'),
+    'Net_Zomma': ('Call_Zomma_Exp', 'Put_Zomma_Exp'),
+    'Net_Color': ('Call_Color_Exp', 'Put_Color_Exp'),
+    'Net_Vomma': ('Call_Vomma_Exp', 'Put_Vomma_Exp'),
+}
+
+class CompactChain:
+    # Strike-indexed chain holding only base columns in the narrowest dtype that
+    # is lossless for counts (int32 when it fits) and float32 for prices/Greeks.
+    # Net_*, Total_Volume and Hedging_Pressure are rebuilt on access.
+    def __init__(self, frame: pd.DataFrame, columns: List[str]):
+        self.frame = frame
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'CompactChain':
+        columns = list(df.columns)
+        base = df.drop(columns=[c for c in df.columns if c in DERIVED_CHAIN_COLUMNS or c == 'Hedging_Pressure'])
+        base = base.drop_duplicates(subset=['Strike']).set_index('Strike').sort_index()
+        base.index = base.index.astype(np.float32 if np.all(base.index == base.index.astype(np.float32)) else np.float64)
+        compact = {}
+        for col in base.columns:
+            values = base[col].to_numpy()
+            if col in CHAIN_INT_COLUMNS:
+                values = np.nan_to_num(values.astype(np.float64)).round()
+                fits = len(values) == 0 or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max)
+                compact[col] = values.astype(np.int32 if fits else np.int64)
+            elif np.issubdtype(values.dtype, np.number):
+                compact[col] = values.astype(np.float32)
+            else:
+                compact[col] = values
+        return cls(pd.DataFrame(compact, index=base.index), columns)
+
+    @property
+    def strikes(self) -> np.ndarray:
+        return self.frame.index.to_numpy()
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.columns
+
+    def __getitem__(self, col: str) -> pd.Series:
+        if col == 'Strike':
+            return pd.Series(self.strikes.astype(np.float64), index=self.frame.index, name='Strike')
+        if col in DERIVED_CHAIN_COLUMNS:
+            left, right = DERIVED_CHAIN_COLUMNS[col]
+            dtype = np.int64 if col == 'Total_Volume' else np.float64
+            return (self.frame[left].astype(dtype) + self.frame[right].astype(dtype)).rename(col)
+        if col == 'Hedging_Pressure':
+            net_gex = self['Net_GEX']
+            max_gex = net_gex.abs().max()
+            return (net_gex / max_gex * 100 if max_gex > 0 else net_gex * 0).rename(col)
+        return self.frame[col]
+
+    def to_frame(self) -> pd.DataFrame:
+        base = {}
+        for col, values in self.frame.items():
+            values = values.to_numpy()
+            if values.dtype == np.float32:
+                values = values.astype(np.float64)
+            elif values.dtype == np.int32:
+                values = values.astype(np.int64)
+            base[col] = values
+        base['Strike'] = self.strikes.astype(np.float64)
+        for col, (left, right) in DERIVED_CHAIN_COLUMNS.items():
+            if left in base and right in base:
+                base[col] = base[left] + base[right]
+        if 'Net_GEX' in base:
+            max_gex = np.abs(base['Net_GEX']).max() if len(self) else 0
+            base['Hedging_Pressure'] = base['Net_GEX'] / max_gex * 100 if max_gex > 0 else np.zeros(len(self))
+        return pd.DataFrame({col: base[col] for col in self.columns})
+
+    def memory_report(self) -> Dict:
+        expanded = self.to_frame()
+        compact_cols = self.frame.memory_usage(index=True, deep=True)
+        expanded_cols = expanded.memory_usage(index=False, deep=True)
+        compact_bytes = int(compact_cols.sum())
+        expanded_bytes = int(expanded_cols.sum())
+        breakdown = pd.DataFrame({
+            'Column': self.columns,
+            'Stored': ['index' if c == 'Strike' else 'derived' if c not in self.frame.columns else str(self.frame[c].dtype) for c in self.columns],
+            'Compact_Bytes': [int(compact_cols['Index']) if c == 'Strike' else int(compact_cols.get(c, 0)) for c in self.columns],
+            'Expanded_Bytes': [int(expanded_cols[c]) for c in self.columns],
+        })
+        return {
+            'strikes': len(self), 'compact_bytes': compact_bytes, 'expanded_bytes': expanded_bytes,
+            'ratio': expanded_bytes / compact_bytes if compact_bytes > 0 else 1.0,
+            'stored_columns': len(self.frame.columns) + 1, 'derived_columns': len(self.columns) - len(self.frame.columns) - 1,
+            'columns': breakdown,
+        }
+
+# ============================================================================
+# SNAPSHOT STORE
+# ============================================================================
+
+SNAPSHOT_DIR = os.environ.get("GEX_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class SnapshotStore:
+    # Layout: <root>/<symbol>/<expiry>/<YYYY-MM-DD>/<HHMMSS>.parquet, one file per
+    # processed chain with the meta dict stored in the Parquet schema metadata.
+    def __init__(self, root: str = SNAPSHOT_DIR):
+        self.root = Path(root)
+
+    def snapshot_path(self, symbol: str, expiry: str, ts: datetime) -> Path:
+        return self.root / symbol / expiry / ts.strftime('%Y-%m-%d') / f"{ts.strftime('%H%M%S')}.parquet"
+
+    @staticmethod
+    def to_table(chain: CompactChain, meta: Dict) -> pa.Table:
+        table = pa.Table.from_pandas(chain.frame.reset_index(), preserve_index=False)
+        return table.replace_schema_metadata({
+            b'gex_meta': json.dumps(meta, default=str).encode(),
+            b'gex_columns': json.dumps(chain.columns).encode(),
+        })
+
+    def save(self, df: pd.DataFrame, meta: Dict) -> Path:
+        ts = datetime.strptime(meta['timestamp'], SNAPSHOT_TS_FORMAT)
+        path = self.snapshot_path(meta['symbol'], meta['expiry'], ts)
+        if path.exists():
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = self.to_table(CompactChain.from_frame(df) if isinstance(df, pd.DataFrame) else df, meta)
+        tmp_path = path.with_suffix('.tmp')
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        return path
+
+    def symbols(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def expiries(self, symbol: str) -> List[str]:
+        symbol_dir = self.root / symbol
+        if not symbol_dir.exists():
+            return []
+        return sorted(p.name for p in symbol_dir.iterdir() if p.is_dir())
+
+    def list_snapshots(self, symbol: str, expiry: str = None, start: datetime = None,
+                       end: datetime = None) -> List[Tuple[datetime, str, Path]]:
+        expiries = [expiry] if expiry else self.expiries(symbol)
+        start_day = start.strftime('%Y-%m-%d') if start else None
+        end_day = end.strftime('%Y-%m-%d') if end else None
+        snapshots = []
+        for exp in expiries:
+            exp_dir = self.root / symbol / exp
+            if not exp_dir.exists():
+                continue
+            for day_dir in exp_dir.iterdir():
+                day = day_dir.name
+                if (start_day and day < start_day) or (end_day and day > end_day):
+                    continue
+                for path in self._day_snapshots(day_dir):
+                    try:
+                        ts = datetime.strptime(f"{day} {path.stem}", '%Y-%m-%d %H%M%S')
+                    except ValueError:
+                        continue
+                    if (start and ts < start) or (end and ts > end):
+                        continue
+                    snapshots.append((ts, exp, path))
+        return sorted(snapshots, key=lambda s: (s[0], s[1]))
+
+    def _day_snapshots(self, day_dir: Path) -> Iterable[Path]:
+        return day_dir.glob('*.parquet')
+
+    def load_compact(self, path: Path) -> Tuple[CompactChain, Dict]:
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        meta = json.loads(metadata.get(b'gex_meta', b'{}'))
+        frame = table.to_pandas()
+        if b'gex_columns' not in metadata:
+            return CompactChain.from_frame(frame), meta
+        return CompactChain(frame.set_index('Strike'), json.loads(metadata[b'gex_columns'])), meta
+
+    def load(self, path: Path) -> Tuple[pd.DataFrame, Dict]:
+        chain, meta = self.load_compact(path)
+        return chain.to_frame(), meta
+
+    def iter_snapshots(self, symbol: str, expiry: str = None, start: datetime = None,
+                       end: datetime = None) -> Iterator[Tuple[pd.DataFrame, Dict]]:
+        for _, _, path in self.list_snapshots(symbol, expiry, start, end):
+            yield self.load(path)
+
+    def days(self, symbol: str, expiry: str = None) -> List[str]:
+        expiries = [expiry] if expiry else self.expiries(symbol)
+        days = set()
+        for exp in expiries:
+            exp_dir = self.root / symbol / exp
+            if exp_dir.exists():
+                days.update(p.name for p in exp_dir.iterdir() if p.is_dir())
+        return sorted(days)
+
+    def latest(self, symbol: str, expiry: str = None) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        snapshots = self.list_snapshots(symbol, expiry)
+        if not snapshots:
+            return None, None
+        return self.load(snapshots[-1][2])
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    return open_snapshot_store()
+
+# ============================================================================
+# DELTA SNAPSHOT STORE
+# ============================================================================
+
+SNAPSHOT_FORMAT = os.environ.get("GEX_SNAPSHOT_FORMAT", "parquet")
+DELTA_LOG_FILE = 'chain.gexd'
+DELTA_KEYFRAME_INTERVAL = 60
+DELTA_RECORD_HEADER = struct.Struct('<IBIII')
+DELTA_KEYFRAME, DELTA_UPDATE = 0, 1
+DELTA_INPUT_COLUMNS = CHAIN_INT_COLUMNS + ['Call_IV', 'Put_IV', 'Call_LTP', 'Put_LTP']
+DELTA_RISK_FREE_RATE = 0.07
+
+def _shuffle_bytes(values: np.ndarray) -> bytes:
+    # Byte-plane transpose: the high bytes of slowly moving values line up as runs.
+    return np.ascontiguousarray(values.view(np.uint8).reshape(len(values), values.itemsize).T).tobytes()
+
+def _unshuffle_bytes(buf, dtype: np.dtype, n: int) -> np.ndarray:
+    return np.frombuffer(buf, np.uint8, n * dtype.itemsize).reshape(dtype.itemsize, n).T.copy().view(dtype).ravel()
+
+def _xor_bits(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    bits = np.uint32 if a.itemsize == 4 else np.uint64
+    return (a.view(bits) ^ b.astype(a.dtype).view(bits)).view(a.dtype)
+
+def predict_chain_columns(strikes: np.ndarray, inputs: Dict[str, np.ndarray], futures_price: float,
+                          days_to_expiry: float, risk_free_rate: float, contract_size: float) -> Dict[str, np.ndarray]:
+    # Re-runs the chain kernel on stored inputs; Greeks and exposures are pure functions of them.
+    # Quotes arrive as short decimals, so the shortest float32 repr recovers the float64 the
+    # fetcher actually priced with.
+    raw = {'strikes': strikes.astype(np.float64)}
+    for side, prefix in (('ce', 'Call'), ('pe', 'Put')):
+        oi = inputs[f'{prefix}_OI'].astype(np.float64)
+        iv = inputs[f'{prefix}_IV']
+        raw[side] = {'oi': oi, 'previous_oi': oi - inputs[f'{prefix}_OI_Change'],
+                     'volume': inputs[f'{prefix}_Volume'].astype(np.float64),
+                     'iv': iv.astype(str).astype(np.float64) if iv.dtype == np.float32 else iv.astype(np.float64),
+                     'ltp': inputs[f'{prefix}_LTP'].astype(np.float64)}
+    greeks = chain_greeks(futures_price, raw['strikes'], days_to_expiry / 365, risk_free_rate, raw['ce']['iv'], raw['pe']['iv'])
+    columns = chain_columns(raw, greeks, futures_price, contract_size)
+    return {col: values for col, values in columns.items() if col not in DELTA_INPUT_COLUMNS and col != 'Strike'}
+
+class DeltaSnapshotStore(SnapshotStore):
+    # Same layout and API as SnapshotStore, but each <day> directory holds one
+    # append-only log (chain.gexd) instead of a Parquet file per snapshot:
+    #   header   DELTA_RECORD_HEADER = (payload bytes, kind, raw bytes, meta bytes, HHMMSS)
+    #   payload  zstd(meta json | [strikes] | one byte-shuffled block per column)
+    # Keyframes carry the full meta and input columns; updates carry changed meta
+    # keys and per-strike differences (integer subtraction, XOR of float bits), so
+    # unchanged strikes encode as zeros. A keyframe is forced every
+    # keyframe_interval records or when the strike ladder or columns change.
+    # Greek/exposure columns are stored as the XOR against predict_chain_columns
+    # on the decoded inputs, which is almost entirely zero bits.
+    def __init__(self, root: str = SNAPSHOT_DIR, keyframe_interval: int = DELTA_KEYFRAME_INTERVAL):
+        super().__init__(root)
+        self.keyframe_interval = keyframe_interval
+        self._logs = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def snapshot_path(self, symbol: str, expiry: str, ts: datetime) -> Path:
+        return self.root / symbol / expiry / ts.strftime('%Y-%m-%d') / f"{ts.strftime('%H%M%S')}.delta"
+
+    def _entries(self, log: Path) -> List[Tuple[str, int, int]]:
+        # [(HHMMSS, offset, kind)], extended incrementally as the log grows.
+        try:
+            size = log.stat().st_size
+        except FileNotFoundError:
+            return []
+        cached = self._logs.get(log)
+        if cached and cached[0] == size:
+            return cached[1]
+        entries, offset = (list(cached[1]), cached[2]) if cached and cached[0] < size else ([], 0)
+        with open(log, 'rb') as f:
+            f.seek(offset)
+            while offset + DELTA_RECORD_HEADER.size <= size:
+                payload_len, kind, _, _, hhmmss = DELTA_RECORD_HEADER.unpack(f.read(DELTA_RECORD_HEADER.size))
+                if offset + DELTA_RECORD_HEADER.size + payload_len > size:
+                    break
+                entries.append((f"{hhmmss:06d}", offset, kind))
+                offset += DELTA_RECORD_HEADER.size + payload_len
+                f.seek(offset)
+        self._logs[log] = (size, entries, offset)
+        return entries
+
+    def _day_snapshots(self, day_dir: Path) -> Iterable[Path]:
+        deltas = [day_dir / f"{stem}.delta" for stem, _, _ in self._entries(day_dir / DELTA_LOG_FILE)]
+        return list(super()._day_snapshots(day_dir)) + deltas
+
+    @staticmethod
+    def _read_record(f, offset: int) -> Tuple[int, Dict, memoryview]:
+        f.seek(offset)
+        payload_len, kind, raw_len, meta_len, _ = DELTA_RECORD_HEADER.unpack(f.read(DELTA_RECORD_HEADER.size))
+        raw = memoryview(pa.decompress(f.read(payload_len), raw_len, codec='zstd', asbytes=True))
+        return kind, json.loads(bytes(raw[:meta_len])), raw[meta_len:]
+
+    def _decode_to(self, log: Path, position: int) -> Dict:
+        # Cursor state: position, schema, strikes, meta, temporally coded columns
+        # and the residual blocks of the record at position. Sequential reads
+        # (iter_snapshots, backtests) advance the cursor one record at a time.
+        entries = self._entries(log)
+        keyframe = max(i for i in range(position + 1) if entries[i][2] == DELTA_KEYFRAME)
+        state = self._cursors.get(log)
+        if state is None or not keyframe <= state['position'] <= position:
+            state = None
+        with open(log, 'rb') as f:
+            for i in range(keyframe if state is None else state['position'] + 1, position + 1):
+                kind, meta, body = self._read_record(f, entries[i][1])
+                if kind == DELTA_KEYFRAME:
+                    schema = meta.pop('_schema')
+                    n = schema['rows']
+                    strikes = _unshuffle_bytes(body, np.dtype(schema['strike_dtype']), n)
+                    offset = n * strikes.itemsize
+                    predicted = set(schema['predicted'])
+                    plan = [(col, np.dtype(dtype), col in predicted) for col, dtype in schema['columns']]
+                    state = {'schema': schema, 'plan': plan, 'strikes': strikes, 'meta': meta, 'values': {}}
+                else:
+                    schema, n, offset = state['schema'], state['schema']['rows'], 0
+                    removed = meta.pop('_removed', [])
+                    meta = {**{k: v for k, v in state['meta'].items() if k not in removed}, **meta}
+                    state = {**state, 'meta': meta, 'values': dict(state['values'])}
+                state['residuals'] = {}
+                for col, dtype, is_predicted in state['plan']:
+                    offset += n * dtype.itemsize
+                    if is_predicted and i != position:
+                        continue
+                    block = _unshuffle_bytes(body[offset - n * dtype.itemsize:], dtype, n)
+                    if is_predicted:
+                        state['residuals'][col] = block
+                    elif kind == DELTA_KEYFRAME:
+                        state['values'][col] = block
+                    elif dtype.kind == 'f':
+                        state['values'][col] = _xor_bits(block, state['values'][col])
+                    else:
+                        state['values'][col] = state['values'][col] + block
+                state['position'] = i
+        self._cursors[log] = state
+        return state
+
+    @staticmethod
+    def _materialize(state: Dict) -> Tuple[CompactChain, Dict]:
+        schema, meta = state['schema'], state['meta']
+        values = dict(state['values'])
+        if schema['predicted']:
+            predicted = predict_chain_columns(state['strikes'], values, meta['futures_price'], meta['days_to_expiry'],
+                                              schema['risk_free_rate'], schema['contract_size'])
+            for col in schema['predicted']:
+                values[col] = _xor_bits(state['residuals'][col], predicted[col])
+        frame = pd.DataFrame({col: values[col] for col, _ in schema['columns']},
+                             index=pd.Index(state['strikes'], name='Strike'))
+        return CompactChain(frame, schema['chain_columns']), dict(meta)
+
+    def load_compact(self, path: Path) -> Tuple[CompactChain, Dict]:
+        if path.suffix != '.delta':
+            return super().load_compact(path)
+        log = path.parent / DELTA_LOG_FILE
+        with self._lock:
+            positions = [i for i, e in enumerate(self._entries(log)) if e[0] == path.stem]
+            if not positions:
+                raise FileNotFoundError(path)
+            return self._materialize(self._decode_to(log, positions[0]))
+
+    def _schema(self, chain: CompactChain, meta: Dict) -> Dict:
+        values = {col: chain.frame[col].to_numpy() for col in chain.frame.columns}
+        predictable = all(c in values for c in DELTA_INPUT_COLUMNS) and 'futures_price' in meta and 'days_to_expiry' in meta
+        contract_size = symbol_config(meta.get('symbol'))['contract_size']
+        predicted = []
+        if predictable:
+            predicted = [c for c in predict_chain_columns(chain.strikes, values, meta['futures_price'], meta['days_to_expiry'],
+                                                          DELTA_RISK_FREE_RATE, contract_size)
+                         if c in values and values[c].dtype.kind == 'f']
+        return {'rows': len(chain), 'strike_dtype': chain.strikes.dtype.str, 'chain_columns': chain.columns,
+                'columns': [[col, v.dtype.str] for col, v in values.items() if v.dtype.kind in 'iuf'],
+                'predicted': predicted, 'risk_free_rate': DELTA_RISK_FREE_RATE, 'contract_size': contract_size}
+
+    def save(self, df: pd.DataFrame, meta: Dict) -> Path:
+        ts = datetime.strptime(meta['timestamp'], SNAPSHOT_TS_FORMAT)
+        path = self.snapshot_path(meta['symbol'], meta['expiry'], ts)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        log = path.parent / DELTA_LOG_FILE
+        chain = CompactChain.from_frame(df) if isinstance(df, pd.DataFrame) else df
+        meta = json.loads(json.dumps(meta, default=str))
+        with self._lock, open(log, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            entries = self._entries(log)
+            if any(e[0] == path.stem for e in entries):
+                return path
+            end = self._logs[log][2] if entries else 0
+            os.ftruncate(f.fileno(), end)
+            schema = self._schema(chain, meta)
+            previous = self._decode_to(log, len(entries) - 1) if entries else None
+            since_key = len(entries) - max((i for i, e in enumerate(entries) if e[2] == DELTA_KEYFRAME), default=0)
+            keyframe = (previous is None or since_key >= self.keyframe_interval or schema != previous['schema']
+                        or not np.array_equal(chain.strikes, previous['strikes']))
+            values = {col: chain.frame[col].to_numpy() for col, _ in schema['columns']}
+            predicted = {}
+            if schema['predicted']:
+                predicted = predict_chain_columns(chain.strikes, values, meta['futures_price'], meta['days_to_expiry'],
+                                                  schema['risk_free_rate'], schema['contract_size'])
+            blocks = [] if not keyframe else [_shuffle_bytes(chain.strikes)]
+            for col, _ in schema['columns']:
+                current = values[col]
+                if col in predicted:
+                    block = _xor_bits(current, predicted[col])
+                elif keyframe:
+                    block = current
+                elif current.dtype.kind == 'f':
+                    block = _xor_bits(current, previous['values'][col])
+                else:
+                    block = current - previous['values'][col]
+                blocks.append(_shuffle_bytes(np.ascontiguousarray(block)))
+            if keyframe:
+                record_meta = {**meta, '_schema': schema}
+            else:
+                record_meta = {k: v for k, v in meta.items() if previous['meta'].get(k) != v}
+                removed = [k for k in previous['meta'] if k not in meta]
+                if removed:
+                    record_meta['_removed'] = removed
+            meta_bytes = json.dumps(record_meta).encode()
+            raw = meta_bytes + b''.join(blocks)
+            payload = pa.compress(raw, codec='zstd', asbytes=True)
+            kind = DELTA_KEYFRAME if keyframe else DELTA_UPDATE
+            f.write(DELTA_RECORD_HEADER.pack(len(payload), kind, len(raw), len(meta_bytes), int(path.stem)) + payload)
+        return path
+
+    def compression_report(self, symbol: str = None, expiry: str = None, sample: int = 24) -> Dict:
+        logs = sorted(self.root.glob(f"{symbol or '*'}/{expiry or '*'}/*/{DELTA_LOG_FILE}"))
+        with self._lock:
+            entries = {log: self._entries(log) for log in logs}
+        positions = [(log, i) for log in logs for i in range(len(entries[log]))]
+        if not positions:
+            return {'snapshots': 0}
+        picks = [positions[int(j)] for j in np.unique(np.linspace(0, len(positions) - 1, min(sample, len(positions))).astype(int))]
+        parquet_sizes, decode_ms = [], []
+        for log, i in picks:
+            with self._lock:
+                self._cursors.pop(log, None)
+                started = time.perf_counter()
+                chain, meta = self._materialize(self._decode_to(log, i))
+                decode_ms.append((time.perf_counter() - started) * 1000)
+            sink = pa.BufferOutputStream()
+            pq.write_table(self.to_table(chain, meta), sink, compression='zstd')
+            parquet_sizes.append(sink.getvalue().size)
+        longest = max(logs, key=lambda log: len(entries[log]))
+        with self._lock:
+            self._cursors.pop(longest, None)
+            started = time.perf_counter()
+            for i in range(len(entries[longest])):
+                self._materialize(self._decode_to(longest, i))
+            sequential = len(entries[longest]) / max(time.perf_counter() - started, 1e-9)
+        delta_bytes = sum(log.stat().st_size for log in logs)
+        parquet_bytes = float(np.mean(parquet_sizes)) * len(positions)
+        return {
+            'snapshots': len(positions), 'logs': len(logs),
+            'keyframes': sum(e[2] == DELTA_KEYFRAME for log in logs for e in entries[log]),
+            'delta_bytes': delta_bytes, 'parquet_bytes': parquet_bytes, 'ratio': parquet_bytes / max(delta_bytes, 1),
+            'bytes_per_snapshot': delta_bytes / len(positions),
+            'decode_ms_mean': float(np.mean(decode_ms)), 'decode_ms_max': float(np.max(decode_ms)),
+            'sequential_per_sec': sequential,
+        }
+
+def open_snapshot_store(root: str = SNAPSHOT_DIR, fmt: str = None) -> SnapshotStore:
+    return DeltaSnapshotStore(root) if (fmt or SNAPSHOT_FORMAT) == 'delta' else SnapshotStore(root)
+
+# ============================================================================
+# HISTORY INDEX
+# ============================================================================
+
+HISTORY_INDEX_PREFIX = '_history'
+HISTORY_INDEX_LOCK = '.history.lock'
+HISTORY_INDEX_MAX_SEGMENTS = 16
+
+class HistorySegments:
+    # The day's index segments addressed as one run of batches: batch i is
+    # snapshot i of the day, wherever the segment holding it starts.
+    def __init__(self, readers: List[pa.ipc.RecordBatchFileReader]):
+        self.readers = readers
+        self.offsets = np.cumsum([0] + [r.num_record_batches for r in readers])
+
+    @property
+    def num_record_batches(self) -> int:
+        return int(self.offsets[-1])
+
+    def get_batch(self, i: int) -> pa.RecordBatch:
+        seg = int(np.searchsorted(self.offsets, i, side='right')) - 1
+        return self.readers[seg].get_batch(i - int(self.offsets[seg]))
+
+class HistoryIndex:
+    # Per-day consolidation of a SnapshotStore day directory into uncompressed
+    # Arrow IPC segments with one record batch per snapshot. Each segment is
+    # named by the snapshot range it folds in (_history.<first>-<end>.arrow) and
+    # carries that range's time index (timestamps, futures, spot) and file stems
+    # in its schema metadata. New snapshots are folded in as a new segment, so an
+    # update reads and writes only what arrived since the last one; past
+    # HISTORY_INDEX_MAX_SEGMENTS the day is compacted back into one segment.
+    # Readers memory-map the segments and only fault in the batches and columns
+    # a query touches.
+    def __init__(self, store: SnapshotStore = None):
+        self.store = store or get_snapshot_store()
+        self._open = {}
+        self._segment_meta = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def segment_name(first: int, end: int) -> str:
+        return f"{HISTORY_INDEX_PREFIX}.{first:06d}-{end:06d}.arrow"
+
+    @staticmethod
+    def _segment_range(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            first, end = path.name[len(HISTORY_INDEX_PREFIX) + 1:-len('.arrow')].split('-')
+            return int(first), int(end)
+        except ValueError:
+            return None
+
+    def _day_lock(self, day_dir: Path) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(day_dir, threading.Lock())
+
+    def _segment_index(self, path: Path) -> Dict:
+        mtime = path.stat().st_mtime_ns
+        cached = self._segment_meta.get(path)
+        if cached is None or cached[0] != mtime:
+            with pa.memory_map(str(path), 'r') as source:
+                cached = (mtime, json.loads(pa.ipc.open_file(source).schema.metadata[b'gex_index']))
+            self._segment_meta[path] = cached
+        return cached[1]
+
+    def segments(self, day_dir: Path) -> List[Path]:
+        # The chain of segments covering snapshots 0..n contiguously. Anything
+        # else in the directory (segments superseded by a compaction another
+        # process has not finished cleaning up) is skipped.
+        found = [(r, p) for p in day_dir.glob(f"{HISTORY_INDEX_PREFIX}.*.arrow")
+                 if (r := self._segment_range(p)) is not None]
+        chain, covered = [], 0
+        for (first, end), path in sorted(found, key=lambda f: (f[0][0], -f[0][1])):
+            if first == covered:
+                chain.append(path)
+                covered = end
+        return chain
+
+    @staticmethod
+    def _normalize(chain: CompactChain, names: List[str] = None) -> pa.RecordBatch:
+        frame = chain.frame
+        arrays = {'Strike': pa.array(frame.index.to_numpy().astype(np.float64))}
+        for col in names or [c for c in frame.columns if np.issubdtype(frame[c].dtype, np.number)]:
+            values = frame[col].to_numpy() if col in frame.columns else np.full(len(frame), np.nan)
+            arrays[col] = pa.array(values.astype(np.int64 if col in CHAIN_INT_COLUMNS else np.float32))
+        return pa.RecordBatch.from_pydict(arrays)
+
+    @staticmethod
+    def _write_segment(day_dir: Path, first: int, batches: List[pa.RecordBatch], index: Dict) -> Path:
+        schema = batches[0].schema.with_metadata({b'gex_index': json.dumps(index, default=float).encode()})
+        with tempfile.NamedTemporaryFile(dir=day_dir, prefix=f".{HISTORY_INDEX_PREFIX}.", suffix='.tmp', delete=False) as out:
+            with pa.PythonFile(out, mode='w') as sink, pa.ipc.new_file(sink, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+        path = day_dir / HistoryIndex.segment_name(first, first + len(batches))
+        os.replace(out.name, path)
+        return path
+
+    def build(self, symbol: str, expiry: str, day: str) -> List[Path]:
+        day_dir = self.store.root / symbol / expiry / day
+        start = datetime.strptime(day, '%Y-%m-%d')
+        paths = [p for _, _, p in self.store.list_snapshots(symbol, expiry, start, start + timedelta(days=1) - timedelta(seconds=1))]
+        if not paths:
+            return []
+        stems = [p.stem for p in paths]
+        # Threads share the per-day lock; other processes (a second server,
+        # backfill) serialize on the day's lock file.
+        with self._day_lock(day_dir), open(day_dir / HISTORY_INDEX_LOCK, 'ab') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            segments = self.segments(day_dir)
+            indexes = [self._segment_index(p) for p in segments]
+            folded = [f for index in indexes for f in index['files']]
+            if folded == stems:
+                return segments
+            if folded != stems[:len(folded)]:
+                # A snapshot landed between already-folded ones (backfill); refold the day.
+                segments, indexes, folded = [], [], []
+            names = None
+            if segments:
+                with pa.memory_map(str(segments[0]), 'r') as source:
+                    names = pa.ipc.open_file(source).schema.names[1:]
+            index = {'files': [], 'timestamps': [], 'futures': [], 'spot': [],
+                     'columns': indexes[0]['columns'] if indexes else None}
+            batches = []
+            for p in paths[len(folded):]:
+                chain, meta = self.store.load_compact(p)
+                batch = self._normalize(chain, names)
+                names = names or batch.schema.names[1:]
+                batches.append(batch)
+                index['columns'] = index['columns'] or chain.columns
+                index['files'].append(p.stem)
+                index['timestamps'].append(meta.get('timestamp') or f"{day} {p.stem[:2]}:{p.stem[2:4]}:{p.stem[4:]}")
+                index['futures'].append(meta.get('futures_price', np.nan))
+                index['spot'].append(meta.get('spot_price', np.nan))
+            segments.append(self._write_segment(day_dir, len(folded), batches, index))
+            indexes.append(index)
+            if len(segments) > HISTORY_INDEX_MAX_SEGMENTS:
+                merged = {k: [v for index in indexes for v in index[k]] for k in ('files', 'timestamps', 'futures', 'spot')}
+                merged['columns'] = indexes[0]['columns']
+                readers = [pa.ipc.open_file(pa.memory_map(str(p), 'r')) for p in segments]
+                segments = [self._write_segment(day_dir, 0, [r.get_batch(i) for r in readers
+                                                             for i in range(r.num_record_batches)], merged)]
+            live = set(segments)
+            for stale in day_dir.glob(f"{HISTORY_INDEX_PREFIX}*.arrow"):
+                if stale not in live:
+                    stale.unlink(missing_ok=True)
+                    self._segment_meta.pop(stale, None)
+        return segments
+
+    def _reader(self, symbol: str, expiry: str, day: str):
+        segments = self.build(symbol, expiry, day)
+        if not segments:
+            return None
+        key = self.store.root / symbol / expiry / day
+        signature = [(p, p.stat().st_mtime_ns) for p in segments]
+        cached = self._open.get(key)
+        if cached is None or cached[0] != signature:
+            readers = [pa.ipc.open_file(pa.memory_map(str(p), 'r')) for p in segments]
+            indexes = [self._segment_index(p) for p in segments]
+            cached = (signature, HistorySegments(readers),
+                      np.array([t for i in indexes for t in i['timestamps']], dtype='datetime64[s]'),
+                      np.array([f for i in indexes for f in i['futures']], dtype=np.float64),
+                      np.array([s for i in indexes for s in i['spot']], dtype=np.float64),
+                      indexes[0]['columns'])
+            self._open[key] = cached
+        return cached[1:]
+
+    def _days(self, symbol: str, expiry: str, start: datetime, end: datetime) -> List[str]:
+        start_day, end_day = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+        return [d for d in self.store.days(symbol, expiry) if start_day <= d <= end_day]
+
+    def asof(self, symbol: str, expiry: str, ts: datetime) -> Tuple[Optional[CompactChain], Optional[Dict]]:
+        # Latest snapshot at or before ts, searching back across stored days.
+        target = np.datetime64(ts.replace(microsecond=0), 's')
+        for day in reversed([d for d in self.store.days(symbol, expiry) if d <= ts.strftime('%Y-%m-%d')]):
+            opened = self._reader(symbol, expiry, day)
+            if opened is None:
+                continue
+            reader, timestamps, futures, spot, chain_columns = opened
+            i = int(np.searchsorted(timestamps, target, side='right')) - 1
+            if i < 0:
+                continue
+            batch = reader.get_batch(i)
+            frame = batch.to_pandas().set_index('Strike')
+            meta = {'symbol': symbol, 'expiry': expiry, 'timestamp': str(timestamps[i]).replace('T', ' '),
+                    'futures_price': float(futures[i]), 'spot_price': float(spot[i])}
+            return CompactChain(frame, chain_columns), meta
+        return None, None
+
+    def range(self, symbol: str, expiry: str, start: datetime, end: datetime,
+              columns: Iterable[str] = ('Net_GEX', 'Net_DEX'), strikes: Iterable[float] = None) -> Dict[str, np.ndarray]:
+        # Returns {'timestamps', 'futures', 'spot': (T,), 'strikes': (S,), <column>: (T, S)} with
+        # NaN where a snapshot did not cover a strike. Net_* columns are summed from their legs.
+        columns = list(columns)
+        wanted = np.asarray(sorted(strikes), dtype=np.float64) if strikes is not None else None
+        lo, hi = np.datetime64(start.replace(microsecond=0), 's'), np.datetime64(end.replace(microsecond=0), 's')
+        rows = []
+        parts = {'timestamps': [], 'futures': [], 'spot': []}
+        for day in self._days(symbol, expiry, start, end):
+            opened = self._reader(symbol, expiry, day)
+            if opened is None:
+                continue
+            reader, timestamps, futures, spot, _ = opened
+            first, last = np.searchsorted(timestamps, lo, side='left'), np.searchsorted(timestamps, hi, side='right')
+            for i in range(first, last):
+                batch = reader.get_batch(i)
+                leg_values = {}
+                for col in columns:
+                    legs = DERIVED_CHAIN_COLUMNS.get(col, (col,))
+                    values = [batch.column(batch.schema.get_field_index(leg)).to_numpy() for leg in legs]
+                    leg_values[col] = sum(v.astype(np.float64) for v in values)
+                rows.append((batch.column(0).to_numpy(), leg_values))
+            parts['timestamps'].append(timestamps[first:last])
+            parts['futures'].append(futures[first:last])
+            parts['spot'].append(spot[first:last])
+        window = {k: np.concatenate(v) if v else np.array([], dtype='datetime64[s]' if k == 'timestamps' else np.float64)
+                  for k, v in parts.items()}
+        grid = wanted if wanted is not None else (np.unique(np.concatenate([r[0] for r in rows])) if rows else np.array([]))
+        window['strikes'] = grid
+        for col in columns:
+            window[col] = np.full((len(rows), len(grid)), np.nan)
+        for t, (row_strikes, leg_values) in enumerate(rows):
+            pos = np.searchsorted(grid, row_strikes)
+            hit = (pos < len(grid)) & (grid[np.minimum(pos, len(grid) - 1)] == row_strikes) if len(grid) else np.zeros(len(row_strikes), bool)
+            for col in columns:
+                window[col][t, pos[hit]] = leg_values[col][hit]
+        return window
+
+@st.cache_resource
+def get_history_index() -> HistoryIndex:
+    return HistoryIndex(get_snapshot_store())
+
+# ============================================================================
+# STREAMING EXPORT
+# ============================================================================
+
+EXPORT_FORMATS = {
+    "Parquet": {"extension": "parquet", "mime": "application/vnd.apache.parquet"},
+    "CSV (gzip)": {"extension": "csv.gz", "mime": "application/gzip"},
+}
+EXPORT_CHUNK_BYTES = 1 << 20
+EXPORT_DIR = os.environ.get("GEX_EXPORT_DIR", "exports")
+# st.download_button materialises its whole payload as one bytes object (server
+# memory and the browser message), so only exports up to this size are offered
+# there; bigger ones stay in EXPORT_DIR to be collected from disk.
+EXPORT_DOWNLOAD_LIMIT = 64 << 20
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only sink that hands back whatever was written since the last drain,
+    # while still reporting absolute offsets to writers that rely on tell().
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self._pending = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        self._pending += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self._pending = 0
+        return data
+
+def iter_export_frames(frames: Iterable[Tuple[pd.DataFrame, Dict]]) -> Iterator[pd.DataFrame]:
+    columns = None
+    for df, meta in frames:
+        frame = df.copy()
+        frame.insert(0, 'Expiry', meta.get('expiry', ''))
+        frame.insert(0, 'Symbol', meta.get('symbol', ''))
+        frame.insert(0, 'Timestamp', meta.get('timestamp', ''))
+        if columns is None:
+            columns = list(frame.columns)
+        yield frame.reindex(columns=columns)
+
+def stream_csv_gz(frames: Iterable[pd.DataFrame], chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with gzip.GzipFile(fileobj=sink, mode='wb') as gz:
+        header = True
+        for frame in frames:
+            gz.write(frame.to_csv(index=False, header=header).encode())
+            header = False
+            if sink.pending >= chunk_bytes:
+                yield sink.drain()
+    yield sink.drain()
+
+def stream_parquet(frames: Iterable[pd.DataFrame], chunk_bytes: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for frame in frames:
+            if writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                writer = pq.ParquetWriter(sink, table.schema, compression='zstd')
+            else:
+                table = pa.Table.from_pandas(frame, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            if sink.pending >= chunk_bytes:
+                yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+EXPORT_STREAMS = {"Parquet": stream_parquet, "CSV (gzip)": stream_csv_gz}
+
+def export_to_file(frames: Iterable[Tuple[pd.DataFrame, Dict]], fmt: str):
+    # Building the file holds one snapshot plus one output chunk; whoever reads
+    # it back decides how much ends up in memory.
+    out = tempfile.SpooledTemporaryFile(max_size=8 * EXPORT_CHUNK_BYTES)
+    for chunk in EXPORT_STREAMS[fmt](iter_export_frames(frames)):
+        out.write(chunk)
+    out.seek(0)
+    return out
+
+def export_to_path(frames: Iterable[Tuple[pd.DataFrame, Dict]], fmt: str, name: str, root: str = EXPORT_DIR) -> Path:
+    # Same chunked build, written straight to EXPORT_DIR and renamed into place when complete.
+    directory = Path(root)
+    directory.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f".{name}.", delete=False) as out:
+        for chunk in EXPORT_STREAMS[fmt](iter_export_frames(frames)):
+            out.write(chunk)
+    path = directory / name
+    os.replace(out.name, path)
+    return path
+
+def export_filename(symbol: str, fmt: str, suffix: str = None) -> str:
+    stamp = suffix or datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"NYZTrade_{symbol}_{stamp}.{EXPORT_FORMATS[fmt]['extension']}"
+
+# ============================================================================
+# ANALYSIS FUNCTIONS
+# ============================================================================
+
+def calculate_flow_metrics(df: pd.DataFrame, futures_price: float) -> Dict:
+    df_unique = df.drop_duplicates(subset=['Strike']).sort_values('Strike').reset_index(drop=True)
+    
+    positive_gex_df = df_unique[df_unique['Net_GEX'] > 0].copy()
+    positive_gex_df['Distance'] = abs(positive_gex_df['Strike'] - futures_price)
+    positive_gex_df = positive_gex_df.nsmallest(5, 'Distance')
+    
+    negative_gex_df = df_unique[df_unique['Net_GEX'] < 0].copy()
+    negative_gex_df['Distance'] = abs(negative_gex_df['Strike'] - futures_price)
+    negative_gex_df = negative_gex_df.nsmallest(5, 'Distance')
+    
+    gex_near_positive = positive_gex_df['Net_GEX'].sum() if len(positive_gex_df) > 0 else 0
+    gex_near_negative = negative_gex_df['Net_GEX'].sum() if len(negative_gex_df) > 0 else 0
+    gex_near_total = gex_near_positive + gex_near_negative
+    gex_total_all = df_unique['Net_GEX'].sum()
+    
+    above_futures = df_unique[df_unique['Strike'] > futures_price].head(5)
+    below_futures = df_unique[df_unique['Strike'] < futures_price].tail(5)
+    
+    dex_near_above = above_futures['Net_DEX'].sum() if len(above_futures) > 0 else 0
+    dex_near_below = below_futures['Net_DEX'].sum() if len(below_futures) > 0 else 0
+    dex_near_total = dex_near_above + dex_near_below
+    dex_total_all = df_unique['Net_DEX'].sum()
+    
+    vanna_total = df_unique['Net_Vanna'].sum()
+    charm_total = df_unique['Net_Charm'].sum()
+    flow_gex_total = df_unique['Net_Flow_GEX'].sum()
+    flow_dex_total = df_unique['Net_Flow_DEX'].sum()
+    # Snapshots persisted before the higher-order columns existed report NaN
+    speed_total, zomma_total, color_total, vomma_total = (
+        df_unique[col].sum() if col in df_unique else np.nan for col in ('Net_Speed', 'Net_Zomma', 'Net_Color', 'Net_Vomma'))
+    
+    def get_gex_bias(v):
+        if v > 50: return "🟢 STRONG SUPPRESSION", "green", "Bullish - Low Vol Expected"
+        elif v > 0: return "🟢 SUPPRESSION", "lightgreen", "Mild Bullish"
+        elif v < -50: return "🔴 HIGH AMPLIFICATION", "red", "High Volatility Expected"
+        elif v < 0: return "🔴 AMPLIFICATION", "lightcoral", "Volatile"
+        return "⚖️ NEUTRAL", "orange", "Balanced"
+    
+    def get_dex_bias(v):
+        if v > 50: return "🟢 BULLISH", "green", "Strong Upward Pressure"
+        elif v < -50: return "🔴 BEARISH", "red", "Strong Downward Pressure"
+        elif v > 0: return "🟢 Mild Bullish", "lightgreen", "Slight Upward Bias"
+        elif v < 0: return "🔴 Mild Bearish", "lightcoral", "Slight Downward Bias"
+        return "⚖️ NEUTRAL", "orange", "No Clear Direction"
+    
+    gex_bias, gex_color, gex_desc = get_gex_bias(gex_near_total)
+    dex_bias, dex_color, dex_desc = get_dex_bias(dex_near_total)
+    combined_signal = (gex_near_total + dex_near_total) / 2
+    combined_bias, combined_color, combined_desc = get_gex_bias(combined_signal)
+    
+    return {
+        'gex_near_positive': gex_near_positive, 'gex_near_negative': gex_near_negative,
+        'gex_near_total': gex_near_total, 'gex_total': gex_total_all,
+        'gex_bias': gex_bias, 'gex_color': gex_color, 'gex_desc': gex_desc,
+        'dex_near_above': dex_near_above, 'dex_near_below': dex_near_below,
+        'dex_near_total': dex_near_total, 'dex_total': dex_total_all,
+        'dex_bias': dex_bias, 'dex_color': dex_color, 'dex_desc': dex_desc,
+        'vanna_total': vanna_total, 'charm_total': charm_total,
+        'speed_total': speed_total, 'zomma_total': zomma_total,
+        'color_total': color_total, 'vomma_total': vomma_total,
+        'flow_gex_total': flow_gex_total, 'flow_dex_total': flow_dex_total,
+        'combined_signal': combined_signal, 'combined_bias': combined_bias,
+        'combined_color': combined_color, 'combined_desc': combined_desc,
+    }
+
+def detect_gamma_flip_zones(df: pd.DataFrame) -> List[Dict]:
+    gamma_flip_zones = []
+    df_sorted = df.sort_values('Strike').reset_index(drop=True)
+    
+    for i in range(len(df_sorted) - 1):
+        current_gex = df_sorted.iloc[i]['Net_GEX']
+        next_gex = df_sorted.iloc[i + 1]['Net_GEX']
+        
+        if (current_gex > 0 and next_gex < 0) or (current_gex < 0 and next_gex > 0):
+            lower = df_sorted.iloc[i]['Strike']
+            upper = df_sorted.iloc[i + 1]['Strike']
+            weight = abs(current_gex) / (abs(current_gex) + abs(next_gex)) if (abs(current_gex) + abs(next_gex)) > 0 else 0.5
+            flip_strike = lower + (upper - lower) * weight
+            
+            gamma_flip_zones.append({
+                'flip_strike': flip_strike, 'lower_strike': lower, 'upper_strike': upper,
+                'flip_type': "Positive → Negative" if current_gex > 0 else "Negative → Positive",
+                'lower_gex': current_gex, 'upper_gex': next_gex,
+                'impact': "Resistance" if current_gex > 0 else "Support"
+            })
+    
+    return gamma_flip_zones
+
+def calculate_key_levels(df: pd.DataFrame, futures_price: float) -> Dict:
+    df_sorted = df.sort_values('Strike').reset_index(drop=True)
+    max_pain_strike = df_sorted.loc[df_sorted['Call_OI'].idxmax(), 'Strike']
+    highest_call_oi_strike = df_sorted.loc[df_sorted['Call_OI'].idxmax(), 'Strike']
+    highest_put_oi_strike = df_sorted.loc[df_sorted['Put_OI'].idxmax(), 'Strike']
+    max_positive_gex_strike = df_sorted.loc[df_sorted['Net_GEX'].idxmax(), 'Strike']
+    max_negative_gex_strike = df_sorted.loc[df_sorted['Net_GEX'].idxmin(), 'Strike']
+    
+    total_put_oi = df_sorted['Put_OI'].sum()
+    total_call_oi = df_sorted['Call_OI'].sum()
+    pcr = total_put_oi / total_call_oi if total_call_oi > 0 else 1
+    
+    return {
+        'max_pain': max_pain_strike, 'highest_call_oi': highest_call_oi_strike,
+        'highest_put_oi': highest_put_oi_strike, 'max_positive_gex': max_positive_gex_strike,
+        'max_negative_gex': max_negative_gex_strike, 'pcr': pcr,
+        'total_call_oi': total_call_oi, 'total_put_oi': total_put_oi,
+    }
+
+def flow_metrics_kernel(strikes: np.ndarray, net_gex: np.ndarray, net_dex: np.ndarray, futures: np.ndarray,
+                        call_oi: np.ndarray = None, put_oi: np.ndarray = None, near: int = 5) -> Dict[str, np.ndarray]:
+    # Array form of calculate_flow_metrics / detect_gamma_flip_zones / pcr over a
+    # (T, S) strike grid with NaN for strikes a snapshot did not cover. Returns
+    # one value per row, matching the per-snapshot functions. strikes is either
+    # the shared (S,) axis or a (T, S) grid when rows are different chains.
+    strikes = np.asarray(strikes, dtype=np.float64)
+    net_gex, net_dex = np.atleast_2d(net_gex), np.atleast_2d(net_dex)
+    futures = np.asarray(futures, dtype=np.float64).reshape(-1, 1)
+    width = net_gex.shape[1]
+    grid = np.broadcast_to(strikes, net_gex.shape)
+    present = ~np.isnan(net_gex)
+    distance = np.abs(strikes - futures)
+    
+    def near_sum(mask):
+        order = np.argsort(np.where(mask, distance, np.inf), axis=1, kind='stable')[:, :near]
+        rows = np.arange(len(net_gex))[:, None]
+        return np.where(mask[rows, order], net_gex[rows, order], 0).sum(axis=1)
+    
+    gex_near_positive = near_sum(present & (net_gex > 0))
+    gex_near_negative = near_sum(present & (net_gex < 0))
+    above = present & (strikes > futures)
+    below = present & (strikes < futures)
+    above_rank = np.cumsum(above, axis=1)
+    below_rank = np.cumsum(below[:, ::-1], axis=1)[:, ::-1]
+    dex_near_above = np.where(above & (above_rank <= near), net_dex, 0).sum(axis=1)
+    dex_near_below = np.where(below & (below_rank <= near), net_dex, 0).sum(axis=1)
+    
+    # Gamma flips between each covered strike and the next covered one.
+    columns = np.arange(width)
+    following = np.minimum.accumulate(np.where(present, columns, width)[:, ::-1], axis=1)[:, ::-1]
+    following = np.concatenate([following[:, 1:], np.full((len(net_gex), 1), width)], axis=1)
+    has_next = present & (following < width)
+    nxt = np.minimum(following, max(width - 1, 0))
+    rows = np.arange(len(net_gex))[:, None]
+    lower_gex, upper_gex = net_gex, net_gex[rows, nxt]
+    flips = has_next & (((lower_gex > 0) & (upper_gex < 0)) | ((lower_gex < 0) & (upper_gex > 0)))
+    magnitude = np.abs(lower_gex) + np.abs(upper_gex)
+    weight = np.divide(np.abs(lower_gex), magnitude, out=np.full_like(magnitude, 0.5), where=flips & (magnitude > 0))
+    flip_strike = grid + (grid[rows, nxt] - grid) * weight
+    flip_distance = np.where(flips, np.abs(flip_strike - futures), np.inf)
+    nearest = np.argmin(flip_distance, axis=1) if width else np.zeros(len(net_gex), int)
+    flip_level = np.where(flips.any(axis=1), flip_strike[np.arange(len(net_gex)), nearest] if width else np.nan, np.nan)
+    
+    result = {
+        'gex_near_positive': gex_near_positive, 'gex_near_negative': gex_near_negative,
+        'gex_near_total': gex_near_positive + gex_near_negative, 'gex_total': np.nansum(net_gex, axis=1),
+        'dex_near_above': dex_near_above, 'dex_near_below': dex_near_below,
+        'dex_near_total': dex_near_above + dex_near_below, 'dex_total': np.nansum(net_dex, axis=1),
+        'flip_level': flip_level, 'futures_price': futures[:, 0],
+    }
+    result['combined_signal'] = (result['gex_near_total'] + result['dex_near_total']) / 2
+    if call_oi is not None and put_oi is not None:
+        total_call, total_put = np.nansum(np.atleast_2d(call_oi), axis=1), np.nansum(np.atleast_2d(put_oi), axis=1)
+        result['pcr'] = np.divide(total_put, total_call, out=np.ones_like(total_call), where=total_call > 0)
+    return result
+
+# ============================================================================
+# ALERT ENGINE
+# ============================================================================
+
+@dataclass
+class AlertRule:
+    name: str
+    metric: str
+    condition: str = "above"
+    threshold: float = 0.0
+    symbols: Optional[List[str]] = None
+    severity: str = "info"
+
+    def __post_init__(self):
+        # Rules come from a JSON file too; a misspelt condition must not evaluate as "above"
+        if self.condition not in ALERT_CONDITIONS:
+            raise ValueError(f"Alert rule {self.name!r}: unknown condition {self.condition!r} "
+                             f"(expected one of {', '.join(ALERT_CONDITIONS)})")
+
+ALERT_CONDITIONS = {"above": 0, "below": 1, "new_flip": 2}
+
+DEFAULT_ALERT_RULES = [
+    AlertRule("GEX strong suppression", "gex_near_total", "above", 50, severity="info"),
+    AlertRule("GEX high amplification", "gex_near_total", "below", -50, severity="warning"),
+    AlertRule("PCR above 1.2", "pcr", "above", 1.2, severity="info"),
+    AlertRule("PCR below 0.8", "pcr", "below", 0.8, severity="info"),
+    AlertRule("New gamma flip zone", "flip_zones", "new_flip", severity="warning"),
+]
+
+def build_signal_record(metrics: Dict, key_levels: Dict, gamma_flips: List[Dict], hedge_flow: Dict = None) -> Dict:
+    record = {k: float(v) for k, v in metrics.items() if isinstance(v, (int, float, np.number))}
+    record.update({k: float(v) for k, v in key_levels.items() if isinstance(v, (int, float, np.number))})
+    if hedge_flow is not None:
+        record.update(hedge_flow_record(hedge_flow))
+    record['flip_count'] = float(len(gamma_flips))
+    record['flip_zones'] = [(z['lower_strike'], z['upper_strike'], z['flip_type']) for z in gamma_flips]
+    return record
+
+class AlertSink(ABC):
+    name = "sink"
+
+    @abstractmethod
+    def emit(self, alert: Dict) -> None:
+        ...
+
+class StdoutAlertSink(AlertSink):
+    name = "stdout"
+
+    def emit(self, alert: Dict) -> None:
+        print(f"[ALERT {alert['severity'].upper()}] {alert['timestamp']} {alert['symbol']} {alert['message']}", flush=True)
+
+class FileAlertSink(AlertSink):
+    name = "file"
+
+    def __init__(self, path: str = "alerts.jsonl"):
+        self.path = Path(path)
+
+    def emit(self, alert: Dict) -> None:
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert, default=str) + "\n")
+
+class WebhookAlertSink(AlertSink):
+    # Stub: payloads are kept in memory for inspection; when a URL is configured
+    # they are POSTed from a daemon thread so a slow endpoint never blocks a refresh.
+    name = "webhook"
+
+    def __init__(self, url: str = None, keep: int = 200):
+        self.url = url
+        self.sent = deque(maxlen=keep)
+
+    def emit(self, alert: Dict) -> None:
+        self.sent.append(alert)
+        if self.url:
+            threading.Thread(target=self._post, args=(alert,), daemon=True).start()
+
+    def _post(self, alert: Dict) -> None:
+        try:
+            requests.post(self.url, json=alert, timeout=5).raise_for_status()
+        except requests.RequestException as e:
+            get_perf_recorder().record_error(f'alerts.{self.name}', e)
+
+def build_alert_sinks(spec: str) -> List[AlertSink]:
+    # e.g. "stdout,file:alerts.jsonl,webhook:https://example/hook"
+    sinks = []
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        kind, _, arg = item.partition(':')
+        if kind == 'stdout':
+            sinks.append(StdoutAlertSink())
+        elif kind == 'file':
+            sinks.append(FileAlertSink(arg or "alerts.jsonl"))
+        elif kind == 'webhook':
+            sinks.append(WebhookAlertSink(arg or None))
+    return sinks
+
+def load_alert_rules(path: str = None) -> List[AlertRule]:
+    if not path or not os.path.exists(path):
+        return list(DEFAULT_ALERT_RULES)
+    with open(path) as f:
+        return [AlertRule(**rule) for rule in json.load(f)]
+
+class AlertEngine:
+    # Rules are compiled once into parallel arrays (metric index, condition code,
+    # threshold) so each snapshot is a single vectorized comparison; per-symbol
+    # state makes alerts edge-triggered: a rule fires only on the transition
+    # from inactive to active, never while it stays active.
+    def __init__(self, rules: List[AlertRule], sinks: List[AlertSink] = None, history: int = 500):
+        self.rules = list(rules)
+        self.sinks = list(sinks or [])
+        self.recent = deque(maxlen=history)
+        self.metrics = sorted({r.metric for r in self.rules if r.condition != "new_flip"})
+        metric_pos = {m: i for i, m in enumerate(self.metrics)}
+        codes = np.array([ALERT_CONDITIONS[r.condition] for r in self.rules], dtype=np.int64)
+        threshold_rules = np.flatnonzero(codes != ALERT_CONDITIONS["new_flip"])
+        self._rule_ids = threshold_rules.astype(np.int64)
+        self._metric_idx = np.array([metric_pos[self.rules[i].metric] for i in threshold_rules], dtype=np.int64)
+        self._is_below = codes[threshold_rules] == ALERT_CONDITIONS["below"]
+        self._thresholds = np.array([self.rules[i].threshold for i in threshold_rules], dtype=np.float64)
+        self._flip_rules = np.flatnonzero(codes == ALERT_CONDITIONS["new_flip"]).tolist()
+        self._state = {}
+        self._flip_state = {}
+        self._symbol_masks = {}
+        self._lock = threading.Lock()
+
+    def _symbol_mask(self, symbol: str) -> np.ndarray:
+        mask = self._symbol_masks.get(symbol)
+        if mask is None:
+            mask = np.array([self.rules[i].symbols is None or symbol in self.rules[i].symbols
+                             for i in self._rule_ids], dtype=bool)
+            self._symbol_masks[symbol] = mask
+        return mask
+
+    def evaluate(self, symbol: str, expiry: str, record: Dict, timestamp: str = None) -> List[Dict]:
+        timestamp = timestamp or datetime.now().strftime(SNAPSHOT_TS_FORMAT)
+        key = (symbol, expiry)
+        values = np.array([record.get(m, np.nan) for m in self.metrics], dtype=np.float64)
+        observed = values[self._metric_idx]
+        with np.errstate(invalid='ignore'):
+            active = np.where(self._is_below, observed < self._thresholds, observed > self._thresholds)
+        active &= self._symbol_mask(symbol)
+
+        fired = []
+        with self._lock:
+            previous = self._state.get(key)
+            self._state[key] = active
+            if previous is not None:
+                for pos in np.flatnonzero(active & ~previous):
+                    rule = self.rules[self._rule_ids[pos]]
+                    fired.append(self._make_alert(rule, symbol, expiry, timestamp, observed[pos],
+                                                  f"{rule.name}: {rule.metric} {observed[pos]:.4f} {rule.condition} {rule.threshold:g}"))
+
+            zones = set(record.get('flip_zones', []))
+            previous_zones = self._flip_state.get(key)
+            self._flip_state[key] = zones
+            if previous_zones is not None and self._flip_rules:
+                for lower, upper, flip_type in sorted(zones - previous_zones):
+                    for i in self._flip_rules:
+                        rule = self.rules[i]
+                        if rule.symbols is None or symbol in rule.symbols:
+                            fired.append(self._make_alert(rule, symbol, expiry, timestamp, (lower + upper) / 2,
+                                                          f"{rule.name}: {flip_type} between {lower:,.0f} and {upper:,.0f}"))
+            self.recent.extend(fired)
+
+        for alert in fired:
+            for sink in self.sinks:
+                try:
+                    sink.emit(alert)
+                except Exception as e:
+                    get_perf_recorder().record_error(f'alerts.{sink.name}', e)
+        return fired
+
+    def _make_alert(self, rule: AlertRule, symbol: str, expiry: str, timestamp: str, value: float, message: str) -> Dict:
+        return {
+            'timestamp': timestamp, 'symbol': symbol, 'expiry': expiry, 'rule': rule.name,
+            'metric': rule.metric, 'condition': rule.condition, 'threshold': rule.threshold,
+            'value': float(value), 'severity': rule.severity, 'message': message,
+        }
+
+@st.cache_resource
+def get_alert_engine() -> AlertEngine:
+    rules = load_alert_rules(os.environ.get("GEX_ALERT_RULES"))
+    # Alerts always show in the dashboard; sinks (stdout included) are opt-in
+    return AlertEngine(rules, build_alert_sinks(os.environ.get("GEX_ALERT_SINKS", "")))
+
+# ============================================================================
+# EXPOSURE HISTORY
+# ============================================================================
+
+HISTORY_FIELDS = ['gex_near_total', 'dex_near_total', 'gex_total', 'dex_total', 'combined_signal',
+                  'flip_level', 'pcr', 'futures_price']
+HISTORY_WINDOWS = {'5m': 300, '15m': 900, '1h': 3600}
+HISTORY_CAPACITY = 4096
+
+def nearest_flip_level(gamma_flips: List[Dict], futures_price: float) -> float:
+    if not gamma_flips:
+        return np.nan
+    return min((z['flip_strike'] for z in gamma_flips), key=lambda k: abs(k - futures_price))
+
+class RingSeries:
+    # Fixed-capacity ring buffer of (timestamp, fields) with incrementally
+    # maintained window sums. Sums are kept on values shifted by the first
+    # observation so variance stays accurate for large levels like futures.
+    # The feed thread appends while the page reads, so both take the series lock.
+    def __init__(self, fields: List[str], capacity: int = HISTORY_CAPACITY, windows: Dict[str, int] = None):
+        self.fields = list(fields)
+        self.capacity = capacity
+        self.windows = dict(windows or HISTORY_WINDOWS)
+        self.ts = np.full(capacity, np.nan)
+        self.values = np.full((capacity, len(fields)), np.nan)
+        self.size = 0
+        self.total = 0
+        self._shift = None
+        self._tail = {w: 0 for w in self.windows}
+        self._count = {w: np.zeros(len(fields)) for w in self.windows}
+        self._sum = {w: np.zeros(len(fields)) for w in self.windows}
+        self._sumsq = {w: np.zeros(len(fields)) for w in self.windows}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def last_ts(self) -> Optional[float]:
+        return self.ts[self._slot(self.total - 1)] if self.size else None
+
+    def _slot(self, seq: int) -> int:
+        return seq % self.capacity
+
+    def _remove(self, window: str, seq: int):
+        x = self.values[self._slot(seq)] - self._shift
+        valid = ~np.isnan(x)
+        self._count[window][valid] -= 1
+        self._sum[window][valid] -= x[valid]
+        self._sumsq[window][valid] -= x[valid] ** 2
+
+    def append(self, ts: float, values) -> bool:
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            return self._append(ts, values)
+
+    def _append(self, ts: float, values: np.ndarray) -> bool:
+        if self.size and ts <= self.last_ts:
+            return False
+        if self._shift is None:
+            self._shift = np.nan_to_num(values)
+        oldest = self.total - self.size
+        if self.size == self.capacity:
+            # Sequence numbers are global; the oldest sample is about to be overwritten.
+            for w in self.windows:
+                if self._tail[w] <= oldest:
+                    self._remove(w, oldest)
+                    self._tail[w] = oldest + 1
+            self.size -= 1
+        slot = self._slot(self.total)
+        self.ts[slot] = ts
+        self.values[slot] = values
+        self.total += 1
+        self.size += 1
+
+        x = values - self._shift
+        valid = ~np.isnan(x)
+        for w, seconds in self.windows.items():
+            self._count[w][valid] += 1
+            self._sum[w][valid] += x[valid]
+            self._sumsq[w][valid] += x[valid] ** 2
+            while self._tail[w] < self.total - 1 and self.ts[self._slot(self._tail[w])] <= ts - seconds:
+                self._remove(w, self._tail[w])
+                self._tail[w] += 1
+        return True
+
+    def latest(self) -> np.ndarray:
+        return self.values[self._slot(self.total - 1)] if self.size else np.full(len(self.fields), np.nan)
+
+    def change(self, window: str) -> np.ndarray:
+        # Change versus the last sample at or before the window start, falling back
+        # to the oldest sample inside the window while history is still short.
+        if not self.size:
+            return np.full(len(self.fields), np.nan)
+        tail = self._tail[window]
+        anchor = tail - 1 if tail - 1 >= self.total - self.size else tail
+        return self.latest() - self.values[self._slot(anchor)]
+
+    def zscore(self, window: str) -> np.ndarray:
+        n = self._count[window]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self._sum[window] / n
+            var = np.maximum(self._sumsq[window] / n - mean ** 2, 0)
+            z = (self.latest() - self._shift - mean) / np.sqrt(var)
+        return np.where((n > 1) & (var > 0), z, np.nan)
+
+    def to_frame(self) -> pd.DataFrame:
+        with self._lock:
+            order = [self._slot(seq) for seq in range(self.total - self.size, self.total)]
+            values, ts = self.values[order], self.ts[order]
+        frame = pd.DataFrame(values, columns=self.fields)
+        frame.insert(0, 'Time', [datetime.fromtimestamp(t) for t in ts])
+        return frame
+
+    def rolling_summary(self) -> pd.DataFrame:
+        with self._lock:
+            summary = {'Latest': self.latest()}
+            for w in self.windows:
+                summary[f'Δ {w}'] = self.change(w)
+            for w in self.windows:
+                summary[f'Z {w}'] = self.zscore(w)
+        return pd.DataFrame(summary, index=self.fields)
+
+class ExposureHistory:
+    # One RingSeries per (symbol, expiry), reset when the trading day rolls so
+    # memory stays bounded at capacity x fields x 8 bytes per series.
+    def __init__(self, store: SnapshotStore = None, capacity: int = HISTORY_CAPACITY):
+        self.store = store
+        self.capacity = capacity
+        self._series = {}
+        self._days = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def snapshot_values(metrics: Dict, key_levels: Dict, gamma_flips: List[Dict], futures_price: float) -> List[float]:
+        row = {**metrics, **key_levels, 'futures_price': futures_price,
+               'flip_level': nearest_flip_level(gamma_flips, futures_price)}
+        return [float(row.get(f, np.nan)) for f in HISTORY_FIELDS]
+
+    def series(self, symbol: str, expiry: str, day: str = None) -> RingSeries:
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        key = (symbol, expiry)
+        with self._lock:
+            if key in self._series and self._days.get(key) == day:
+                return self._series[key]
+        # Hydration reads a full day from disk; do it outside the lock shared by
+        # every session and swap the result in, keeping one that beat us to it.
+        series = RingSeries(HISTORY_FIELDS, self.capacity)
+        if self.store is not None:
+            self._hydrate(series, symbol, expiry, day)
+        with self._lock:
+            if key not in self._series or self._days.get(key) != day:
+                self._series[key] = series
+                self._days[key] = day
+            return self._series[key]
+
+    def _hydrate(self, series: RingSeries, symbol: str, expiry: str, day: str):
+        # Hydrate through the process-wide index so its open memory maps and
+        # folded-in day files are shared with the history/replay views.
+        start = datetime.strptime(day, '%Y-%m-%d')
+        index = get_history_index()
+        if index.store is not self.store:
+            index = HistoryIndex(self.store)
+        window = index.range(symbol, expiry, start, start + timedelta(days=1) - timedelta(seconds=1),
+                             columns=['Net_GEX', 'Net_DEX', 'Call_OI', 'Put_OI'])
+        if not len(window['timestamps']):
+            return
+        metrics = flow_metrics_kernel(window['strikes'], window['Net_GEX'], window['Net_DEX'], window['futures'],
+                                      window['Call_OI'], window['Put_OI'])
+        values = np.column_stack([metrics[f] for f in HISTORY_FIELDS])
+        for ts, row in zip(window['timestamps'].astype(datetime), values):
+            series.append(ts.timestamp(), row)
+
+    def record(self, meta: Dict, metrics: Dict, key_levels: Dict, gamma_flips: List[Dict]) -> bool:
+        ts = datetime.strptime(meta['timestamp'], SNAPSHOT_TS_FORMAT)
+        series = self.series(meta['symbol'], meta['expiry'], ts.strftime('%Y-%m-%d'))
+        values = self.snapshot_values(metrics, key_levels, gamma_flips, meta['futures_price'])
+        return series.append(ts.timestamp(), values)
+
+@st.cache_resource
+def get_exposure_history() -> ExposureHistory:
+    return ExposureHistory(get_snapshot_store())
+
+# ============================================================================
+# EXPOSURE HEATMAP
+# ============================================================================
+
+SESSION_OPEN, SESSION_CLOSE = '09:15', '15:30'
+HEATMAP_FIELDS = {'Net_GEX': 'sum', 'Net_DEX': 'sum', 'Hedging_Pressure': 'mean'}
+HEATMAP_TIME_BINS = 125
+HEATMAP_MAX_ROWS = 60
+HEATMAP_CACHE_SIZE = 32
+
+class HeatmapGrid:
+    # Fixed-resolution strike x time accumulator for one field and day. A time
+    # bin averages the snapshots that land in it; a strike row aggregates a
+    # step-wide bucket of strikes (sum for exposures, mean for percentages).
+    # New snapshots only touch their own column. The strike axis pads when the
+    # ladder drifts and halves its resolution instead of growing past max_rows,
+    # so the matrix sent to the browser is at most max_rows x time_bins.
+    def __init__(self, field: str, day: str, strike_interval: float, time_bins: int = HEATMAP_TIME_BINS,
+                 max_rows: int = HEATMAP_MAX_ROWS):
+        self.field = field
+        self.how = HEATMAP_FIELDS.get(field, 'sum')
+        self.time_bins = time_bins
+        self.max_rows = max_rows
+        self.start = np.datetime64(f"{day}T{SESSION_OPEN}")
+        session = (np.datetime64(f"{day}T{SESSION_CLOSE}") - self.start) / np.timedelta64(1, 's')
+        self.bin_seconds = session / time_bins
+        self.step = float(strike_interval)
+        self.origin = None
+        self.sums = np.zeros((0, time_bins))
+        self.counts = np.zeros((0, time_bins))
+        self.snapshots = np.zeros(time_bins)
+        self.futures = np.zeros(time_bins)
+        self.last_ts = None
+
+    def __len__(self) -> int:
+        return int(self.snapshots.sum())
+
+    def _cover(self, strikes: np.ndarray):
+        if not len(strikes):
+            return
+        lo, hi = strikes.min(), strikes.max()
+        if self.origin is None:
+            self.origin = np.floor(lo / self.step) * self.step
+        if lo < self.origin:
+            pad = int(np.ceil((self.origin - lo) / self.step))
+            self.sums = np.pad(self.sums, ((pad, 0), (0, 0)))
+            self.counts = np.pad(self.counts, ((pad, 0), (0, 0)))
+            self.origin -= pad * self.step
+        needed = int((hi - self.origin) // self.step) + 1
+        if needed > len(self.sums):
+            self.sums = np.pad(self.sums, ((0, needed - len(self.sums)), (0, 0)))
+            self.counts = np.pad(self.counts, ((0, needed - len(self.counts)), (0, 0)))
+        while len(self.sums) > self.max_rows:
+            odd = len(self.sums) % 2
+            self.sums = np.pad(self.sums, ((0, odd), (0, 0))).reshape(-1, 2, self.time_bins).sum(axis=1)
+            self.counts = np.pad(self.counts, ((0, odd), (0, 0))).reshape(-1, 2, self.time_bins).sum(axis=1)
+            self.step *= 2
+
+    def add(self, timestamps: np.ndarray, strikes: np.ndarray, values: np.ndarray, futures: np.ndarray):
+        # timestamps (T,) datetime64, strikes (S,), values (T, S) with NaN for uncovered strikes.
+        values = np.atleast_2d(values)
+        valid = ~np.isnan(values)
+        if self.field == 'Hedging_Pressure':
+            peak = np.max(np.abs(np.where(valid, values, 0)), axis=1, keepdims=True)
+            values = np.where(valid, np.divide(values, peak, out=np.zeros_like(values), where=peak > 0) * 100, np.nan)
+        self._cover(strikes[valid.any(axis=0)])
+        if self.origin is None:
+            return
+        cols = ((timestamps - self.start) / np.timedelta64(1, 's') // self.bin_seconds).astype(int)
+        cols = np.clip(cols, 0, self.time_bins - 1)
+        rows = ((strikes - self.origin) // self.step).astype(int)
+        cells = (np.broadcast_to(rows, values.shape)[valid], np.broadcast_to(cols[:, None], values.shape)[valid])
+        np.add.at(self.sums, cells, values[valid])
+        np.add.at(self.counts, cells, 1)
+        np.add.at(self.snapshots, cols, 1)
+        np.add.at(self.futures, cols, futures)
+        self.last_ts = timestamps[-1]
+
+    def matrix(self) -> Dict[str, np.ndarray]:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.how == 'mean':
+                z = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+            else:
+                z = np.where(self.counts > 0, self.sums / self.snapshots, np.nan)
+            futures = np.where(self.snapshots > 0, self.futures / self.snapshots, np.nan)
+        origin = self.origin if self.origin is not None else 0.0
+        return {
+            'strikes': origin + self.step * np.arange(len(self.sums)),
+            'times': self.start + (np.arange(self.time_bins) * self.bin_seconds + self.bin_seconds / 2).astype('timedelta64[s]'),
+            'z': z, 'futures': futures, 'step': self.step,
+        }
+
+class ExposureHeatmaps:
+    # Grids keyed by (symbol, expiry, day, field, resolution). Each call pulls only
+    # snapshots newer than the grid's last column from the history index.
+    def __init__(self, index: HistoryIndex):
+        self.index = index
+        self._grids = {}
+        self._lock = threading.Lock()
+
+    def grid(self, symbol: str, expiry: str, day: str, field: str = 'Net_GEX',
+             time_bins: int = HEATMAP_TIME_BINS, max_rows: int = HEATMAP_MAX_ROWS) -> HeatmapGrid:
+        key = (symbol, expiry, day, field, time_bins, max_rows)
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is None:
+                interval = symbol_config(symbol)['strike_interval']
+                grid = self._grids[key] = HeatmapGrid(field, day, interval, time_bins, max_rows)
+                while len(self._grids) > HEATMAP_CACHE_SIZE:
+                    self._grids.pop(next(iter(self._grids)))
+            day_start = datetime.strptime(day, '%Y-%m-%d')
+            start = day_start if grid.last_ts is None else grid.last_ts.astype(datetime) + timedelta(seconds=1)
+            column = 'Net_GEX' if field == 'Hedging_Pressure' else field
+            window = self.index.range(symbol, expiry, start, day_start + timedelta(days=1) - timedelta(seconds=1),
+                                      columns=[column])
+            if len(window['timestamps']):
+                grid.add(window['timestamps'], window['strikes'], window[column], window['futures'])
+            return grid
+
+@st.cache_resource
+def get_exposure_heatmaps() -> ExposureHeatmaps:
+    return ExposureHeatmaps(get_history_index())
+
+# ============================================================================
+# VOLATILITY SURFACE
+# ============================================================================
+
+# Raw SVI on total variance: w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2)), k = ln(K / F)
+SVI_LOWER = np.array([-0.5, 1e-6, -0.999, -1.0, 1e-4])
+SVI_UPPER = np.array([0.5, 5.0, 0.999, 1.0, 2.0])
+SVI_MIN_POINTS = 5
+SURFACE_RISK_FREE_RATE = 0.07
+SURFACE_CACHE_SIZE = 256
+
+def svi_total_variance(params: np.ndarray, k: np.ndarray) -> np.ndarray:
+    a, b, rho, m, sigma = params
+    return a + b * (rho * (k - m) + np.sqrt((k - m) ** 2 + sigma ** 2))
+
+def smile_points(df: pd.DataFrame, futures_price: float, T: float) -> Tuple[np.ndarray, np.ndarray]:
+    # Out-of-the-money quotes (puts below the forward, calls above), falling back to
+    # the other leg where the OTM quote is missing. Returns (log-moneyness, total variance).
+    strikes = df['Strike'].to_numpy(dtype=np.float64)
+    call_iv, put_iv = df['Call_IV'].to_numpy(dtype=np.float64), df['Put_IV'].to_numpy(dtype=np.float64)
+    otm, itm = np.where(strikes < futures_price, put_iv, call_iv), np.where(strikes < futures_price, call_iv, put_iv)
+    iv = np.where(otm > 0, otm, itm)
+    ok = (iv > 0) & (strikes > 0)
+    sigma = iv_to_decimal(iv[ok])
+    return np.log(strikes[ok] / futures_price), sigma ** 2 * T
+
+def fit_svi(k: np.ndarray, w: np.ndarray, x0: np.ndarray = None) -> Tuple[np.ndarray, float, int]:
+    if x0 is None:
+        x0 = np.array([max(w.min() * 0.5, 1e-6), 0.1, -0.3, 0.0, 0.1])
+    x0 = np.clip(x0, SVI_LOWER + 1e-9, SVI_UPPER - 1e-9)
+    
+    def residuals(p):
+        # Last term keeps the smile's minimum total variance non-negative.
+        floor = p[0] + p[1] * p[4] * np.sqrt(1 - p[2] ** 2)
+        return np.append(svi_total_variance(p, k) - w, 10 * min(floor, 0.0))
+    
+    result = least_squares(residuals, x0, bounds=(SVI_LOWER, SVI_UPPER), method='trf', x_scale='jac')
+    rmse = float(np.sqrt(np.mean(result.fun[:-1] ** 2)))
+    return result.x, rmse, int(result.nfev)
+
+@dataclass
+class SVIFit:
+    expiry: str
+    T: float
+    forward: float
+    params: np.ndarray
+    rmse: float
+    points: int
+    nfev: int
+    warm_start: bool
+    timestamp: str = ""
+
+    def total_variance(self, k: np.ndarray) -> np.ndarray:
+        return np.maximum(svi_total_variance(self.params, k), 1e-10)
+
+    def iv(self, strikes: np.ndarray) -> np.ndarray:
+        return np.sqrt(self.total_variance(np.log(np.asarray(strikes, dtype=np.float64) / self.forward)) / self.T)
+
+class VolSurface:
+    # Per-expiry SVI smiles stitched in total variance: linear in T between fitted
+    # expiries at fixed log-moneyness, constant implied vol outside them. Inputs
+    # broadcast, so a whole scenario grid is one call.
+    def __init__(self, symbol: str, spot_price: float, fits: List[SVIFit],
+                 risk_free_rate: float = SURFACE_RISK_FREE_RATE):
+        self.symbol = symbol
+        self.spot_price = spot_price
+        self.fits = sorted(fits, key=lambda f: f.T)
+        self.risk_free_rate = risk_free_rate
+        self.T = np.array([f.T for f in self.fits])
+
+    def __len__(self) -> int:
+        return len(self.fits)
+
+    def forward(self, T: np.ndarray) -> np.ndarray:
+        return self.spot_price * np.exp(self.risk_free_rate * np.asarray(T, dtype=np.float64))
+
+    def total_variance(self, strikes: np.ndarray, T: np.ndarray) -> np.ndarray:
+        K, T = np.broadcast_arrays(np.asarray(strikes, dtype=np.float64), np.asarray(T, dtype=np.float64))
+        T = np.maximum(T, 1e-6)
+        k = np.log(K / self.forward(T))
+        W = np.stack([f.total_variance(k) for f in self.fits])
+        if len(self.fits) == 1:
+            return W[0] * T / self.T[0]
+        upper = np.clip(np.searchsorted(self.T, T), 1, len(self.T) - 1)
+        w0 = np.take_along_axis(W, (upper - 1)[None], axis=0)[0]
+        w1 = np.take_along_axis(W, upper[None], axis=0)[0]
+        t0, t1 = self.T[upper - 1], self.T[upper]
+        inside = w0 + (T - t0) / (t1 - t0) * (w1 - w0)
+        return np.where(T <= self.T[0], W[0] * T / self.T[0], np.where(T >= self.T[-1], W[-1] * T / self.T[-1], inside))
+
+    def iv(self, strikes: np.ndarray, T: np.ndarray) -> np.ndarray:
+        K, T = np.broadcast_arrays(np.asarray(strikes, dtype=np.float64), np.asarray(T, dtype=np.float64))
+        return np.sqrt(self.total_variance(K, T) / np.maximum(T, 1e-6))
+
+class VolSurfaceBuilder:
+    # Fits are cached per (symbol, expiry, snapshot timestamp), so reruns on the same
+    # snapshot cost nothing, and each new fit starts from that expiry's last parameters.
+    def __init__(self, store: SnapshotStore = None):
+        self.store = store
+        self._fits = {}
+        self._params = {}
+        self._lock = threading.Lock()
+        self.last_elapsed = 0.0
+
+    def fit_expiry(self, symbol: str, df: pd.DataFrame, meta: Dict, T: float) -> Optional[SVIFit]:
+        key = (symbol, meta['expiry'], meta['timestamp'], round(T, 8))
+        with self._lock:
+            if key in self._fits:
+                return self._fits[key]
+            k, w = smile_points(df, meta['futures_price'], T)
+            if len(k) < SVI_MIN_POINTS:
+                return None
+            previous = self._params.get((symbol, meta['expiry']))
+            with get_perf_recorder().span('compute.svi_fit'):
+                params, rmse, nfev = fit_svi(k, w, previous)
+            fit = SVIFit(meta['expiry'], T, meta['futures_price'], params, rmse, len(k), nfev, previous is not None,
+                         meta['timestamp'])
+            self._params[(symbol, meta['expiry'])] = params
+            self._fits[key] = fit
+            while len(self._fits) > SURFACE_CACHE_SIZE:
+                self._fits.pop(next(iter(self._fits)))
+            return fit
+
+    def surface(self, symbol: str, df: pd.DataFrame, meta: Dict) -> VolSurface:
+        # The current chain plus the latest stored snapshot of every other listed expiry.
+        started = time.perf_counter()
+        now = datetime.strptime(meta['timestamp'], SNAPSHOT_TS_FORMAT)
+        
+        def year_fraction(expiry):
+            try:
+                return max((datetime.strptime(expiry, "%Y-%m-%d") - now).days, 1) / 365
+            except ValueError:
+                return meta['days_to_expiry'] / 365
+        
+        fits = [self.fit_expiry(symbol, df, meta, meta['days_to_expiry'] / 365)]
+        if self.store is not None:
+            for expiry in meta.get('expiry_list') or []:
+                if expiry == meta['expiry'] or not (self.store.root / symbol / expiry).exists():
+                    continue
+                other_df, other_meta = self.store.latest(symbol, expiry)
+                if other_df is not None:
+                    fits.append(self.fit_expiry(symbol, other_df, other_meta, year_fraction(expiry)))
+        self.last_elapsed = time.perf_counter() - started
+        return VolSurface(symbol, meta['spot_price'], [f for f in fits if f is not None])
+
+def reprice_with_surface(df: pd.DataFrame, meta: Dict, surface: VolSurface) -> pd.DataFrame:
+    # Rebuilds Greeks and exposures from surface IVs; quoted IV/LTP columns are kept as-is.
+    config = symbol_config(meta['symbol'])
+    strikes = df['Strike'].to_numpy(dtype=np.float64)
+    T = meta['days_to_expiry'] / 365
+    iv = surface.iv(strikes, T) * 100
+    raw = {'strikes': strikes}
+    for side, prefix in (('ce', 'Call'), ('pe', 'Put')):
+        oi = df[f'{prefix}_OI'].to_numpy(dtype=np.float64)
+        raw[side] = {'oi': oi, 'previous_oi': oi - df[f'{prefix}_OI_Change'].to_numpy(dtype=np.float64),
+                     'volume': df[f'{prefix}_Volume'].to_numpy(dtype=np.float64),
+                     'iv': df[f'{prefix}_IV'].to_numpy(dtype=np.float64), 'ltp': df[f'{prefix}_LTP'].to_numpy(dtype=np.float64)}
+    greeks = chain_greeks(meta['futures_price'], strikes, T, surface.risk_free_rate, iv, iv)
+    return build_chain_frame(raw, greeks, meta['futures_price'], config['contract_size'])
+
+@st.cache_resource
+def get_vol_surface_builder() -> VolSurfaceBuilder:
+    return VolSurfaceBuilder(get_snapshot_store())
+
+# ============================================================================
+# STRATEGY RULES
+# ============================================================================
+
+@dataclass
+class StrategyLeg:
+    option_type: str
+    strike: float
+    quantity: int
+    entry_price: float = 0.0
+
+# Legs as (option type, strike offset in strike intervals from ATM, quantity in lots)
+STRATEGY_STRUCTURES = {
+    'iron_condor': [('CE', 2, -1), ('CE', 4, 1), ('PE', -2, -1), ('PE', -4, 1)],
+    'short_straddle': [('CE', 0, -1), ('PE', 0, -1)],
+    'long_straddle': [('CE', 0, 1), ('PE', 0, 1)],
+    'bull_call_spread': [('CE', 0, 1), ('CE', 2, -1)],
+    'bear_put_spread': [('PE', 0, 1), ('PE', -2, -1)],
+}
+
+STRATEGY_NAMES = {
+    'iron_condor': "Iron Condor", 'short_straddle': "Short Straddle", 'long_straddle': "Long Straddle",
+    'bull_call_spread': "Bull Call Spread", 'bear_put_spread': "Bear Put Spread",
+}
+
+def classify_regime(gex_bias: float) -> Tuple[str, str]:
+    if gex_bias > 50:
+        return "Low Volatility / Mean Reversion", "#10b981"
+    elif gex_bias < -50:
+        return "High Volatility / Trending", "#ef4444"
+    return "Transitional / Mixed", "#f59e0b"
+
+def recommend_structures(gex_bias: float, dex_bias: float) -> List[str]:
+    if gex_bias > 50:
+        return ['iron_condor', 'short_straddle']
+    elif gex_bias < -50:
+        structures = ['long_straddle']
+        if dex_bias > 20:
+            structures.append('bull_call_spread')
+        elif dex_bias < -20:
+            structures.append('bear_put_spread')
+        return structures
+    return []
+
+def option_ltp(df: pd.DataFrame, option_type: str, strike: float) -> Optional[float]:
+    column = 'Call_LTP' if option_type == 'CE' else 'Put_LTP'
+    match = df.loc[df['Strike'] == strike, column]
+    if match.empty or not match.iloc[0] > 0:
+        return None
+    return float(match.iloc[0])
+
+def build_structure_legs(structure: str, df: pd.DataFrame, atm_strike: float, strike_interval: float) -> Optional[List[StrategyLeg]]:
+    legs = []
+    for option_type, offset, quantity in STRATEGY_STRUCTURES[structure]:
+        strike = atm_strike + offset * strike_interval
+        price = option_ltp(df, option_type, strike)
+        if price is None:
+            return None
+        legs.append(StrategyLeg(option_type, strike, quantity, price))
+    return legs
+
+def mark_legs(legs: List[StrategyLeg], df: pd.DataFrame, last_marks: List[float]) -> List[float]:
+    # Strikes can drift out of the fetched window; keep the last known price for those legs.
+    return [option_ltp(df, leg.option_type, leg.strike) or last for leg, last in zip(legs, last_marks)]
+
+# ============================================================================
+# STRATEGY EVALUATOR
+# ============================================================================
+
+STRATEGY_RISK_FREE_RATE = 0.07
+STRATEGY_GREEKS = ['delta', 'gamma', 'vega', 'theta']
+
+def bs_price_greeks(S: np.ndarray, K: np.ndarray, T: np.ndarray, r: float, sigma: np.ndarray,
+                    is_call: np.ndarray) -> Dict[str, np.ndarray]:
+    # Broadcasting Black-Scholes on the futures level, as in chain_greeks. Vega is per
+    # vol point and theta per calendar day; at T <= 0 the leg is worth its intrinsic value.
+    S, K, T, sigma, is_call = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (S, K, T, sigma, is_call)))
+    is_call = is_call.astype(bool)
+    live = (T > 0) & (sigma > 0)
+    T_safe, sigma_safe = np.where(live, T, 1.0), np.where(live, sigma, 1.0)
+    sqrt_T = np.sqrt(T_safe)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma_safe ** 2) * T_safe) / (sigma_safe * sqrt_T)
+    d2 = d1 - sigma_safe * sqrt_T
+    pdf = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+    discount = K * np.exp(-r * T_safe)
+    call_value = S * ndtr(d1) - discount * ndtr(d2)
+    value = np.where(is_call, call_value, call_value - S + discount)
+    delta = np.where(is_call, ndtr(d1), ndtr(d1) - 1)
+    call_theta = -S * pdf * sigma_safe / (2 * sqrt_T) - r * discount * ndtr(d2)
+    theta = np.where(is_call, call_theta, call_theta + r * discount)
+    intrinsic = np.maximum(np.where(is_call, S - K, K - S), 0)
+    return {
+        'value': np.where(live, value, intrinsic),
+        'delta': np.where(live, delta, np.where(is_call, (S > K) * 1.0, (S < K) * -1.0)),
+        'gamma': np.where(live, pdf / (S * sigma_safe * sqrt_T), 0.0),
+        'vega': np.where(live, S * pdf * sqrt_T / 100, 0.0),
+        'theta': np.where(live, theta / 365, 0.0),
+    }
+
+def leg_ivs(legs: List[StrategyLeg], df: pd.DataFrame) -> np.ndarray:
+    ivs = []
+    for leg in legs:
+        match = df.loc[df['Strike'] == leg.strike, 'Call_IV' if leg.option_type == 'CE' else 'Put_IV']
+        ivs.append(float(match.iloc[0]) if not match.empty else 0.0)
+    return iv_to_decimal(np.array(ivs, dtype=np.float64))
+
+def evaluate_strategy(legs: List[StrategyLeg], spots: np.ndarray, days_to_expiry: np.ndarray, iv_shifts: np.ndarray,
+                      leg_iv: np.ndarray, multiplier: float = 1.0, surface: 'VolSurface' = None,
+                      risk_free_rate: float = STRATEGY_RISK_FREE_RATE) -> Dict[str, np.ndarray]:
+    # One pass over a (spot, days to expiry, IV shift, leg) block; legs are summed out so
+    # every returned array is (len(spots), len(days_to_expiry), len(iv_shifts)).
+    # IV shifts are absolute (0.01 = one vol point); with a surface, each leg's vol
+    # follows the surface's term structure as days run off.
+    S = np.asarray(spots, dtype=np.float64)[:, None, None, None]
+    T = np.maximum(np.asarray(days_to_expiry, dtype=np.float64), 0)[None, :, None, None] / 365
+    shift = np.asarray(iv_shifts, dtype=np.float64)[None, None, :, None]
+    K = np.array([leg.strike for leg in legs], dtype=np.float64)[None, None, None, :]
+    base_iv = surface.iv(K, np.maximum(T, 1 / 365)) if surface is not None and len(surface) else np.asarray(leg_iv)[None, None, None, :]
+    sigma = np.maximum(base_iv + shift, 0.005)
+    is_call = np.array([leg.option_type == 'CE' for leg in legs])[None, None, None, :]
+    quantity = np.array([leg.quantity for leg in legs], dtype=np.float64) * multiplier
+    entry = np.array([leg.entry_price for leg in legs], dtype=np.float64)
+    legs_out = bs_price_greeks(S, K, T, risk_free_rate, sigma, is_call)
+    result = {'pnl': ((legs_out['value'] - entry) * quantity).sum(axis=-1),
+              'value': (legs_out['value'] * quantity).sum(axis=-1)}
+    for greek in STRATEGY_GREEKS:
+        result[greek] = (legs_out[greek] * quantity).sum(axis=-1)
+    return result
+
+def strategy_horizons(days_to_expiry: float, elapsed: float = 0.0) -> Tuple[np.ndarray, List[str]]:
+    # Days left at each payoff curve: now (or the time-machine date), halfway to expiry,
+    # the day before expiry, then expiry. Dated curves within half a day of the previous
+    # one are dropped, so short-dated chains just show now and expiry.
+    remaining = max(float(days_to_expiry) - elapsed, 0.0)
+    days, labels = [remaining], [f"T+{elapsed:g}d" if elapsed else "Now"]
+    for left, label in ((remaining / 2, f"Halfway ({remaining / 2:.1f}d left)"), (1.0, "1d to Expiry")):
+        if 0 < left < days[-1] - 0.5:
+            days.append(left)
+            labels.append(label)
+    return np.array(days + [0.0]), labels + ["Expiry"]
+
+def expiry_breakevens(spots: np.ndarray, pnl: np.ndarray) -> List[float]:
+    crossing = np.flatnonzero(np.sign(pnl[:-1]) * np.sign(pnl[1:]) < 0)
+    return [float(spots[i] - pnl[i] * (spots[i + 1] - spots[i]) / (pnl[i + 1] - pnl[i])) for i in crossing]
+
+# ============================================================================
+# HEDGE FLOW ESTIMATOR
+# ============================================================================
+
+HEDGE_SHOCKS = np.array([-0.02, -0.01, -0.005, 0.005, 0.01, 0.02])
+# Change in IV (decimal) per unit relative spot move; -0.5 adds 0.5 vol pts on a 1% drop.
+HEDGE_IV_SPOT_BETA = float(os.environ.get("GEX_IV_SPOT_BETA", "-0.5"))
+HEDGE_RISK_FREE_RATE = 0.07
+HEDGE_COMPONENTS = ['gamma', 'vanna', 'charm']
+
+def session_fraction_left(timestamp: str) -> float:
+    # Share of the trading session still to run; charm is applied over this much of a day.
+    now = datetime.strptime(timestamp, SNAPSHOT_TS_FORMAT)
+    open_, close = (datetime.combine(now.date(), datetime.strptime(t, '%H:%M').time()) for t in (SESSION_OPEN, SESSION_CLOSE))
+    return float(np.clip((close - now) / (close - open_), 0.0, 1.0))
+
+def estimate_hedge_flow(df: pd.DataFrame, meta: Dict, shocks: np.ndarray = HEDGE_SHOCKS,
+                        iv_spot_beta: float = HEDGE_IV_SPOT_BETA,
+                        risk_free_rate: float = HEDGE_RISK_FREE_RATE) -> Dict[str, np.ndarray]:
+    # Dealers are taken as long calls / short puts, as in Net_GEX. Every strike's delta is
+    # re-priced over a (shock, strike) block at F(1+s), IV + beta*s and T less the rest of
+    # the session, one input at a time, so the gamma, vanna and charm pieces sum to the
+    # total. Flows are the futures dealers must trade to re-hedge, in ₹B (+ buy, - sell).
+    F = meta['futures_price']
+    contract_size = symbol_config(meta['symbol'])['contract_size']
+    shocks = np.asarray(shocks, dtype=np.float64)[:, None, None]
+    K = df['Strike'].to_numpy(dtype=np.float64)[None, None, :]
+    is_call = np.array([True, False])[None, :, None]
+    sigma = iv_to_decimal(np.stack([df['Call_IV'].to_numpy(dtype=np.float64),
+                                    df['Put_IV'].to_numpy(dtype=np.float64)]))[None]
+    T = meta['days_to_expiry'] / 365
+    T_after = max(T - session_fraction_left(meta['timestamp']) / 365, 0.0)
+    position = np.stack([df['Call_OI'].to_numpy(dtype=np.float64),
+                         -df['Put_OI'].to_numpy(dtype=np.float64)])[None] * contract_size
+    shocked_F, shocked_sigma = F * (1 + shocks), np.maximum(sigma + iv_spot_beta * shocks, 0.005)
+    steps = [(F, sigma, T), (shocked_F, sigma, T), (shocked_F, shocked_sigma, T), (shocked_F, shocked_sigma, T_after)]
+    deltas = [bs_price_greeks(S, K, t, risk_free_rate, vol, is_call)['delta'] for S, vol, t in steps]
+    flows = {name: -((after - before) * position).sum(axis=1) * shocked_F[:, 0] / 1e9
+             for name, before, after in zip(HEDGE_COMPONENTS, deltas, deltas[1:])}
+    by_strike = sum(flows.values())
+    result = {'shocks': shocks[:, 0, 0], 'strikes': K[0, 0], 'by_strike': by_strike, 'total': by_strike.sum(axis=1)}
+    result.update({name: flow.sum(axis=1) for name, flow in flows.items()})
+    return result
+
+def hedge_flow_record(flow: Dict[str, np.ndarray]) -> Dict[str, float]:
+    # Flat per-shock totals for the signal record, e.g. hedge_flow_up_100bp.
+    return {f"hedge_flow_{'up' if s > 0 else 'down'}_{abs(s) * 1e4:.0f}bp": float(v)
+            for s, v in zip(flow['shocks'], flow['total'])}
+
+# ============================================================================
+# BACKTEST ENGINE
+# ============================================================================
+
+BACKTEST_DAYS_PER_WORKER = 4
+
+@dataclass
+class BacktestParams:
+    entry_after: str = "09:30"
+    exit_before: str = "15:20"
+    lots: int = 1
+    exit_on_signal_change: bool = True
+
+def _close_trade(position: Dict, marks: List[float], exit_time: str, reason: str, lot_size: int, lots: int) -> Dict:
+    points = sum(leg.quantity * (mark - leg.entry_price) for leg, mark in zip(position['legs'], marks))
+    return {
+        'day': position['entry_time'][:10], 'structure': position['structure'],
+        'entry_time': position['entry_time'], 'exit_time': exit_time, 'exit_reason': reason,
+        'entry_gex': position['entry_gex'], 'entry_dex': position['entry_dex'],
+        'legs': " | ".join(f"{'+' if l.quantity > 0 else ''}{l.quantity} {l.strike:,.0f}{l.option_type} @ {l.entry_price:.2f}"
+                           for l in position['legs']),
+        'points': points, 'pnl': points * lot_size * lots,
+    }
+
+def backtest_day(store_root: str, symbol: str, day: str, expiry: str = None, params: BacktestParams = None) -> Dict:
+    params = params or BacktestParams()
+    store = open_snapshot_store(store_root)
+    if expiry is None:
+        candidates = [e for e in store.expiries(symbol) if e >= day and (store.root / symbol / e / day).exists()]
+        if not candidates:
+            return {'day': day, 'snapshots': 0, 'trades': []}
+        expiry = candidates[0]
+
+    config = symbol_config(symbol)
+    start = datetime.strptime(day, '%Y-%m-%d')
+    end = start + timedelta(days=1) - timedelta(seconds=1)
+    position, trades, n_snapshots = None, [], 0
+
+    for df, meta in store.iter_snapshots(symbol, expiry, start, end):
+        n_snapshots += 1
+        clock = meta['timestamp'][11:16]
+        metrics = calculate_flow_metrics(df, meta['futures_price'])
+        structures = recommend_structures(metrics['gex_near_total'], metrics['dex_near_total'])
+
+        if position is not None:
+            position['marks'] = mark_legs(position['legs'], df, position['marks'])
+            position['last_time'] = meta['timestamp']
+            if clock >= params.exit_before:
+                reason = "Session end"
+            elif params.exit_on_signal_change and position['structure'] not in structures:
+                reason = "Signal change"
+            else:
+                continue
+            trades.append(_close_trade(position, position['marks'], meta['timestamp'], reason, config['lot_size'], params.lots))
+            position = None
+        elif structures and params.entry_after <= clock < params.exit_before:
+            legs = build_structure_legs(structures[0], df, meta['atm_strike'], config['strike_interval'])
+            if legs:
+                position = {'structure': structures[0], 'legs': legs, 'marks': [l.entry_price for l in legs],
+                            'entry_time': meta['timestamp'], 'last_time': meta['timestamp'],
+                            'entry_gex': metrics['gex_near_total'], 'entry_dex': metrics['dex_near_total']}
+
+    if position is not None:
+        trades.append(_close_trade(position, position['marks'], position['last_time'], "Data end", config['lot_size'], params.lots))
+    return {'day': day, 'expiry': expiry, 'snapshots': n_snapshots, 'trades': trades}
+
+def backtest_statistics(trades: pd.DataFrame) -> Dict:
+    if trades.empty:
+        return {'trades': 0, 'total_pnl': 0.0, 'win_rate': 0.0, 'avg_pnl': 0.0, 'avg_win': 0.0, 'avg_loss': 0.0,
+                'profit_factor': 0.0, 'max_drawdown': 0.0, 'sharpe': 0.0, 'by_structure': pd.DataFrame()}
+    pnl = trades['pnl']
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    equity = pnl.cumsum()
+    daily = trades.groupby('day')['pnl'].sum()
+    sharpe = daily.mean() / daily.std() * np.sqrt(252) if len(daily) > 1 and daily.std() > 0 else 0.0
+    by_structure = trades.groupby('structure')['pnl'].agg(['count', 'sum', 'mean', lambda x: (x > 0).mean() * 100])
+    by_structure.columns = ['Trades', 'Total_PnL', 'Avg_PnL', 'Win_Rate']
+    return {
+        'trades': len(trades), 'total_pnl': pnl.sum(), 'win_rate': len(wins) / len(trades) * 100,
+        'avg_pnl': pnl.mean(), 'avg_win': wins.mean() if len(wins) else 0.0,
+        'avg_loss': losses.mean() if len(losses) else 0.0,
+        'profit_factor': wins.sum() / abs(losses.sum()) if losses.sum() < 0 else float('inf'),
+        'max_drawdown': (equity - equity.cummax()).min(), 'sharpe': sharpe,
+        'by_structure': by_structure.reset_index().assign(structure=lambda d: d['structure'].map(STRATEGY_NAMES)),
+    }
+
+def run_backtest(symbol: str, start_day: str, end_day: str, expiry: str = None, params: BacktestParams = None,
+                 workers: int = None, store_root: str = SNAPSHOT_DIR) -> Dict:
+    # Days are independent (positions never carry overnight), so they are spread
+    # over worker processes (see backtest_worker.py). A spawned worker pays a few
+    # seconds of imports, so each one needs several days to be worth starting.
+    started = time.perf_counter()
+    days = [d for d in open_snapshot_store(store_root).days(symbol, expiry) if start_day <= d <= end_day]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(days) // BACKTEST_DAYS_PER_WORKER))
+    if workers == 1:
+        day_results = [backtest_day(store_root, symbol, day, expiry, params) for day in days]
+    else:
+        from backtest_worker import backtest_day_job
+        jobs = [(store_root, symbol, day, expiry, asdict(params) if params else None) for day in days]
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            day_results = list(pool.map(backtest_day_job, jobs))
+    trades = pd.DataFrame([t for r in day_results for t in r['trades']])
+    if not trades.empty:
+        trades = trades.sort_values('entry_time').reset_index(drop=True)
+    return {
+        'symbol': symbol, 'days': len(days), 'snapshots': sum(r['snapshots'] for r in day_results),
+        'trades': trades, 'stats': backtest_statistics(trades),
+        'elapsed': time.perf_counter() - started, 'workers': workers,
+    }
+
+# ============================================================================
+# SNAPSHOT PIPELINE
+# ============================================================================
+
+def ingest_snapshot(df: pd.DataFrame, meta: Dict) -> CompactChain:
+    # Everything that happens once per fresh snapshot, whichever path produced it.
+    perf = get_perf_recorder()
+    chain = CompactChain.from_frame(df)
+    try:
+        with perf.span('store.save'):
+            get_snapshot_store().save(chain, meta)
+    except OSError as e:
+        perf.record_error('store.save', e)
+    snap_metrics = calculate_flow_metrics(df, meta['futures_price'])
+    snap_levels = calculate_key_levels(df, meta['futures_price'])
+    snap_flips = detect_gamma_flip_zones(df)
+    with perf.span('compute.hedge_flow'):
+        snap_flow = estimate_hedge_flow(df, meta)
+    signals = build_signal_record(snap_metrics, snap_levels, snap_flips, snap_flow)
+    with perf.span('alerts.evaluate'):
+        get_alert_engine().evaluate(meta['symbol'], meta['expiry'], signals, meta['timestamp'])
+    with perf.span('history.record'):
+        get_exposure_history().record(meta, snap_metrics, snap_levels, snap_flips)
+    publisher = get_snapshot_publisher()
+    if publisher is not None:
+        with perf.span('publish.snapshot'):
+            publisher.publish(df, meta, signals)
+    return chain
+
+# ============================================================================
+# STREAMING INGESTION
+# ============================================================================
+
+FEED_ADDRESS = os.environ.get("GEX_FEED_ADDR", "127.0.0.1:9100")
+STREAM_PUBLISH_HZ = float(os.environ.get("GEX_STREAM_PUBLISH_HZ", "1.0"))
+STREAM_STRIKES_RANGE = 20
+SPOT_RECOMPUTE_TOLERANCE = 0.0005
+# Streamed snapshots refresh the in-memory view at STREAM_PUBLISH_HZ, but are only
+# ingested (stored, alerted on, recorded, published downstream) at the polling
+# cadence, or sooner on a material change: futures moving this much, or net GEX
+# changing sign.
+STREAM_INGEST_INTERVAL = float(os.environ.get("GEX_STREAM_INGEST_INTERVAL", "180"))
+STREAM_INGEST_MOVE = 0.002
+
+# Feed messages are newline-delimited JSON, each line one update or a list of them:
+#   {"s": "NIFTY", "e": "2026-10-22", "k": 25000.0, "t": "CE", "oi": 1200, "ltp": 85.5, "iv": 13.2, "v": 5400}
+#   {"s": "NIFTY", "t": "IDX", "ltp": 25012.4}
+FEED_LEG_FIELDS = {'oi': 'oi', 'ltp': 'ltp', 'iv': 'iv', 'v': 'volume'}
+
+class LiveChain:
+    # Mutable per-strike arrays for one (symbol, expiry). IV ticks mark a strike
+    # dirty; only dirty strikes are re-priced when a snapshot is taken, unless
+    # futures drift past SPOT_RECOMPUTE_TOLERANCE or the expiry day count rolls.
+    def __init__(self, symbol: str, expiry: str, raw: Dict, spot_price: float, expiry_list: List[str] = None,
+                 now_fn=datetime.now, risk_free_rate: float = 0.07):
+        config = symbol_config(symbol)
+        self.symbol = symbol
+        self.expiry = expiry
+        self.expiry_list = expiry_list or [expiry]
+        self.contract_size = config['contract_size']
+        self.raw = raw
+        self.strike_pos = {float(k): i for i, k in enumerate(raw['strikes'])}
+        self.spot_price = spot_price
+        self.now_fn = now_fn
+        self.risk_free_rate = risk_free_rate
+        self.greeks = None
+        self.dirty = np.ones(len(raw['strikes']), dtype=bool)
+        self._greeks_futures = None
+        self._greeks_days = None
+        self.version = 0
+        self.published_version = -1
+        self.updates = 0
+        self.repriced = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_option_chain(cls, symbol: str, expiry: str, oc_data: Dict, expiry_list: List[str] = None,
+                          strikes_range: int = STREAM_STRIKES_RANGE, now_fn=datetime.now) -> Optional['LiveChain']:
+        config = symbol_config(symbol)
+        chain = cls(symbol, expiry, {'strikes': np.zeros(0)}, oc_data.get('last_price', 0), expiry_list, now_fn)
+        raw = parse_option_chain(oc_data.get('oc', {}), chain.futures_price(), config['strike_interval'], strikes_range)
+        if raw is None:
+            return None
+        return cls(symbol, expiry, raw, chain.spot_price, expiry_list, now_fn)
+
+    def days_to_expiry(self) -> int:
+        try:
+            return max((datetime.strptime(self.expiry, "%Y-%m-%d") - self.now_fn()).days, 1)
+        except ValueError:
+            return 7
+
+    def futures_price(self) -> float:
+        return self.spot_price * np.exp(self.risk_free_rate * self.days_to_expiry() / 365.0)
+
+    def apply(self, update: Dict) -> bool:
+        with self._lock:
+            if update.get('t') == 'IDX':
+                self.spot_price = float(update['ltp'])
+            else:
+                pos = self.strike_pos.get(float(update.get('k', 0)))
+                if pos is None:
+                    return False
+                leg = self.raw['ce' if update.get('t') == 'CE' else 'pe']
+                for key, field in FEED_LEG_FIELDS.items():
+                    if key in update:
+                        leg[field][pos] = update[key]
+                if 'iv' in update:
+                    self.dirty[pos] = True
+            self.version += 1
+            self.updates += 1
+            return True
+
+    def snapshot(self) -> Tuple[pd.DataFrame, Dict]:
+        with self._lock:
+            futures_price = self.futures_price()
+            days = self.days_to_expiry()
+            if (self.greeks is None or days != self._greeks_days
+                    or abs(futures_price / self._greeks_futures - 1) > SPOT_RECOMPUTE_TOLERANCE):
+                self.dirty[:] = True
+                self._greeks_futures = futures_price
+                self._greeks_days = days
+            dirty = np.flatnonzero(self.dirty)
+            if len(dirty):
+                repriced = chain_greeks(self._greeks_futures, self.raw['strikes'][dirty], days / 365, self.risk_free_rate,
+                                        self.raw['ce']['iv'][dirty], self.raw['pe']['iv'][dirty])
+                if self.greeks is None:
+                    self.greeks = {k: np.zeros(len(self.dirty)) for k in repriced}
+                for k, values in repriced.items():
+                    self.greeks[k][dirty] = values
+                self.dirty[:] = False
+                self.repriced += len(dirty)
+            raw = {'strikes': self.raw['strikes'].copy(),
+                   'ce': {k: v.copy() for k, v in self.raw['ce'].items()},
+                   'pe': {k: v.copy() for k, v in self.raw['pe'].items()}}
+            greeks = {k: v.copy() for k, v in self.greeks.items()}
+            spot_price, version = self.spot_price, self.version
+            now = self.now_fn()
+
+        df = build_chain_frame(raw, greeks, futures_price, self.contract_size)
+        atm = int(np.argmin(np.abs(raw['strikes'] - futures_price)))
+        meta = {
+            'symbol': self.symbol, 'spot_price': spot_price, 'futures_price': futures_price,
+            'expiry': self.expiry, 'days_to_expiry': days,
+            'atm_strike': float(raw['strikes'][atm]), 'atm_call_premium': float(raw['ce']['ltp'][atm]),
+            'atm_put_premium': float(raw['pe']['ltp'][atm]),
+            'atm_straddle': float(raw['ce']['ltp'][atm] + raw['pe']['ltp'][atm]),
+            'expiry_list': self.expiry_list, 'timestamp': now.strftime(SNAPSHOT_TS_FORMAT),
+            'version': version, 'source': 'stream',
+        }
+        return df, meta
+
+class FeedConsumer:
+    # One reader thread applies updates as they arrive; one publisher thread
+    # turns each changed chain into a snapshot at most publish_hz times a second,
+    # so any number of ticks between publishes collapse into one recompute.
+    # on_snapshot (the ingest pipeline) only sees snapshots that are due_for_ingest.
+    def __init__(self, address: str = FEED_ADDRESS, publish_hz: float = STREAM_PUBLISH_HZ, on_snapshot=None,
+                 ingest_interval: float = STREAM_INGEST_INTERVAL):
+        host, _, port = address.rpartition(':')
+        self.host, self.port = host or '127.0.0.1', int(port)
+        self.publish_hz = publish_hz
+        self.on_snapshot = on_snapshot
+        self.ingest_interval = ingest_interval
+        self.chains = {}
+        self.latest = {}
+        self._ingested = {}
+        self.stats = defaultdict(int)
+        self.connected = False
+        self._stop = threading.Event()
+        self._threads = []
+
+    def track(self, chain: LiveChain):
+        self.chains[(chain.symbol, chain.expiry)] = chain
+
+    def latest_snapshot(self, symbol: str, expiry: str) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        return self.latest.get((symbol, expiry), (None, None))
+
+    def start(self) -> 'FeedConsumer':
+        for target in (self._read_loop, self._publish_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def apply(self, update: Dict):
+        symbol = update.get('s')
+        if update.get('t') == 'IDX':
+            targets = [c for (s, _), c in self.chains.items() if s == symbol]
+        else:
+            chain = self.chains.get((symbol, update.get('e')))
+            targets = [chain] if chain is not None else []
+        if not targets:
+            self.stats['ignored'] += 1
+        for chain in targets:
+            chain.apply(update)
+        self.stats['updates'] += 1
+
+    def apply_line(self, line: bytes):
+        # A malformed line (bad JSON, non-object element, IDX tick without ltp) is
+        # counted and skipped; it must not kill the reader or drop the rest of the recv.
+        try:
+            message = json.loads(line)
+        except ValueError:
+            self.stats['bad_messages'] += 1
+            return
+        for update in message if isinstance(message, list) else [message]:
+            try:
+                self.apply(update)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.stats['bad_messages'] += 1
+
+    def _read_loop(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                    sock.settimeout(1.0)
+                    self.connected = True
+                    self.stats['connects'] += 1
+                    backoff = 0.5
+                    buffer = b''
+                    while not self._stop.is_set():
+                        try:
+                            data = sock.recv(1 << 16)
+                        except socket.timeout:
+                            continue
+                        if not data:
+                            break
+                        buffer += data
+                        *lines, buffer = buffer.split(b'\n')
+                        for line in lines:
+                            if line:
+                                self.apply_line(line)
+            except OSError as e:
+                self.stats[f'error_{type(e).__name__}'] += 1
+            self.connected = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 10)
+
+    def _publish_loop(self):
+        interval = 1.0 / self.publish_hz if self.publish_hz > 0 else 1.0
+        while not self._stop.wait(interval):
+            self.publish()
+
+    def publish(self) -> int:
+        published = 0
+        for key, chain in list(self.chains.items()):
+            if chain.version == chain.published_version:
+                continue
+            df, meta = chain.snapshot()
+            chain.published_version = meta['version']
+            self.latest[key] = (df, meta)
+            self.stats['publishes'] += 1
+            published += 1
+            if self.on_snapshot is not None and self.due_for_ingest(key, df, meta):
+                self._ingested[key] = (time.monotonic(), meta['futures_price'], np.sign(df['Net_GEX'].sum()))
+                self.stats['ingests'] += 1
+                try:
+                    self.on_snapshot(df, meta)
+                except Exception as e:
+                    self.stats[f'callback_error_{type(e).__name__}'] += 1
+        return published
+
+    def due_for_ingest(self, key: Tuple[str, str], df: pd.DataFrame, meta: Dict) -> bool:
+        last = self._ingested.get(key)
+        if last is None:
+            return True
+        ingested_at, futures_price, gex_sign = last
+        return (time.monotonic() - ingested_at >= self.ingest_interval
+                or abs(meta['futures_price'] / futures_price - 1) >= STREAM_INGEST_MOVE
+                or np.sign(df['Net_GEX'].sum()) != gex_sign)
+
+class ReusableTCPServer(socketserver.ThreadingTCPServer):
+    # Rebinds a port still in TIME_WAIT after a restart; set on a subclass rather than
+    # on socketserver.ThreadingTCPServer itself, which other code in the process shares.
+    allow_reuse_address = True
+    daemon_threads = True
+
+class LocalFeedServer:
+    # Stand-in for a broker tick feed: random-walks LTP/IV/OI/volume on the given
+    # chains and streams batches to every connected client at `rate` updates/sec.
+    def __init__(self, chains: Dict[Tuple[str, str], Tuple[np.ndarray, float]], host: str = '127.0.0.1',
+                 port: int = 9100, rate: float = 2000, batch_interval: float = 0.01, seed: int = None):
+        self.chains = chains
+        self.host, self.port = host, port
+        self.rate = rate
+        self.batch_interval = batch_interval
+        self.seed = seed
+        self.sent = 0
+        self._server = None
+
+    @classmethod
+    def from_live_chains(cls, live_chains: List[LiveChain], **kwargs) -> 'LocalFeedServer':
+        return cls({(c.symbol, c.expiry): (c.raw['strikes'].copy(), c.spot_price) for c in live_chains}, **kwargs)
+
+    def _update_stream(self):
+        rng = np.random.default_rng(self.seed)
+        keys = list(self.chains)
+        state = {}
+        for key in keys:
+            strikes, spot = self.chains[key]
+            moneyness = np.abs(strikes - spot) / spot
+            state[key] = {
+                'spot': spot,
+                'ltp': {'CE': np.maximum(spot - strikes, 0) + spot * 0.01 * np.exp(-moneyness * 20),
+                        'PE': np.maximum(strikes - spot, 0) + spot * 0.01 * np.exp(-moneyness * 20)},
+                'iv': {'CE': 12 + 80 * moneyness, 'PE': 13 + 85 * moneyness},
+                'oi': {'CE': rng.integers(1_000, 200_000, len(strikes)).astype(float),
+                       'PE': rng.integers(1_000, 200_000, len(strikes)).astype(float)},
+                'v': {'CE': np.zeros(len(strikes)), 'PE': np.zeros(len(strikes))},
+            }
+        while True:
+            batch = []
+            for _ in range(max(1, int(self.rate * self.batch_interval))):
+                key = keys[rng.integers(len(keys))]
+                s = state[key]
+                if rng.random() < 0.05:
+                    s['spot'] *= 1 + rng.normal(0, 0.0002)
+                    batch.append({'s': key[0], 't': 'IDX', 'ltp': round(s['spot'], 2)})
+                    continue
+                strikes = self.chains[key][0]
+                i = int(rng.integers(len(strikes)))
+                side = 'CE' if rng.random() < 0.5 else 'PE'
+                s['ltp'][side][i] = max(0.05, s['ltp'][side][i] * (1 + rng.normal(0, 0.01)))
+                s['iv'][side][i] = max(1.0, s['iv'][side][i] + rng.normal(0, 0.05))
+                s['oi'][side][i] = max(0.0, s['oi'][side][i] + rng.integers(-500, 800))
+                s['v'][side][i] += rng.integers(0, 2000)
+                batch.append({'s': key[0], 'e': key[1], 'k': float(strikes[i]), 't': side,
+                              'oi': int(s['oi'][side][i]), 'ltp': round(s['ltp'][side][i], 2),
+                              'iv': round(s['iv'][side][i], 2), 'v': int(s['v'][side][i])})
+            yield batch
+
+    def start(self) -> 'LocalFeedServer':
+        feed = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                next_send = time.monotonic()
+                for batch in feed._update_stream():
+                    try:
+                        self.request.sendall((json.dumps(batch, separators=(',', ':')) + "\n").encode())
+                    except OSError:
+                        return
+                    feed.sent += len(batch)
+                    next_send += feed.batch_interval
+                    time.sleep(max(0.0, next_send - time.monotonic()))
+
+        self._server = ReusableTCPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+@st.cache_resource
+def get_feed_consumer() -> FeedConsumer:
+    return FeedConsumer(on_snapshot=ingest_snapshot).start()
+
+def seed_live_chain(consumer: FeedConsumer, fetcher: 'DhanAPIFetcher', symbol: str, expiry_index: int) -> Optional[LiveChain]:
+    for (tracked_symbol, expiry), chain in consumer.chains.items():
+        if tracked_symbol == symbol and chain.expiry_list[min(expiry_index, len(chain.expiry_list) - 1)] == expiry:
+            return chain
+    expiry_list = fetcher.get_expiry_list(symbol)
+    if not expiry_list:
+        return None
+    expiry = expiry_list[min(expiry_index, len(expiry_list) - 1)]
+    if (symbol, expiry) in consumer.chains:
+        return consumer.chains[(symbol, expiry)]
+    oc_data = fetcher.fetch_option_chain(symbol, expiry)
+    if not oc_data:
+        return None
+    chain = LiveChain.from_option_chain(symbol, expiry, oc_data, expiry_list, now_fn=fetcher.source.now)
+    if chain is not None:
+        consumer.track(chain)
+    return chain
+
+# ============================================================================
+# SHARED SNAPSHOT BUS
+# ============================================================================
+
+SHARED_BUS_DIR = os.environ.get("GEX_SHARED_BUS_DIR", "")
+SHARED_BUS_STRIKES_RANGE = 20
+SHARED_BUS_KEEP_VERSIONS = 3
+SHARED_BUS_REQUEST_TTL = 600
+SHARED_BUS_INTERVAL = int(os.environ.get("GEX_SHARED_BUS_INTERVAL", "180"))
+# Between full refresh cycles the leader checks this often (seconds) for keys nobody
+# had requested yet, so a first view waits one fetch rather than one cycle.
+SHARED_BUS_POLL = 1.0
+
+class SharedSnapshotBus:
+    # Cross-process publication over a tmpfs directory (default /dev/shm):
+    #   <root>/<symbol>/<expiry>/v<version>.arrow  uncompressed Arrow IPC, memory-mapped by readers
+    #   <root>/<symbol>/<expiry>/VERSION           8-byte little-endian latest version, swapped atomically
+    #   <root>/<symbol>/expiries.json              expiry list as of the latest publish
+    #   <root>/<symbol>/expiry_index.json          {expiry_index: expiry} the leader fetched for each request
+    #   <root>/requests/<symbol>__<expiry_index>   touched by readers; the leader refreshes what is requested
+    def __init__(self, root: str = None):
+        default_root = '/dev/shm/nyztrade-gex' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'nyztrade-gex')
+        self.root = Path(root or SHARED_BUS_DIR or default_root)
+        (self.root / 'requests').mkdir(parents=True, exist_ok=True)
+        self._readers = {}
+
+    def _key_dir(self, symbol: str, expiry: str) -> Path:
+        return self.root / symbol / expiry
+
+    def version(self, symbol: str, expiry: str) -> int:
+        try:
+            with open(self._key_dir(symbol, expiry) / 'VERSION', 'rb') as f:
+                return int.from_bytes(f.read(8), 'little')
+        except (OSError, ValueError):
+            return 0
+
+    def publish(self, chain: CompactChain, meta: Dict, expiry_index: int = None) -> int:
+        key_dir = self._key_dir(meta['symbol'], meta['expiry'])
+        key_dir.mkdir(parents=True, exist_ok=True)
+        version = self.version(meta['symbol'], meta['expiry']) + 1
+        table = pa.Table.from_pandas(chain.frame.reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({
+            b'gex_meta': json.dumps({**meta, 'bus_version': version}, default=str).encode(),
+            b'gex_columns': json.dumps(chain.columns).encode(),
+        })
+        path = key_dir / f"v{version:012d}.arrow"
+        tmp_path = key_dir / f".v{version:012d}.tmp"
+        with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        tmp_version = key_dir / '.VERSION.tmp'
+        with open(tmp_version, 'wb') as f:
+            f.write(version.to_bytes(8, 'little'))
+        os.replace(tmp_version, key_dir / 'VERSION')
+        if meta.get('expiry_list'):
+            self._write_json(self.root / meta['symbol'] / 'expiries.json', meta['expiry_list'])
+        if expiry_index is not None:
+            # Only the leader publishes, so read-modify-write of the map is safe
+            resolved = self._read_json(self.root / meta['symbol'] / 'expiry_index.json', {})
+            if resolved.get(str(int(expiry_index))) != meta['expiry']:
+                resolved[str(int(expiry_index))] = meta['expiry']
+                self._write_json(self.root / meta['symbol'] / 'expiry_index.json', resolved)
+        for old in sorted(key_dir.glob('v*.arrow'))[:-SHARED_BUS_KEEP_VERSIONS]:
+            old.unlink(missing_ok=True)
+        return version
+
+    def _write_json(self, path: Path, data):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _read_json(self, path: Path, default):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def expiries(self, symbol: str) -> List[str]:
+        return self._read_json(self.root / symbol / 'expiries.json', [])
+
+    def resolve(self, symbol: str, expiry_index: int) -> Optional[str]:
+        # The expiry the leader actually served for this index; None until it has
+        return self._read_json(self.root / symbol / 'expiry_index.json', {}).get(str(int(expiry_index)))
+
+    def read_table(self, symbol: str, expiry: str) -> Tuple[Optional[pa.Table], int]:
+        # Zero-copy: the table's buffers point straight into the mapped file. The
+        # mapping stays valid even after the publisher unlinks that version.
+        version = self.version(symbol, expiry)
+        if version == 0:
+            return None, 0
+        cached = self._readers.get((symbol, expiry))
+        if cached and cached[1] == version:
+            return cached[0], version
+        try:
+            source = pa.memory_map(str(self._key_dir(symbol, expiry) / f"v{version:012d}.arrow"), 'r')
+            table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return (cached[0], cached[1]) if cached else (None, 0)
+        self._readers[(symbol, expiry)] = (table, version)
+        return table, version
+
+    def read(self, symbol: str, expiry: str) -> Tuple[Optional[CompactChain], Optional[Dict]]:
+        table, version = self.read_table(symbol, expiry)
+        if table is None:
+            return None, None
+        metadata = table.schema.metadata
+        frame = table.to_pandas(split_blocks=True).set_index('Strike')
+        return CompactChain(frame, json.loads(metadata[b'gex_columns'])), json.loads(metadata[b'gex_meta'])
+
+    def request(self, symbol: str, expiry_index: int):
+        (self.root / 'requests' / f"{symbol}__{int(expiry_index)}").touch()
+
+    def requested(self, ttl: float = SHARED_BUS_REQUEST_TTL) -> List[Tuple[str, int]]:
+        cutoff = time.time() - ttl
+        wanted = []
+        for path in (self.root / 'requests').iterdir():
+            symbol, _, index = path.name.partition('__')
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    wanted.append((symbol, int(index)))
+            except (OSError, ValueError):
+                continue
+        return sorted(wanted)
+
+class SharedBusLeader:
+    # Every replica runs one of these; an exclusive flock on <root>/leader.lock
+    # elects exactly one of them to fetch, ingest and publish, so Dhan calls and
+    # compute do not grow with the number of replicas.
+    def __init__(self, bus: SharedSnapshotBus, interval: float = SHARED_BUS_INTERVAL, min_call_gap: float = 3.0):
+        self.bus = bus
+        self.interval = interval
+        self.min_call_gap = min_call_gap
+        self.is_leader = False
+        self.cycles = 0
+        self.served = set()
+        self._lock_file = open(bus.root / 'leader.lock', 'a+')
+        self._stop = threading.Event()
+
+    def start(self) -> 'SharedBusLeader':
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _try_lead(self) -> bool:
+        if not self.is_leader:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.is_leader = True
+            except OSError:
+                return False
+        return True
+
+    def refresh(self, fetcher: 'DhanAPIFetcher' = None, keys: List[Tuple[str, int]] = None) -> int:
+        fetcher = fetcher or DhanAPIFetcher(DhanConfig())
+        published = 0
+        for symbol, expiry_index in (self.bus.requested() if keys is None else keys):
+            if self._stop.is_set():
+                break
+            df, meta = fetcher.process_option_chain(symbol, expiry_index, SHARED_BUS_STRIKES_RANGE)
+            if df is not None:
+                self.bus.publish(ingest_snapshot(df, meta), meta, expiry_index)
+                published += 1
+            self.served.add((symbol, expiry_index))
+            self._stop.wait(self.min_call_gap)
+        return published
+
+    def unserved(self) -> List[Tuple[str, int]]:
+        # Requests that lapsed are forgotten, so asking again later fetches at once
+        # instead of serving whatever stale version is still on the bus.
+        requested = self.bus.requested()
+        self.served &= set(requested)
+        return [key for key in requested if key not in self.served]
+
+    def _run(self):
+        next_cycle = 0.0
+        while not self._stop.is_set():
+            if not self._try_lead():
+                self._stop.wait(5.0)
+                continue
+            try:
+                if time.monotonic() >= next_cycle:
+                    next_cycle = time.monotonic() + self.interval
+                    self.refresh()
+                    self.cycles += 1
+                else:
+                    fresh = self.unserved()
+                    if fresh:
+                        self.refresh(keys=fresh)
+            except Exception as e:
+                get_perf_recorder().record_error('bus.refresh', e)
+            self._stop.wait(SHARED_BUS_POLL)
+
+@st.cache_resource
+def get_shared_bus() -> Optional[SharedSnapshotBus]:
+    return SharedSnapshotBus() if SHARED_BUS_DIR else None
+
+@st.cache_resource
+def get_shared_bus_leader() -> Optional[SharedBusLeader]:
+    bus = get_shared_bus()
+    return SharedBusLeader(bus, SHARED_BUS_INTERVAL).start() if bus is not None else None
+
+def read_shared_snapshot(bus: SharedSnapshotBus, symbol: str, expiry_index: int, strikes_range: int,
+                         wait: float = 15.0) -> Tuple[Optional[CompactChain], Optional[Dict]]:
+    bus.request(symbol, expiry_index)
+    deadline = time.monotonic() + wait
+    while True:
+        expiry = bus.resolve(symbol, expiry_index)
+        if expiry is not None:
+            shared, meta = bus.read(symbol, expiry)
+            if shared is not None:
+                interval = symbol_config(symbol)['strike_interval']
+                keep = np.abs(shared.strikes - meta['futures_price']) / interval <= strikes_range
+                return CompactChain(shared.frame[keep], shared.columns), meta
+        if time.monotonic() >= deadline:
+            return None, None
+        time.sleep(0.25)
+
+# ============================================================================
+# SNAPSHOT PUBLISHER
+# ============================================================================
+
+# host:port for TCP, or unix:<path> for a Unix domain socket; empty disables publishing.
+PUBLISH_ADDRESS = os.environ.get("GEX_PUBLISH_ADDR", "")
+# Undelivered snapshots held per subscriber; a newer snapshot of the same symbol/expiry
+# replaces its pending one, and past the limit the oldest pending snapshot is dropped.
+PUBLISH_QUEUE_DEPTH = int(os.environ.get("GEX_PUBLISH_QUEUE", "8"))
+# A subscriber that cannot take a frame within this many seconds is disconnected.
+PUBLISH_SEND_TIMEOUT = 10.0
+PUBLISH_HEARTBEAT = 5.0
+FRAME_HEADER = struct.Struct('>I')
+
+# Wire format. A subscriber connects and sends one JSON line naming what it wants,
+#   {"symbols": ["NIFTY", "BANKNIFTY"], "expiries": ["2026-10-22"]}
+# (either key omitted or empty means all). The publisher then sends frames: a 4-byte
+# big-endian length and one Arrow IPC stream holding the processed chain, with the
+# snapshot meta and signal record as JSON under the schema metadata keys 'gex.meta'
+# and 'gex.signals' (strict JSON: NaN is sent as null). Zero-length frames are heartbeats. The latest snapshot of every
+# matching symbol/expiry is sent straight after subscribing.
+
+def parse_socket_address(address: str) -> Tuple[int, object]:
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+def json_safe(value):
+    # NaN/inf become null so the metadata is strict JSON for non-Python subscribers
+    if isinstance(value, dict):
+        return {k: json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(v) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+    return value
+
+def encode_snapshot_frame(frame: pd.DataFrame, meta: Dict, signals: Dict) -> bytes:
+    # pandas' schema metadata is a quarter of a chain-sized frame and buffer compression
+    # gains nothing at ~40 strikes, so neither is sent; columns are plain Arrow types.
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        b'gex.meta': json.dumps(json_safe(meta), default=str, allow_nan=False).encode(),
+        b'gex.signals': json.dumps(json_safe(signals), default=str, allow_nan=False).encode()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue().to_pybytes()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+def decode_snapshot_frame(payload: bytes) -> Tuple[pd.DataFrame, Dict, Dict]:
+    table = pa.ipc.open_stream(payload).read_all()
+    metadata = table.schema.metadata or {}
+    signals = json.loads(metadata.get(b'gex.signals', b'{}'))
+    # Numeric signals sent as null (no value) read back as NaN
+    return (table.to_pandas(), json.loads(metadata.get(b'gex.meta', b'{}')),
+            {k: np.nan if v is None else v for k, v in signals.items()})
+
+class SnapshotSubscription:
+    # Bounded, conflating outbox for one subscriber. publish() never waits on a
+    # subscriber: slow readers lose intermediate snapshots, not the latest one.
+    def __init__(self, symbols: List[str] = None, expiries: List[str] = None, depth: int = PUBLISH_QUEUE_DEPTH):
+        self.symbols = set(symbols or [])
+        self.expiries = set(expiries or [])
+        self.depth = max(1, depth)
+        self.pending = OrderedDict()
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def wants(self, symbol: str, expiry: str) -> bool:
+        return (not self.symbols or symbol in self.symbols) and (not self.expiries or expiry in self.expiries)
+
+    def offer(self, key: Tuple[str, str], frame: bytes):
+        with self._cond:
+            if key in self.pending:
+                del self.pending[key]
+                self.dropped += 1
+            elif len(self.pending) >= self.depth:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[key] = frame
+            self._cond.notify()
+
+    def next_frame(self, timeout: float) -> Optional[bytes]:
+        with self._cond:
+            self._cond.wait_for(lambda: self.pending or self.closed, timeout)
+            if self.closed or not self.pending:
+                return None
+            return self.pending.popitem(last=False)[1]
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+def parse_subscribe_request(line: bytes) -> Optional[Tuple[Optional[List[str]], Optional[List[str]]]]:
+    # {"symbols": [...] | null, "expiries": [...] | null}; anything else is refused with None
+    try:
+        request = json.loads(line) if line else None
+    except ValueError:
+        return None
+    if not isinstance(request, dict):
+        return None
+    filters = (request.get('symbols'), request.get('expiries'))
+    for values in filters:
+        if values is not None and not (isinstance(values, list) and all(isinstance(v, str) for v in values)):
+            return None
+    return filters
+
+class SnapshotPublisher:
+    # Fans each ingested snapshot out to local subscribers. Frames are encoded once
+    # per snapshot and shared; each connection has its own sender thread draining
+    # its SnapshotSubscription, so one stalled consumer never delays the others or
+    # the refresh that produced the snapshot.
+    def __init__(self, address: str = PUBLISH_ADDRESS, depth: int = PUBLISH_QUEUE_DEPTH):
+        self.address = address
+        self.depth = depth
+        self.latest = {}
+        self.subscriptions = set()
+        self.stats = defaultdict(int)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def publish(self, frame: pd.DataFrame, meta: Dict, signals: Dict):
+        key = (meta['symbol'], meta['expiry'])
+        encoded = encode_snapshot_frame(frame, meta, signals)
+        with self._lock:
+            self.latest[key] = encoded
+            targets = [s for s in self.subscriptions if s.wants(*key)]
+        for subscription in targets:
+            subscription.offer(key, encoded)
+        self.stats['published'] += 1
+        self.stats['bytes'] += len(encoded)
 
-def calculate_flow_metrics(df: pd.DataFrame, futures_price: float) -> Dict:
-    df_unique = df.drop_duplicates(subset=['Strike']).sort_values('Strike').reset_index(drop=True)
-    
-    positive_gex_df = df_unique[df_unique['Net_GEX'] > 0].copy()
-    positive_gex_df['Distance'] = abs(positive_gex_df['Strike'] - futures_price)
-    positive_gex_df = positive_gex_df.nsmallest(5, 'Distance')
-    
-    negative_gex_df = df_unique[df_unique['Net_GEX'] < 0].copy()
-    negative_gex_df['Distance'] = abs(negative_gex_df['Strike'] - futures_price)
-    negative_gex_df = negative_gex_df.nsmallest(5, 'Distance')
-    
-    gex_near_positive = positive_gex_df['Net_GEX'].sum() if len(positive_gex_df) > 0 else 0
-    gex_near_negative = negative_gex_df['Net_GEX'].sum() if len(negative_gex_df) > 0 else 0
-    gex_near_total = gex_near_positive + gex_near_negative
-    gex_total_all = df_unique['Net_GEX'].sum()
-    
-    above_futures = df_unique[df_unique['Strike'] > futures_price].head(5)
-    below_futures = df_unique[df_unique['Strike'] < futures_price].tail(5)
-    
-    dex_near_above = above_futures['Net_DEX'].sum() if len(above_futures) > 0 else 0
-    dex_near_below = below_futures['Net_DEX'].sum() if len(below_futures) > 0 else 0
-    dex_near_total = dex_near_above + dex_near_below
-    dex_total_all = df_unique['Net_DEX'].sum()
-    
-    vanna_total = df_unique['Net_Vanna'].sum()
-    charm_total = df_unique['Net_Charm'].sum()
-    flow_gex_total = df_unique['Net_Flow_GEX'].sum()
-    flow_dex_total = df_unique['Net_Flow_DEX'].sum()
-    
-    def get_gex_bias(v):
-        if v > 50: return "🟢 STRONG SUPPRESSION", "green", "Bullish - Low Vol Expected"
-        elif v > 0: return "🟢 SUPPRESSION", "lightgreen", "Mild Bullish"
-        elif v < -50: return "🔴 HIGH AMPLIFICATION", "red", "High Volatility Expected"
-        elif v < 0: return "🔴 AMPLIFICATION", "lightcoral", "Volatile"
-        return "⚖️ NEUTRAL", "orange", "Balanced"
-    
-    def get_dex_bias(v):
-        if v > 50: return "🟢 BULLISH", "green", "Strong Upward Pressure"
-        elif v < -50: return "🔴 BEARISH", "red", "Strong Downward Pressure"
-        elif v > 0: return "🟢 Mild Bullish", "lightgreen", "Slight Upward Bias"
-        elif v < 0: return "🔴 Mild Bearish", "lightcoral", "Slight Downward Bias"
-        return "⚖️ NEUTRAL", "orange", "No Clear Direction"
-    
-    gex_bias, gex_color, gex_desc = get_gex_bias(gex_near_total)
-    dex_bias, dex_color, dex_desc = get_dex_bias(dex_near_total)
-    combined_signal = (gex_near_total + dex_near_total) / 2
-    combined_bias, combined_color, combined_desc = get_gex_bias(combined_signal)
-    
-    return {
-        'gex_near_positive': gex_near_positive, 'gex_near_negative': gex_near_negative,
-        'gex_near_total': gex_near_total, 'gex_total': gex_total_all,
-        'gex_bias': gex_bias, 'gex_color': gex_color, 'gex_desc': gex_desc,
-        'dex_near_above': dex_near_above, 'dex_near_below': dex_near_below,
-        'dex_near_total': dex_near_total, 'dex_total': dex_total_all,
-        'dex_bias': dex_bias, 'dex_color': dex_color, 'dex_desc': dex_desc,
-        'vanna_total': vanna_total, 'charm_total': charm_total,
-        'flow_gex_total': flow_gex_total, 'flow_dex_total': flow_dex_total,
-        'combined_signal': combined_signal, 'combined_bias': combined_bias,
-        'combined_color': combined_color, 'combined_desc': combined_desc,
-    }
+    @property
+    def dropped(self) -> int:
+        with self._lock:
+            return self.stats['dropped'] + sum(s.dropped for s in self.subscriptions)
 
-def detect_gamma_flip_zones(df: pd.DataFrame) -> List[Dict]:
-    gamma_flip_zones = []
-    df_sorted = df.sort_values('Strike').reset_index(drop=True)
-    
-    for i in range(len(df_sorted) - 1):
-        current_gex = df_sorted.iloc[i]['Net_GEX']
-        next_gex = df_sorted.iloc[i + 1]['Net_GEX']
-        
-        if (current_gex > 0 and next_gex < 0) or (current_gex < 0 and next_gex > 0):
-            lower = df_sorted.iloc[i]['Strike']
-            upper = df_sorted.iloc[i + 1]['Strike']
-            weight = abs(current_gex) / (abs(current_gex) + abs(next_gex)) if (abs(current_gex) + abs(next_gex)) > 0 else 0.5
-            flip_strike = lower + (upper - lower) * weight
-            
-            gamma_flip_zones.append({
-                'flip_strike': flip_strike, 'lower_strike': lower, 'upper_strike': upper,
-                'flip_type': "Positive → Negative" if current_gex > 0 else "Negative → Positive",
-                'lower_gex': current_gex, 'upper_gex': next_gex,
-                'impact': "Resistance" if current_gex > 0 else "Support"
-            })
-    
-    return gamma_flip_zones
+    def subscribe(self, symbols: List[str] = None, expiries: List[str] = None) -> SnapshotSubscription:
+        subscription = SnapshotSubscription(symbols, expiries, self.depth)
+        with self._lock:
+            self.subscriptions.add(subscription)
+            for key, encoded in self.latest.items():
+                if subscription.wants(*key):
+                    subscription.offer(key, encoded)
+        return subscription
 
-def calculate_key_levels(df: pd.DataFrame, futures_price: float) -> Dict:
-    df_sorted = df.sort_values('Strike').reset_index(drop=True)
-    max_pain_strike = df_sorted.loc[df_sorted['Call_OI'].idxmax(), 'Strike']
-    highest_call_oi_strike = df_sorted.loc[df_sorted['Call_OI'].idxmax(), 'Strike']
-    highest_put_oi_strike = df_sorted.loc[df_sorted['Put_OI'].idxmax(), 'Strike']
-    max_positive_gex_strike = df_sorted.loc[df_sorted['Net_GEX'].idxmax(), 'Strike']
-    max_negative_gex_strike = df_sorted.loc[df_sorted['Net_GEX'].idxmin(), 'Strike']
-    
-    total_put_oi = df_sorted['Put_OI'].sum()
-    total_call_oi = df_sorted['Call_OI'].sum()
-    pcr = total_put_oi / total_call_oi if total_call_oi > 0 else 1
-    
-    return {
-        'max_pain': max_pain_strike, 'highest_call_oi': highest_call_oi_strike,
-        'highest_put_oi': highest_put_oi_strike, 'max_positive_gex': max_positive_gex_strike,
-        'max_negative_gex': max_negative_gex_strike, 'pcr': pcr,
-        'total_call_oi': total_call_oi, 'total_put_oi': total_put_oi,
-    }
+    def unsubscribe(self, subscription: SnapshotSubscription):
+        subscription.close()
+        with self._lock:
+            self.subscriptions.discard(subscription)
+            self.stats['dropped'] += subscription.dropped
+
+    def start(self) -> 'SnapshotPublisher':
+        publisher = self
+        family, address = parse_socket_address(self.address)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.request.settimeout(PUBLISH_SEND_TIMEOUT)
+                try:
+                    line = self.rfile.readline()
+                except OSError:
+                    return
+                filters = parse_subscribe_request(line)
+                if filters is None:
+                    return  # malformed, or closed before subscribing, e.g. another publisher's probe
+                subscription = publisher.subscribe(*filters)
+                publisher.stats['connections'] += 1
+                try:
+                    while True:
+                        frame = subscription.next_frame(PUBLISH_HEARTBEAT)
+                        self.request.sendall(frame if frame is not None else FRAME_HEADER.pack(0))
+                        if frame is not None:
+                            subscription.sent += 1
+                            publisher.stats['sent'] += 1
+                except OSError:
+                    publisher.stats['disconnects'] += 1
+                finally:
+                    publisher.unsubscribe(subscription)
+
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                # Only a socket nobody is accepting on (left by a dead process) is removed
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    try:
+                        probe.connect(address)
+                    except OSError:
+                        os.unlink(address)
+                    else:
+                        raise OSError(errno.EADDRINUSE, f"{address} is already being served")
+            self._server = socketserver.ThreadingUnixStreamServer(address, Handler)
+        else:
+            self._server = ReusableTCPServer(address, Handler)
+            self.address = f"{address[0]}:{self._server.server_address[1]}"
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
+
+@st.cache_resource
+def get_snapshot_publisher() -> Optional[SnapshotPublisher]:
+    if not PUBLISH_ADDRESS:
+        return None
+    try:
+        return SnapshotPublisher().start()
+    except OSError as e:
+        # Another process (e.g. the shared-bus leader) already owns the address
+        get_perf_recorder().record_error('publish.bind', e)
+        return None
+
+def subscribe_snapshots(address: str = PUBLISH_ADDRESS, symbols: List[str] = None, expiries: List[str] = None,
+                        timeout: float = 3 * PUBLISH_HEARTBEAT) -> Iterator[Tuple[pd.DataFrame, Dict, Dict]]:
+    # Client side of the publisher: yields (chain frame, meta, signals) per snapshot.
+    family, target = parse_socket_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.sendall((json.dumps({'symbols': symbols or [], 'expiries': expiries or []}) + "\n").encode())
+        reader = sock.makefile('rb')
+        while True:
+            header = reader.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            (length,) = FRAME_HEADER.unpack(header)
+            if length:
+                payload = reader.read(length)
+                if len(payload) < length:
+                    return
+                yield decode_snapshot_frame(payload)
 
 # ============================================================================
 # VISUALIZATION FUNCTIONS
 # ============================================================================
 
+# Figures and frames are built before these spans open, so serialize.<element> times only
+# Streamlit's encoding of the element (Plotly JSON / Arrow) into the outgoing delta; the
+# render.<tab> spans around each tab include it. The websocket send itself is asynchronous
+# and not measured.
+def show_chart(fig: go.Figure, element: str, **kwargs):
+    with get_perf_recorder().span(f'serialize.{element}'):
+        st.plotly_chart(fig, use_container_width=True, **kwargs)
+
+def show_frame(data, element: str, **kwargs):
+    with get_perf_recorder().span(f'serialize.{element}'):
+        st.dataframe(data, use_container_width=True, **kwargs)
+
 def create_gex_chart(df: pd.DataFrame, futures_price: float, gamma_flips: List[Dict]) -> go.Figure:
     colors = ['#10b981' if x > 0 else '#ef4444' for x in df['Net_GEX']]
     fig = go.Figure()
@@ -788,6 +4099,28 @@ def create_hedging_pressure_chart(df: pd.DataFrame, futures_price: float) -> go.
     )
     return fig
 
+def create_hedge_flow_chart(flow: Dict[str, np.ndarray], futures_price: float) -> go.Figure:
+    labels = [f"{s * 100:+.1f}%" for s in flow['shocks']]
+    fig = make_subplots(rows=1, cols=2, column_widths=[0.45, 0.55],
+                        subplot_titles=("Dealer Hedge Flow by Shock (₹B)", "Hedge Flow by Strike (₹B)"))
+    for name, color in zip(HEDGE_COMPONENTS, ['#8b5cf6', '#f59e0b', '#06b6d4']):
+        fig.add_trace(go.Bar(x=labels, y=flow[name], name=name.title(), marker_color=color), row=1, col=1)
+    fig.add_trace(go.Scatter(x=labels, y=flow['total'], name='Total', mode='markers+text',
+                            marker=dict(color='white', size=10, symbol='diamond'),
+                            text=[f"{v:+,.1f}" for v in flow['total']], textposition='top center'), row=1, col=1)
+    limit = float(np.abs(flow['by_strike']).max()) or 1.0
+    fig.add_trace(go.Heatmap(x=labels, y=flow['strikes'], z=flow['by_strike'].T, colorscale='RdYlGn',
+                            zmin=-limit, zmax=limit, colorbar=dict(title='₹B'), showlegend=False,
+                            hovertemplate='Shock: %{x}<br>Strike: %{y}<br>Flow: %{z:.2f}B<extra></extra>'), row=1, col=2)
+    fig.add_hline(y=futures_price, line_dash="dash", line_color="#06b6d4", line_width=2, row=1, col=2)
+    fig.update_layout(
+        title=dict(text="<b>Dealer Hedge Flow (+ buy / - sell futures)</b>", font=dict(size=16, color='white')),
+        barmode='relative', template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(26,35,50,0.8)', height=500,
+        legend=dict(orientation='h', yanchor='bottom', y=1.05)
+    )
+    return fig
+
 def create_vanna_charm_chart(df: pd.DataFrame, futures_price: float) -> go.Figure:
     fig = make_subplots(rows=1, cols=2, subplot_titles=("Vanna Exposure", "Charm Exposure"))
     
@@ -809,6 +4142,46 @@ def create_vanna_charm_chart(df: pd.DataFrame, futures_price: float) -> go.Figur
     )
     return fig
 
+def create_higher_order_chart(df: pd.DataFrame, futures_price: float) -> go.Figure:
+    panels = [("Net_Speed", "Speed (ΔGEX per 1% move)", '#10b981', '#ef4444'),
+              ("Net_Zomma", "Zomma (ΔGEX per vol pt)", '#8b5cf6', '#f59e0b'),
+              ("Net_Color", "Color (ΔGEX per day)", '#06b6d4', '#ec4899'),
+              ("Net_Vomma", "Vomma (Δvega per vol pt)", '#3b82f6', '#f97316')]
+    fig = make_subplots(rows=1, cols=4, shared_yaxes=True, subplot_titles=[title for _, title, _, _ in panels])
+    for i, (col, title, pos_color, neg_color) in enumerate(panels, 1):
+        fig.add_trace(go.Bar(y=df['Strike'], x=df[col], orientation='h', name=title,
+                             marker_color=[pos_color if x > 0 else neg_color for x in df[col]]), row=1, col=i)
+        fig.add_hline(y=futures_price, line_dash="dash", line_color="#06b6d4", line_width=2, row=1, col=i)
+
+    fig.update_layout(
+        title=dict(text="<b>Higher-Order Exposure</b>", font=dict(size=16, color='white')),
+        template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(26,35,50,0.8)', height=450, showlegend=False
+    )
+    return fig
+
+def create_overview_chart(overview: pd.DataFrame, aggregate: Dict) -> go.Figure:
+    labels = list(overview['Symbol']) + ["<b>Aggregate</b>"]
+    panels = [("GEX_Share", 'gex_share', "Net / Gross GEX"), ("DEX_Share", 'dex_share', "Net / Gross DEX"),
+              ("Flip_Distance_Pct", 'flip_distance_pct', "Gamma Flip vs Futures (%)"),
+              ("Straddle_Pct", 'straddle_pct', "ATM Straddle (% of Futures)")]
+    fig = make_subplots(rows=1, cols=4, shared_yaxes=True, subplot_titles=[title for _, _, title in panels])
+    for i, (col, key, title) in enumerate(panels, 1):
+        values = list(overview[col]) + [aggregate[key]]
+        fig.add_trace(go.Bar(y=labels, x=values, orientation='h', name=title,
+                             marker_color=['#10b981' if x > 0 else '#ef4444' for x in values]), row=1, col=i)
+    for i in (1, 2):
+        fig.add_vline(x=OVERVIEW_STRONG_SHARE, line_dash="dot", line_color="#64748b", row=1, col=i)
+        fig.add_vline(x=-OVERVIEW_STRONG_SHARE, line_dash="dot", line_color="#64748b", row=1, col=i)
+
+    fig.update_layout(
+        title=dict(text="<b>Cross-Index Exposure</b>", font=dict(size=16, color='white')),
+        template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(26,35,50,0.8)', height=380, showlegend=False
+    )
+    fig.update_yaxes(autorange="reversed")
+    return fig
+
 def create_flow_chart(df: pd.DataFrame, futures_price: float) -> go.Figure:
     fig = make_subplots(rows=1, cols=2, subplot_titles=("GEX Flow (OI Change)", "DEX Flow (OI Change)"))
     
@@ -830,6 +4203,65 @@ def create_flow_chart(df: pd.DataFrame, futures_price: float) -> go.Figure:
     )
     return fig
 
+def create_history_chart(history_df: pd.DataFrame) -> go.Figure:
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=("Near GEX / DEX (₹ Billions)", "Futures vs Gamma Flip Level"))
+    fig.add_trace(go.Scatter(x=history_df['Time'], y=history_df['gex_near_total'], name='Net GEX (Near)',
+                            line=dict(color='#10b981', width=2)), row=1, col=1)
+    fig.add_trace(go.Scatter(x=history_df['Time'], y=history_df['dex_near_total'], name='Net DEX (Near)',
+                            line=dict(color='#3b82f6', width=2)), row=1, col=1)
+    fig.add_trace(go.Scatter(x=history_df['Time'], y=history_df['futures_price'], name='Futures',
+                            line=dict(color='#06b6d4', width=2)), row=2, col=1)
+    fig.add_trace(go.Scatter(x=history_df['Time'], y=history_df['flip_level'], name='Γ-Flip Level',
+                            mode='lines+markers', line=dict(color='#f59e0b', width=2, dash='dot'),
+                            marker=dict(size=4)), row=2, col=1)
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", line_width=1, row=1, col=1)
+    fig.update_layout(
+        title=dict(text="<b>Intraday Exposure History</b>", font=dict(size=16, color='white')),
+        template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(26,35,50,0.8)', height=550,
+        legend=dict(orientation='h', yanchor='bottom', y=1.02)
+    )
+    return fig
+
+def create_heatmap_chart(grid: HeatmapGrid) -> go.Figure:
+    m = grid.matrix()
+    times = pd.to_datetime(m['times'])
+    unit = '%' if grid.how == 'mean' else 'B'
+    fig = go.Figure()
+    fig.add_trace(go.Heatmap(
+        x=times, y=m['strikes'], z=m['z'], colorscale='RdYlGn', zmid=0,
+        colorbar=dict(title=dict(text=f"{grid.field} ({unit})", side='right')),
+        hovertemplate=f'%{{x|%H:%M}}<br>Strike %{{y:,.0f}}<br>{grid.field}: %{{z:.4f}}{unit}<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(x=times, y=m['futures'], mode='lines', name='Futures',
+                            line=dict(color='#06b6d4', width=2), connectgaps=False))
+    fig.update_layout(
+        title=dict(text=f"<b>{grid.field.replace('_', ' ')} — Strike × Time</b>", font=dict(size=16, color='white')),
+        xaxis_title="Time", yaxis_title="Strike", template="plotly_dark",
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(26,35,50,0.8)', height=550,
+        legend=dict(orientation='h', yanchor='bottom', y=1.02)
+    )
+    return fig
+
+def create_backtest_chart(trades: pd.DataFrame) -> go.Figure:
+    equity = trades['pnl'].cumsum()
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=trades['exit_time'], y=equity, name='Equity',
+                            line=dict(color='#8b5cf6', width=3), fill='tozeroy',
+                            fillcolor='rgba(139, 92, 246, 0.2)'))
+    fig.add_trace(go.Bar(x=trades['exit_time'], y=trades['pnl'], name='Trade P&L',
+                        marker_color=['#10b981' if x > 0 else '#ef4444' for x in trades['pnl']]))
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", line_width=1)
+    fig.update_layout(
+        title=dict(text="<b>Backtest Equity Curve</b>", font=dict(size=16, color='white')),
+        xaxis_title="Exit Time", yaxis_title="Profit/Loss (₹)",
+        template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(26,35,50,0.8)', height=400,
+        legend=dict(orientation='h', yanchor='bottom', y=1.02)
+    )
+    return fig
+
 def create_straddle_payoff_chart(meta: Dict) -> go.Figure:
     atm_strike = meta['atm_strike']
     call_premium = meta['atm_call_premium']
@@ -869,6 +4301,31 @@ def create_straddle_payoff_chart(meta: Dict) -> go.Figure:
     )
     return fig
 
+def create_strategy_payoff_chart(spots: np.ndarray, result: Dict, horizons: List[str], iv_index: int,
+                                 futures_price: float, title: str) -> go.Figure:
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08, row_heights=[0.65, 0.35],
+                        subplot_titles=("P&L by Horizon (₹)", f"Position Delta / Gamma ({horizons[0]})"))
+    colors = ['#10b981', '#3b82f6', '#f59e0b', '#8b5cf6', '#ef4444']
+    for i, label in enumerate(horizons):
+        fig.add_trace(go.Scatter(x=spots, y=result['pnl'][:, i, iv_index], name=label,
+                                line=dict(color=colors[i % len(colors)], width=3 if i == len(horizons) - 1 else 2,
+                                          dash=None if i == len(horizons) - 1 else 'dot')), row=1, col=1)
+    fig.add_trace(go.Scatter(x=spots, y=result['delta'][:, 0, iv_index], name='Delta',
+                            line=dict(color='#06b6d4', width=2)), row=2, col=1)
+    fig.add_trace(go.Scatter(x=spots, y=result['gamma'][:, 0, iv_index] * futures_price / 100, name='Gamma (Δ per 1%)',
+                            line=dict(color='#ec4899', width=2, dash='dash')), row=2, col=1)
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", line_width=1, row=1, col=1)
+    fig.add_hline(y=0, line_dash="dash", line_color="gray", line_width=1, row=2, col=1)
+    fig.add_vline(x=futures_price, line_color="#ef4444", line_width=2, annotation_text=f"Current: {futures_price:,.0f}")
+    fig.update_layout(
+        title=dict(text=f"<b>{title}</b>", font=dict(size=16, color='white')),
+        template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(26,35,50,0.8)', height=600,
+        legend=dict(orientation='h', yanchor='bottom', y=1.02)
+    )
+    fig.update_xaxes(title_text="Underlying Price", row=2, col=1)
+    return fig
+
 def create_oi_distribution_chart(df: pd.DataFrame, futures_price: float) -> go.Figure:
     fig = go.Figure()
     fig.add_trace(go.Bar(y=df['Strike'], x=df['Call_OI'], orientation='h',
@@ -885,12 +4342,17 @@ def create_oi_distribution_chart(df: pd.DataFrame, futures_price: float) -> go.F
     )
     return fig
 
-def create_iv_smile_chart(df: pd.DataFrame, futures_price: float) -> go.Figure:
+def create_iv_smile_chart(df: pd.DataFrame, futures_price: float, surface: 'VolSurface' = None,
+                          T: float = None) -> go.Figure:
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=df['Strike'], y=df['Call_IV'], name='Call IV',
                             mode='lines+markers', line=dict(color='#10b981', width=2), marker=dict(size=6)))
     fig.add_trace(go.Scatter(x=df['Strike'], y=df['Put_IV'], name='Put IV',
                             mode='lines+markers', line=dict(color='#ef4444', width=2), marker=dict(size=6)))
+    if surface is not None and len(surface) and T:
+        grid = np.linspace(df['Strike'].min(), df['Strike'].max(), 200)
+        fig.add_trace(go.Scatter(x=grid, y=surface.iv(grid, T) * 100, name='SVI Fit',
+                                line=dict(color='#f59e0b', width=3, dash='dot')))
     fig.add_vline(x=futures_price, line_dash="dash", line_color="#06b6d4", line_width=2, annotation_text="ATM")
     fig.update_layout(
         title=dict(text="<b>Implied Volatility Smile</b>", font=dict(size=16, color='white')),
@@ -935,11 +4397,396 @@ def simulate_time_decay(df: pd.DataFrame, meta: Dict, hours_forward: float):
     df_sim['Hedging_Pressure'] = df_sim['Hedging_Pressure'] * gamma_decay
     return df_sim, new_days
 
+# ============================================================================
+# INTERACTIVE RECOMPUTE
+# ============================================================================
+
+# Chains are fetched this wide once per symbol/expiry; the strikes slider only slices them.
+FETCH_STRIKES_RANGE = 20
+DEFAULT_STRIKES_RANGE = 12
+# Quiet period (seconds) after a sidebar control moves before any heavy work starts.
+CONTROL_DEBOUNCE = float(os.environ.get("GEX_CONTROL_DEBOUNCE", "0.2"))
+DERIVED_VIEW_CACHE_SIZE = 64
+
+def yield_if_superseded():
+    # A moved widget queues a newer run on the session straight away, but the running
+    # script only notices at its next yield point. ScriptRunContext.yield_check (public
+    # since Streamlit 1.66, hence the pin in requirements.txt) is that yield point without
+    # sending a delta: it raises the runner's stop/rerun exception when this run is stale,
+    # so metrics and charts nobody will see are never finished.
+    yield_check = getattr(get_script_run_ctx(suppress_warning=True), 'yield_check', None)
+    if yield_check is not None:
+        yield_check()
+
+def debounce_controls(controls: Tuple, delay: float = CONTROL_DEBOUNCE):
+    # Runs triggered by a moved control wait out a short quiet period first; each newer
+    # value supersedes the waiting run, so a drag costs one recompute, at its final value.
+    changed = st.session_state.get('debounced_controls', controls) != controls
+    st.session_state.debounced_controls = controls
+    if not changed:
+        return
+    deadline = time.monotonic() + delay
+    while time.monotonic() < deadline:
+        yield_if_superseded()
+        time.sleep(0.025)
+    yield_if_superseded()
+
+@st.cache_data(ttl=180)
+def fetch_chain(symbol: str, expiry_index: int):
+    # Cached values are pickled, and concurrent sessions re-define the script's
+    # classes, so only pandas/builtin types cross the cache; CompactChain is rebuilt.
+    perf = get_perf_recorder()
+    perf.incr('cache_misses', cache='fetch_data')
+    fetcher = DhanAPIFetcher(DhanConfig())
+    with perf.span('fetch.process_option_chain'):
+        df, meta = fetcher.process_option_chain(symbol, expiry_index, FETCH_STRIKES_RANGE)
+    if df is None:
+        return None, None, None
+    chain = ingest_snapshot(df, meta)
+    return chain.frame, chain.columns, meta
+
+def slice_strikes(df: pd.DataFrame, meta: Dict, strikes_range: int) -> pd.DataFrame:
+    interval = symbol_config(meta['symbol'])['strike_interval']
+    df = df[(df['Strike'] - meta['futures_price']).abs() / interval <= strikes_range].reset_index(drop=True)
+    # Hedging pressure is scaled to the strikes on screen, as if fetched at this range
+    max_gex = df['Net_GEX'].abs().max()
+    df['Hedging_Pressure'] = (df['Net_GEX'] / max_gex * 100) if max_gex > 0 else 0
+    return df
+
+class DerivedViewCache:
+    # Small LRU of everything derived from one snapshot for one set of sidebar controls
+    # (surface, sliced/decayed frame, metrics, flips, key levels), shared by all sessions.
+    # Entries are read-only once stored: anything added later (the surface re-pricing,
+    # hedge flow per beta) goes into a copy that is put back under the same key, so a
+    # session never mutates a dict another session is reading.
+    def __init__(self, maxsize: int = DERIVED_VIEW_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            view = self._views.pop(key, None)
+            if view is not None:
+                self._views[key] = view
+            return view
+
+    def put(self, key: Tuple, view: Dict):
+        with self._lock:
+            self._views.pop(key, None)
+            self._views[key] = view
+            while len(self._views) > self.maxsize:
+                self._views.pop(next(iter(self._views)))
+
+@st.cache_resource
+def get_view_cache() -> DerivedViewCache:
+    return DerivedViewCache()
+
+def snapshot_key(meta: Dict) -> Tuple:
+    return (meta['symbol'], meta['expiry'], meta['timestamp'], meta.get('version'), meta.get('bus_version'))
+
+def view_key(meta: Dict, strikes_range: int, iv_source: str, time_offset: float) -> Tuple:
+    return snapshot_key(meta) + (strikes_range, iv_source, time_offset)
+
+def derive_view(df: pd.DataFrame, meta: Dict, strikes_range: int, iv_source: str, time_offset: float,
+                views: DerivedViewCache, perf: PerfRecorder) -> Dict:
+    # The surface (and the surface re-pricing) depends only on the snapshot, so it is kept
+    # under the bare snapshot key and reused while the strikes/time sliders move.
+    base = views.get(snapshot_key(meta))
+    if base is None:
+        with perf.span('compute.surface'):
+            base = {'surface': get_vol_surface_builder().surface(meta['symbol'], df, meta)}
+        views.put(snapshot_key(meta), base)
+        yield_if_superseded()
+    surface = base['surface']
+    if iv_source == "SVI Surface" and len(surface):
+        if 'repriced' not in base:
+            base = {**base, 'repriced': reprice_with_surface(df, meta, surface)}
+            views.put(snapshot_key(meta), base)
+        df = base['repriced']
+    df = slice_strikes(df, meta, strikes_range)
+    sim_days = None
+    if time_offset > 0:
+        df, sim_days = simulate_time_decay(df, meta, time_offset)
+    yield_if_superseded()
+    with perf.span('metrics.flow'):
+        metrics = calculate_flow_metrics(df, meta['futures_price'])
+    with perf.span('metrics.gamma_flips'):
+        gamma_flips = detect_gamma_flip_zones(df)
+    with perf.span('metrics.key_levels'):
+        key_levels = calculate_key_levels(df, meta['futures_price'])
+    return {'df': df, 'surface': surface, 'sim_days': sim_days, 'metrics': metrics,
+            'gamma_flips': gamma_flips, 'key_levels': key_levels, 'hedge_flow': {}}
+
+# ============================================================================
+# CROSS-INDEX OVERVIEW
+# ============================================================================
+
+OVERVIEW_SYMBOLS = list(SYMBOL_CONFIG)
+# Net exposure as a share of gross (|call| + |put| summed over strikes) past which a regime reads as strong
+OVERVIEW_STRONG_SHARE = 0.25
+
+@st.cache_data(ttl=180)
+def fetch_overview_chains(symbols: Tuple[str, ...], expiry_index: int) -> List[Tuple[Dict, Dict]]:
+    # Parsed chains only (dicts of arrays); every index is requested at once, so the
+    # wait is the slowest chain rather than the sum. Symbols that fail are dropped.
+    perf = get_perf_recorder()
+    perf.incr('cache_misses', cache='overview')
+    fetcher = DhanAPIFetcher(DhanConfig())
+    with perf.span('fetch.overview'), ThreadPoolExecutor(max_workers=len(symbols)) as pool:
+        chains = list(pool.map(lambda s: fetcher.fetch_raw_chain(s, expiry_index, FETCH_STRIKES_RANGE), symbols))
+    return [(raw, meta) for raw, meta in chains if raw is not None]
+
+def stack_chains(raws: List[Dict]) -> Dict:
+    # Pads every chain to the widest, strikes ascending. Padding has K = 0, which
+    # chain_greeks treats as invalid, and zero OI, so all its exposures are 0;
+    # `mask` marks the real strikes.
+    width = max(raw['strikes'].size for raw in raws)
+    stacked = {'strikes': np.zeros((len(raws), width)), 'mask': np.zeros((len(raws), width), dtype=bool)}
+    for side in ('ce', 'pe'):
+        stacked[side] = {name: np.zeros((len(raws), width)) for name in CHAIN_LEG_FIELDS}
+    for i, raw in enumerate(raws):
+        order = np.argsort(raw['strikes'], kind='stable')
+        stacked['strikes'][i, :order.size] = raw['strikes'][order]
+        stacked['mask'][i, :order.size] = True
+        for side in ('ce', 'pe'):
+            for name, values in raw[side].items():
+                stacked[side][name][i, :order.size] = values[order]
+    return stacked
+
+def exposure_regime(share: float) -> str:
+    if share > OVERVIEW_STRONG_SHARE: return "🟢 STRONG SUPPRESSION"
+    elif share > 0: return "🟢 SUPPRESSION"
+    elif share < -OVERVIEW_STRONG_SHARE: return "🔴 HIGH AMPLIFICATION"
+    elif share < 0: return "🔴 AMPLIFICATION"
+    return "⚖️ NEUTRAL"
+
+def batch_overview(chains: List[Tuple[Dict, Dict]], strikes_range: int, risk_free_rate: float = 0.07) -> pd.DataFrame:
+    # One chain_greeks/chain_columns pass and one flow_metrics_kernel pass for every
+    # index: futures, time and lot size are (B, 1) columns against (B, N) strikes.
+    # Strikes outside the slider's range are masked, as slice_strikes would drop them.
+    raws, metas = [raw for raw, _ in chains], [meta for _, meta in chains]
+    stacked = stack_chains(raws)
+    F = np.array([m['futures_price'] for m in metas], dtype=np.float64)[:, None]
+    T = np.array([m['days_to_expiry'] for m in metas], dtype=np.float64)[:, None] / 365
+    configs = [symbol_config(m['symbol']) for m in metas]
+    cs = np.array([c['contract_size'] for c in configs], dtype=np.float64)[:, None]
+    interval = np.array([c['strike_interval'] for c in configs], dtype=np.float64)[:, None]
+    strikes = stacked['strikes']
+    mask = stacked['mask'] & (np.abs(strikes - F) / interval <= strikes_range)
+    
+    greeks = chain_greeks(F, strikes, T, risk_free_rate, stacked['ce']['iv'], stacked['pe']['iv'])
+    columns = chain_columns(stacked, greeks, F, cs)
+    net_gex = np.where(mask, columns['Net_GEX'], np.nan)
+    net_dex = np.where(mask, columns['Net_DEX'], np.nan)
+    call_oi, put_oi = np.where(mask, stacked['ce']['oi'], 0), np.where(mask, stacked['pe']['oi'], 0)
+    kernel = flow_metrics_kernel(np.where(mask, strikes, np.nan), net_gex, net_dex, F, call_oi, put_oi)
+    
+    gross_gex = np.nansum(np.abs(net_gex), axis=1)
+    gross_dex = np.nansum(np.abs(net_dex), axis=1)
+    gex_share = np.divide(kernel['gex_total'], gross_gex, out=np.zeros_like(gross_gex), where=gross_gex > 0)
+    dex_share = np.divide(kernel['dex_total'], gross_dex, out=np.zeros_like(gross_dex), where=gross_dex > 0)
+    rows = np.arange(len(metas))
+    atm = np.argmin(np.where(mask, np.abs(strikes - F), np.inf), axis=1)
+    straddle = stacked['ce']['ltp'][rows, atm] + stacked['pe']['ltp'][rows, atm]
+    notional = (call_oi + put_oi).sum(axis=1) * cs[:, 0] * F[:, 0]
+    
+    return pd.DataFrame({
+        'Symbol': [m['symbol'] for m in metas], 'Expiry': [m['expiry'] for m in metas],
+        'Futures': F[:, 0], 'Net_GEX': kernel['gex_total'], 'Near_GEX': kernel['gex_near_total'],
+        'GEX_Share': gex_share, 'Regime': [exposure_regime(x) for x in gex_share],
+        'Net_DEX': kernel['dex_total'], 'DEX_Share': dex_share,
+        'Flip_Level': kernel['flip_level'], 'Flip_Distance_Pct': (kernel['flip_level'] / F[:, 0] - 1) * 100,
+        'PCR': kernel['pcr'], 'ATM_Strike': strikes[rows, atm], 'Straddle': straddle,
+        'Straddle_Pct': straddle / F[:, 0] * 100, 'OI_Notional': notional / 1e9,
+        'Weight': notional / notional.sum() if notional.sum() > 0 else np.full(len(metas), 1 / len(metas)),
+        'Timestamp': [m['timestamp'] for m in metas],
+    })
+
+def overview_aggregate(overview: pd.DataFrame) -> Dict:
+    # Ratios are averaged by open-interest notional, so the books dealers actually
+    # hedge dominate; ₹ exposures just add up.
+    def weighted(col):
+        values = overview[col]
+        weights = overview['Weight'][values.notna()]
+        return float((values.dropna() * weights).sum() / weights.sum()) if weights.sum() > 0 else np.nan
+    gex_share = weighted('GEX_Share')
+    return {
+        'net_gex': float(overview['Net_GEX'].sum()), 'near_gex': float(overview['Near_GEX'].sum()),
+        'net_dex': float(overview['Net_DEX'].sum()), 'gex_share': gex_share, 'dex_share': weighted('DEX_Share'),
+        'regime': exposure_regime(gex_share), 'flip_distance_pct': weighted('Flip_Distance_Pct'),
+        'pcr': weighted('PCR'), 'straddle_pct': weighted('Straddle_Pct'),
+        'oi_notional': float(overview['OI_Notional'].sum()),
+    }
+
+# ============================================================================
+# WARM-UP
+# ============================================================================
+
+WARMUP_SYMBOLS = [s for s in os.environ.get("GEX_WARMUP_SYMBOLS", "").split(",") if s] or list(SYMBOL_CONFIG)
+WARMUP_EXPIRIES = int(os.environ.get("GEX_WARMUP_EXPIRIES", "1"))
+# Tracked chains are re-fetched this often (seconds) so they never age out of the
+# 180 s fetch cache between viewers; 0 warms once at start-up only.
+WARMUP_INTERVAL = float(os.environ.get("GEX_WARMUP_INTERVAL", "150"))
+READY_FILE = os.environ.get("GEX_READY_FILE", "")
+# Retry period (seconds) while a pass has produced no chain at all
+WARMUP_RETRY = 30.0
+# With the shared bus a warm read may queue behind the leader's other first fetches
+WARMUP_BUS_WAIT = 60.0
+
+def warm_imports():
+    # First use of plotly's validators/serializer and scipy's solvers costs far more
+    # than any later call; pay it once here instead of in the first viewer's render.
+    fig = make_subplots(rows=1, cols=2)
+    fig.add_trace(go.Bar(x=[1, 2], y=[1, -1]), row=1, col=1)
+    fig.add_trace(go.Heatmap(z=[[0, 1], [1, 0]]), row=1, col=2)
+    fig.add_trace(go.Scatter(x=[1, 2], y=[1, 2], fill='tozerox'), row=1, col=1)
+    fig.add_trace(go.Indicator(mode="gauge+number", value=0))
+    fig.to_json()
+    least_squares(lambda x: x - 1.0, [0.0])
+    norm.cdf(np.zeros(2))
+
+class WarmUp:
+    # One per process. The first script run (normally serve.py's start-up probe) starts
+    # it; it warms imports and pooled connections, then fetches every tracked
+    # symbol/expiry through fetch_chain and builds its default view, so first viewers
+    # and symbol switches hit warm caches. A chain that cannot be fetched falls back to
+    # its last persisted snapshot. `ready` is set once a pass has produced at least one
+    # chain (a pass where every chain failed leaves the process 'degraded' and retries),
+    # and the status is mirrored to READY_FILE for probes outside the process.
+    def __init__(self, fetch, symbols: List[str] = None, expiries: int = WARMUP_EXPIRIES,
+                 interval: float = WARMUP_INTERVAL, ready_file: str = READY_FILE):
+        self.fetch = fetch
+        self.symbols = symbols or WARMUP_SYMBOLS
+        self.expiries = expiries
+        self.interval = interval
+        self.ready_file = ready_file
+        self.ready = threading.Event()
+        self.status = {'stage': 'pending', 'done': 0, 'total': len(self.symbols) * expiries,
+                       'fetched': 0, 'persisted': 0, 'failed': 0, 'passes': 0}
+        self.stage_seconds = {}
+        self.errors = deque(maxlen=20)
+        self._persisted = {}
+        self._stop = threading.Event()
+
+    def start(self) -> 'WarmUp':
+        threading.Thread(target=self._run, daemon=True, name='warm-up').start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def persisted(self, symbol: str, expiry_index: int) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        return self._persisted.get((symbol, expiry_index), (None, None))
+
+    def _stage(self, stage: str, job):
+        self.status['stage'] = stage
+        started = time.perf_counter()
+        try:
+            job()
+        except Exception as e:  # a failed stage only costs its warmth, never readiness
+            get_perf_recorder().record_error(f'warmup.{stage}', e)
+            self.errors.append(f"{stage}: {type(e).__name__}: {e}")
+        self.stage_seconds[stage] = time.perf_counter() - started
+        get_perf_recorder().observe(f'warmup.{stage}', self.stage_seconds[stage])
+
+    def _load_persisted(self, symbol: str, expiry_index: int) -> Tuple[Optional[pd.DataFrame], Optional[Dict]]:
+        store = get_snapshot_store()
+        today = get_data_source().now().strftime('%Y-%m-%d')
+        expiries = [e for e in store.expiries(symbol) if e >= today]
+        if expiry_index < len(expiries):
+            return store.latest(symbol, expiries[expiry_index])
+        return store.latest(symbol) if expiry_index == 0 else (None, None)
+
+    def warm_snapshots(self, refresh: bool = False):
+        views = get_view_cache()
+        self.status.update(done=0, fetched=0, persisted=0, failed=0)
+        for symbol in self.symbols:
+            for expiry_index in range(self.expiries):
+                if self._stop.is_set():
+                    return
+                if refresh and hasattr(self.fetch, 'clear'):
+                    self.fetch.clear(symbol, expiry_index)
+                try:
+                    frame, columns, meta = self.fetch(symbol, expiry_index)
+                except Exception as e:
+                    get_perf_recorder().record_error('warmup.fetch', e)
+                    self.errors.append(f"{symbol}[{expiry_index}]: {type(e).__name__}: {e}")
+                    frame, meta = None, None
+                if frame is not None:
+                    df = CompactChain(frame, columns).to_frame()
+                    self._persisted.pop((symbol, expiry_index), None)
+                    self.status['fetched'] += 1
+                else:
+                    df, meta = self._load_persisted(symbol, expiry_index)
+                    if df is not None:
+                        self._persisted[(symbol, expiry_index)] = (df, meta)
+                    self.status['persisted' if df is not None else 'failed'] += 1
+                if df is not None:
+                    key = view_key(meta, DEFAULT_STRIKES_RANGE, "Quoted", 0.0)
+                    if views.get(key) is None:
+                        views.put(key, derive_view(df, meta, DEFAULT_STRIKES_RANGE, "Quoted", 0.0, views,
+                                                   get_perf_recorder()))
+                self.status['done'] += 1
+
+    def write_ready_file(self):
+        if not self.ready_file:
+            return
+        state = {**self.status, 'ready': self.ready.is_set(), 'pid': os.getpid(),
+                 'stage_seconds': self.stage_seconds, 'errors': list(self.errors),
+                 'updated': datetime.now().strftime(SNAPSHOT_TS_FORMAT)}
+        tmp_path = f"{self.ready_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.ready_file)
+
+    def _finish_pass(self):
+        self.status['passes'] += 1
+        if self.status['total'] and self.status['failed'] == self.status['total']:
+            self.status['stage'] = 'degraded'
+        else:
+            self.status['stage'] = 'ready'
+            self.ready.set()
+        self.write_ready_file()
+
+    def _run(self):
+        self.write_ready_file()
+        self._stage('imports', warm_imports)
+        self._stage('connections', lambda: (get_data_source().warm(), get_instrument_master()))
+        self._stage('snapshots', self.warm_snapshots)
+        self._finish_pass()
+        while not (self.ready.is_set() and self.interval <= 0):
+            if self._stop.wait(self.interval if self.ready.is_set() else WARMUP_RETRY):
+                return
+            self._stage('refresh', lambda: self.warm_snapshots(refresh=True))
+            self._finish_pass()
+
+def fetch_shared_chain(symbol: str, expiry_index: int):
+    # Warm-up source when replicas share a bus: request the key and read what the
+    # leader publishes, so only the leader ever calls Dhan.
+    chain, meta = read_shared_snapshot(get_shared_bus(), symbol, expiry_index, FETCH_STRIKES_RANGE, WARMUP_BUS_WAIT)
+    return (chain.frame, chain.columns, meta) if chain is not None else (None, None, None)
+
+@st.cache_resource
+def get_warmup() -> WarmUp:
+    bus = get_shared_bus()
+    if bus is not None:
+        # Queue every tracked key up front so the leader's first cycle covers them all
+        for symbol in WARMUP_SYMBOLS:
+            for expiry_index in range(WARMUP_EXPIRIES):
+                bus.request(symbol, expiry_index)
+        get_shared_bus_leader()
+        return WarmUp(fetch_shared_chain).start()
+    return WarmUp(fetch_chain).start()
+
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
 
 def main():
+    refresh_started = time.perf_counter()
+    perf = get_perf_recorder()
+    warmup = get_warmup()
     if 'last_refresh' not in st.session_state:
         st.session_state.last_refresh = datetime.now()
     if 'refresh_interval' not in st.session_state:
@@ -964,9 +4811,26 @@ def main():
     
     with st.sidebar:
         st.markdown("### ⚙️ Configuration")
-        symbol = st.selectbox("📈 Select Index", options=list(DHAN_SECURITY_IDS.keys()), index=0)
-        strikes_range = st.slider("📏 Strikes Range", min_value=5, max_value=20, value=12)
+        instruments = get_instrument_master()
+        instruments.refresh_if_stale()
+        page = st.radio("🗂️ View", ["Single Index", "Cross-Index Overview"], horizontal=True,
+                        help="Cross-Index Overview prices every index's chain in one batched pass")
+        symbol = st.selectbox("📈 Select Underlying", options=available_symbols(), index=0)
+        strikes_range = st.slider("📏 Strikes Range", min_value=5, max_value=FETCH_STRIKES_RANGE, value=DEFAULT_STRIKES_RANGE)
         expiry_index = st.number_input("📅 Expiry Index", min_value=0, max_value=5, value=0)
+        data_mode = st.radio("📡 Data Mode", ["Polling", "Streaming"], horizontal=True,
+                             help=f"Streaming consumes tick updates from the feed at {FEED_ADDRESS}")
+        iv_source = st.radio("🌊 IV for Greeks", ["Quoted", "SVI Surface"], horizontal=True,
+                             help="SVI Surface prices every strike off a smooth smile fitted across expiries")
+        if len(instruments):
+            st.caption(f"📇 {len(instruments.underlyings())} F&O underlyings · master checked {instruments.checked or 'never'}")
+        publisher = get_snapshot_publisher()
+        if publisher is not None:
+            st.caption(f"📤 Publishing on {publisher.address} · {len(publisher.subscriptions)} subscriber(s) · "
+                       f"{publisher.stats['published']:,} snapshots · {publisher.dropped:,} dropped")
+        if not warmup.ready.is_set():
+            st.caption(f"🔥 Warming up ({warmup.status['stage']}): "
+                       f"{warmup.status['done']}/{warmup.status['total']} tracked chains")
         
         st.markdown("---")
         st.markdown("### 🔄 Auto Refresh")
@@ -983,6 +4847,9 @@ def main():
         st.markdown("---")
         st.markdown("### 🔑 API Status")
         config = DhanConfig()
+        data_source = get_data_source()
+        if data_source.name != "live":
+            st.info(f"📼 Data source: {data_source.name} | Clock: {data_source.now():%Y-%m-%d %H:%M:%S}")
         try:
             expiry_time = datetime.strptime(config.expiry_time, "%Y-%m-%dT%H:%M:%S")
             remaining = expiry_time - datetime.now()
@@ -990,9 +4857,18 @@ def main():
                 st.success(f"✅ Token Valid: {remaining.days}d {remaining.seconds//3600}h")
             else:
                 st.error("❌ Token Expired")
-        except:
+        except ValueError:
             st.warning("⚠️ Token status unknown")
         
+        st.markdown("---")
+        st.markdown("### 🔔 Alerts")
+        recent_alerts = list(get_alert_engine().recent)[-5:]
+        if recent_alerts:
+            for alert in reversed(recent_alerts):
+                st.caption(f"{alert['timestamp'][11:]} · {alert['symbol']} · {alert['message']}")
+        else:
+            st.caption("No alerts fired yet")
+        
         st.markdown("---")
         st.markdown("### 📊 Time Machine")
         time_offset = st.slider("⏰ Simulate Time Forward (hours)", min_value=0.0, max_value=24.0, value=0.0, step=0.5)
@@ -1016,25 +4892,128 @@ def main():
             st.cache_data.clear()
             st.rerun()
     
-    @st.cache_data(ttl=180)
-    def fetch_data(symbol, strikes_range, expiry_index):
-        fetcher = DhanAPIFetcher(DhanConfig())
-        return fetcher.process_option_chain(symbol, expiry_index, strikes_range)
+    debounce_controls((page, symbol, strikes_range, expiry_index, data_mode, iv_source, refresh_interval, time_offset))
+    
+    if page == "Cross-Index Overview":
+        with st.spinner("🔄 Fetching every index from Dhan API..."):
+            misses_before = perf.counter('cache_misses', cache='overview')
+            with perf.span('fetch.overview_total'):
+                chains = fetch_overview_chains(tuple(OVERVIEW_SYMBOLS), expiry_index)
+            if perf.counter('cache_misses', cache='overview') == misses_before:
+                perf.incr('cache_hits', cache='overview')
+        if not chains:
+            st.error("❌ Failed to fetch data. Please check API credentials or try again.")
+            return
+        with perf.span('compute.overview'):
+            overview = batch_overview(chains, strikes_range)
+            aggregate = overview_aggregate(overview)
+        
+        st.markdown("### 🌐 Cross-Index Overview")
+        cols = st.columns(5)
+        with cols[0]:
+            gex_class = "positive" if aggregate['net_gex'] > 0 else "negative"
+            st.markdown(f"""<div class="metric-card {gex_class}"><div class="metric-label">Total Net GEX</div>
+                <div class="metric-value {gex_class}">{aggregate['net_gex']:.4f}B</div>
+                <div class="metric-delta">Near: {aggregate['near_gex']:.4f}B</div></div>""", unsafe_allow_html=True)
+        with cols[1]:
+            dex_class = "positive" if aggregate['net_dex'] > 0 else "negative"
+            st.markdown(f"""<div class="metric-card {dex_class}"><div class="metric-label">Total Net DEX</div>
+                <div class="metric-value {dex_class}">{aggregate['net_dex']:.4f}B</div>
+                <div class="metric-delta">Net/Gross: {aggregate['dex_share']:+.2f}</div></div>""", unsafe_allow_html=True)
+        with cols[2]:
+            share_class = "positive" if aggregate['gex_share'] > 0 else "negative"
+            st.markdown(f"""<div class="metric-card {share_class}"><div class="metric-label">Weighted GEX Regime</div>
+                <div class="metric-value {share_class}">{aggregate['gex_share']:+.2f}</div>
+                <div class="metric-delta">{aggregate['regime']}</div></div>""", unsafe_allow_html=True)
+        with cols[3]:
+            pcr_class = "positive" if aggregate['pcr'] > 1 else "negative"
+            st.markdown(f"""<div class="metric-card {pcr_class}"><div class="metric-label">Weighted PCR</div>
+                <div class="metric-value {pcr_class}">{aggregate['pcr']:.2f}</div>
+                <div class="metric-delta">Flip {aggregate['flip_distance_pct']:+.2f}% from futures</div></div>""", unsafe_allow_html=True)
+        with cols[4]:
+            st.markdown(f"""<div class="metric-card neutral"><div class="metric-label">Weighted Straddle</div>
+                <div class="metric-value">{aggregate['straddle_pct']:.2f}%</div>
+                <div class="metric-delta">OI notional ₹{aggregate['oi_notional']:,.0f}B</div></div>""", unsafe_allow_html=True)
+        
+        show_chart(create_overview_chart(overview, aggregate), 'overview')
+        show_frame(overview.drop(columns=['Timestamp']).style.format({
+            'Futures': '₹{:,.2f}', 'Net_GEX': '{:.4f}', 'Near_GEX': '{:.4f}', 'GEX_Share': '{:+.2f}',
+            'Net_DEX': '{:.4f}', 'DEX_Share': '{:+.2f}', 'Flip_Level': '{:,.1f}', 'Flip_Distance_Pct': '{:+.2f}%',
+            'PCR': '{:.2f}', 'ATM_Strike': '{:,.0f}', 'Straddle': '₹{:,.2f}', 'Straddle_Pct': '{:.2f}%',
+            'OI_Notional': '₹{:,.0f}B', 'Weight': '{:.1%}'}, na_rep='–'), 'overview_table', hide_index=True)
+        missing = [s for s in OVERVIEW_SYMBOLS if s not in set(overview['Symbol'])]
+        st.caption(f"Expiry index {expiry_index} · ±{strikes_range} strikes · snapshot {overview['Timestamp'].max()} · "
+                   f"aggregate weighted by OI notional (OI × lot size × futures)"
+                   + (f" · unavailable: {', '.join(missing)}" if missing else ""))
+        return
     
-    with st.spinner(f"🔄 Fetching {symbol} data from Dhan API..."):
-        df, meta = fetch_data(symbol, strikes_range, expiry_index)
+    if data_mode == "Streaming":
+        consumer = get_feed_consumer()
+        with st.spinner(f"📡 Attaching {symbol} to the live feed..."):
+            live_chain = seed_live_chain(consumer, DhanAPIFetcher(DhanConfig()), symbol, expiry_index)
+        chain, meta = None, None
+        if live_chain is not None:
+            stream_df, meta = consumer.latest_snapshot(symbol, live_chain.expiry)
+            if stream_df is None:
+                consumer.publish()
+                stream_df, meta = consumer.latest_snapshot(symbol, live_chain.expiry)
+            chain = CompactChain.from_frame(stream_df)
+            with st.sidebar:
+                st.caption(f"📡 Feed {'connected' if consumer.connected else 'disconnected'} | "
+                           f"{consumer.stats['updates']:,} updates | {consumer.stats['publishes']:,} snapshots "
+                           f"({consumer.stats['ingests']:,} ingested) | "
+                           f"{consumer.stats['bad_messages']:,} malformed | "
+                           f"{live_chain.repriced:,} strikes re-priced | v{meta['version']}")
+    elif get_shared_bus() is not None:
+        get_shared_bus_leader()
+        with st.spinner(f"🔄 Waiting for shared {symbol} snapshot..."):
+            with perf.span('bus.read'):
+                chain, meta = read_shared_snapshot(get_shared_bus(), symbol, expiry_index, FETCH_STRIKES_RANGE)
+        if meta is not None:
+            with st.sidebar:
+                st.caption(f"🧩 Shared snapshot v{meta['bus_version']} | "
+                           f"{'leader' if get_shared_bus_leader().is_leader else 'follower'}")
+    else:
+        with st.spinner(f"🔄 Fetching {symbol} data from Dhan API..."):
+            misses_before = perf.counter('cache_misses', cache='fetch_data')
+            with perf.span('fetch.total'):
+                frame, frame_columns, meta = fetch_chain(symbol, expiry_index)
+            chain = CompactChain(frame, frame_columns) if frame is not None else None
+            if perf.counter('cache_misses', cache='fetch_data') == misses_before:
+                perf.incr('cache_hits', cache='fetch_data')
+        if chain is None:
+            persisted_df, persisted_meta = warmup.persisted(symbol, expiry_index)
+            if persisted_df is not None:
+                chain, meta = CompactChain.from_frame(persisted_df), persisted_meta
+                st.warning(f"📦 Live fetch failed; showing the last persisted snapshot from {meta['timestamp']}")
     
-    if df is None or meta is None:
+    if chain is None or meta is None:
         st.error("❌ Failed to fetch data. Please check API credentials or try again.")
         return
+    yield_if_superseded()
     
-    if time_offset > 0:
-        df, sim_days = simulate_time_decay(df, meta, time_offset)
-        st.info(f"⏰ Time Machine Active: Simulating {time_offset}h forward | Days to expiry: {sim_days:.1f}")
+    views = get_view_cache()
+    key = view_key(meta, strikes_range, iv_source, time_offset)
+    view = views.get(key)
+    if view is None:
+        perf.incr('cache_misses', cache='derived_view')
+        view = derive_view(chain.to_frame(), meta, strikes_range, iv_source, time_offset, views, perf)
+        views.put(key, view)
+    else:
+        perf.incr('cache_hits', cache='derived_view')
+    df, surface = view['df'], view['surface']
+    metrics, gamma_flips, key_levels = view['metrics'], view['gamma_flips'], view['key_levels']
     
-    metrics = calculate_flow_metrics(df, meta['futures_price'])
-    gamma_flips = detect_gamma_flip_zones(df)
-    key_levels = calculate_key_levels(df, meta['futures_price'])
+    # Last snapshot toasted per symbol, so reruns on the same snapshot stay quiet
+    toasted = st.session_state.setdefault('toasted_alerts', {})
+    if toasted.get(symbol) != meta['timestamp']:
+        for alert in get_alert_engine().recent:
+            if alert['symbol'] == symbol and alert['timestamp'] == meta['timestamp']:
+                st.toast(f"🔔 {alert['message']}")
+        toasted[symbol] = meta['timestamp']
+    
+    if time_offset > 0:
+        st.info(f"⏰ Time Machine Active: Simulating {time_offset}h forward | Days to expiry: {view['sim_days']:.1f}")
     
     st.markdown("### 📊 Market Overview")
     cols = st.columns(6)
@@ -1083,24 +5062,24 @@ def main():
     st.markdown("---")
     tabs = st.tabs(["📊 GEX/DEX", "🎯 Hedging Pressure", "📈 Vanna & Charm", "🔄 Flow", "📋 Data", "💡 Strategies"])
     
-    with tabs[0]:
+    with tabs[0], perf.span('render.gex_dex'):
         col1, col2 = st.columns(2)
         with col1:
-            st.plotly_chart(create_gex_chart(df, meta['futures_price'], gamma_flips), use_container_width=True)
+            show_chart(create_gex_chart(df, meta['futures_price'], gamma_flips), 'gex')
         with col2:
-            st.plotly_chart(create_dex_chart(df, meta['futures_price']), use_container_width=True)
+            show_chart(create_dex_chart(df, meta['futures_price']), 'dex')
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            st.plotly_chart(create_combined_gauge(metrics), use_container_width=True)
-        st.plotly_chart(create_straddle_payoff_chart(meta), use_container_width=True)
+            show_chart(create_combined_gauge(metrics), 'combined_gauge')
+        show_chart(create_straddle_payoff_chart(meta), 'straddle_payoff')
     
-    with tabs[1]:
+    with tabs[1], perf.span('render.hedging'):
         col1, col2 = st.columns(2)
         with col1:
-            st.plotly_chart(create_hedging_pressure_chart(df, meta['futures_price']), use_container_width=True)
+            show_chart(create_hedging_pressure_chart(df, meta['futures_price']), 'hedging_pressure')
         with col2:
-            st.plotly_chart(create_oi_distribution_chart(df, meta['futures_price']), use_container_width=True)
+            show_chart(create_oi_distribution_chart(df, meta['futures_price']), 'oi_distribution')
         
         st.markdown("### 🎯 Key Levels")
         cols = st.columns(5)
@@ -1115,6 +5094,19 @@ def main():
                     <div class="metric-label">{label}</div>
                     <div class="metric-value" style="color: {color};">{value:,.0f}</div></div>""", unsafe_allow_html=True)
         
+        st.markdown("### 🌊 Dealer Hedge Flow")
+        iv_spot_beta = st.slider("IV-Spot Beta (vol pts per 1% move)", min_value=-2.0, max_value=1.0,
+                                 value=HEDGE_IV_SPOT_BETA, step=0.1, key="iv_spot_beta")
+        hedge_flow = view['hedge_flow'].get(iv_spot_beta)
+        if hedge_flow is None:
+            with perf.span('compute.hedge_flow'):
+                hedge_flow = estimate_hedge_flow(df, meta, iv_spot_beta=iv_spot_beta)
+            view = {**view, 'hedge_flow': {**view['hedge_flow'], iv_spot_beta: hedge_flow}}
+            views.put(key, view)
+        show_chart(create_hedge_flow_chart(hedge_flow, meta['futures_price']), 'hedge_flow')
+        st.caption(f"Charm over {session_fraction_left(meta['timestamp']) * 100:.0f}% of the session left. "
+                   "Dealers assumed long calls / short puts, as in GEX.")
+        
         if gamma_flips:
             st.markdown("### 🔄 Gamma Flip Zones")
             for i, zone in enumerate(gamma_flips, 1):
@@ -1124,23 +5116,46 @@ def main():
                     <div><span style="color: #64748b;">Range:</span><span style="font-weight: 600;"> {zone['lower_strike']:,.0f} - {zone['upper_strike']:,.0f}</span></div>
                     <div><span style="color: #64748b;">Impact:</span><span style="font-weight: 600; color: {'#10b981' if zone['impact'] == 'Support' else '#ef4444'};"> {zone['impact']}</span></div></div></div>""", unsafe_allow_html=True)
     
-    with tabs[2]:
-        st.plotly_chart(create_vanna_charm_chart(df, meta['futures_price']), use_container_width=True)
+    with tabs[2], perf.span('render.vanna_charm'):
+        show_chart(create_vanna_charm_chart(df, meta['futures_price']), 'vanna_charm')
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("### 📊 Vanna Exposure")
             vanna_df = df[['Strike', 'Net_Vanna', 'Call_Vanna', 'Put_Vanna']].sort_values('Net_Vanna', ascending=False).head(10)
-            st.dataframe(vanna_df, use_container_width=True, hide_index=True)
+            show_frame(vanna_df, 'vanna_table', hide_index=True)
             st.markdown(f"**Total Vanna:** {metrics['vanna_total']:.4f}B")
         with col2:
             st.markdown("### 📊 Charm Exposure")
             charm_df = df[['Strike', 'Net_Charm', 'Call_Charm', 'Put_Charm']].sort_values('Net_Charm', ascending=False).head(10)
-            st.dataframe(charm_df, use_container_width=True, hide_index=True)
+            show_frame(charm_df, 'charm_table', hide_index=True)
             st.markdown(f"**Total Charm:** {metrics['charm_total']:.6f}B/day")
-        st.plotly_chart(create_iv_smile_chart(df, meta['futures_price']), use_container_width=True)
+        if 'Net_Speed' in df:
+            st.markdown("### 🧬 Higher-Order Exposure")
+            show_chart(create_higher_order_chart(df, meta['futures_price']), 'higher_order')
+            cols = st.columns(4)
+            totals = [("Speed", metrics['speed_total'], "B per 1%"), ("Zomma", metrics['zomma_total'], "B per vol pt"),
+                      ("Color", metrics['color_total'], "B/day"), ("Vomma", metrics['vomma_total'], "B per vol pt²")]
+            for col, (label, value, unit) in zip(cols, totals):
+                with col:
+                    value_class = "positive" if value > 0 else "negative"
+                    st.markdown(f"""<div class="metric-card {value_class}"><div class="metric-label">Net {label}</div>
+                        <div class="metric-value {value_class}">{value:.4f}</div>
+                        <div class="metric-delta">{unit}</div></div>""", unsafe_allow_html=True)
+            st.caption("Signed like GEX (dealers long calls / short puts): speed, zomma and color show how "
+                       "Net GEX shifts with spot, implied vol and time; vomma how vega shifts with implied vol.")
+        show_chart(create_iv_smile_chart(df, meta['futures_price'], surface, meta['days_to_expiry'] / 365), 'iv_smile')
+        if surface is not None and len(surface):
+            with st.expander("🌊 Volatility Surface Fits"):
+                show_frame(pd.DataFrame([{
+                    'Expiry': f.expiry, 'Days': round(f.T * 365), 'ATM IV (%)': float(f.iv(f.forward)) * 100,
+                    'RMSE (var)': f.rmse, 'Points': f.points, 'Evaluations': f.nfev,
+                    'Warm Start': f.warm_start, 'Snapshot': f.timestamp,
+                    'a': f.params[0], 'b': f.params[1], 'ρ': f.params[2], 'm': f.params[3], 'σ': f.params[4],
+                } for f in surface.fits]), 'surface_fits', hide_index=True)
+                st.caption(f"{len(surface)} expiries fitted in {get_vol_surface_builder().last_elapsed * 1000:.1f} ms")
     
-    with tabs[3]:
-        st.plotly_chart(create_flow_chart(df, meta['futures_price']), use_container_width=True)
+    with tabs[3], perf.span('render.flow'):
+        show_chart(create_flow_chart(df, meta['futures_price']), 'flow')
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("### 📊 GEX Flow")
@@ -1152,8 +5167,32 @@ def main():
             dex_class = 'positive' if metrics['flow_dex_total'] > 0 else 'negative'
             st.markdown(f"""<div class="metric-card {dex_class}"><div class="metric-label">Total DEX Flow</div>
                 <div class="metric-value">{'+'if metrics['flow_dex_total'] > 0 else ''}{metrics['flow_dex_total']:.4f}B</div></div>""", unsafe_allow_html=True)
+        
+        st.markdown("### 📈 Session History")
+        history = get_exposure_history().series(symbol, meta['expiry'], meta['timestamp'][:10])
+        if len(history) < 2:
+            st.info("History builds up as snapshots are captured during the session.")
+        else:
+            show_chart(create_history_chart(history.to_frame()), 'history')
+            show_frame(history.rolling_summary().style.format("{:.4f}", na_rep="–"), 'history_summary')
+        
+        st.markdown("### 🗺️ Strike × Time Heatmap")
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            heatmap_field = st.radio("Field", list(HEATMAP_FIELDS.keys()), horizontal=True, key="heatmap_field")
+        with col2:
+            heatmap_bins = st.select_slider("Time Resolution", options=[25, 75, 125, 375], value=HEATMAP_TIME_BINS,
+                                            format_func=lambda b: f"{375 // b} min", key="heatmap_bins")
+        with perf.span('compute.heatmap'):
+            grid = get_exposure_heatmaps().grid(symbol, meta['expiry'], meta['timestamp'][:10], heatmap_field, heatmap_bins)
+        if len(grid) == 0:
+            st.info("The heatmap fills in as snapshots are stored during the session.")
+        else:
+            show_chart(create_heatmap_chart(grid), 'heatmap')
+            st.caption(f"{len(grid):,} snapshots → {grid.sums.shape[0]} × {grid.time_bins} cells "
+                       f"({grid.step:,.0f}-pt strike buckets)")
     
-    with tabs[4]:
+    with tabs[4], perf.span('render.data'):
         st.markdown("### 📋 Complete Option Chain Data")
         display_cols = ['Strike', 'Call_OI', 'Put_OI', 'Call_OI_Change', 'Put_OI_Change',
                        'Call_IV', 'Put_IV', 'Call_LTP', 'Put_LTP', 'Net_GEX', 'Net_DEX', 'Net_Vanna', 'Hedging_Pressure']
@@ -1162,24 +5201,89 @@ def main():
         display_df['Net_DEX'] = display_df['Net_DEX'].apply(lambda x: f"{x:.4f}B")
         display_df['Net_Vanna'] = display_df['Net_Vanna'].apply(lambda x: f"{x:.4f}B")
         display_df['Hedging_Pressure'] = display_df['Hedging_Pressure'].apply(lambda x: f"{x:.1f}%")
-        st.dataframe(display_df, use_container_width=True, hide_index=True, height=600)
-        csv = df.to_csv(index=False)
-        st.download_button("📥 Download Full Data (CSV)", data=csv,
-                          file_name=f"NYZTrade_{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", mime="text/csv")
+        show_frame(display_df, 'chain_table', hide_index=True, height=600)
+        
+        with st.expander("💾 Snapshot Memory Report"):
+            report = chain.memory_report()
+            cols = st.columns(4)
+            cols[0].metric("Compact", f"{report['compact_bytes'] / 1024:.1f} KB")
+            cols[1].metric("Expanded", f"{report['expanded_bytes'] / 1024:.1f} KB")
+            cols[2].metric("Reduction", f"{report['ratio']:.1f}x")
+            cols[3].metric("Stored / Derived Cols", f"{report['stored_columns']} / {report['derived_columns']}")
+            show_frame(report['columns'], 'export_columns', hide_index=True)
+        
+        if SNAPSHOT_FORMAT == 'delta':
+            with st.expander("🗜️ Delta Store Compression"):
+                if st.button("Measure", key="delta_report"):
+                    report = get_snapshot_store().compression_report(symbol)
+                    if report['snapshots']:
+                        cols = st.columns(4)
+                        cols[0].metric("Snapshots", f"{report['snapshots']:,}", f"{report['keyframes']} keyframes")
+                        cols[1].metric("On Disk", f"{report['delta_bytes'] / 1024:.0f} KB",
+                                       f"{report['bytes_per_snapshot']:.0f} B/snapshot", delta_color="off")
+                        cols[2].metric("vs Parquet", f"{report['ratio']:.1f}x smaller")
+                        cols[3].metric("Decode", f"{report['decode_ms_mean']:.1f} ms",
+                                       f"max {report['decode_ms_max']:.1f} ms | {report['sequential_per_sec']:,.0f}/s sequential",
+                                       delta_color="off")
+                    else:
+                        st.info("No delta-encoded snapshots for this symbol yet.")
+        
+        st.markdown("### 📥 Export")
+        col1, col2 = st.columns(2)
+        with col1:
+            export_scope = st.radio("Scope", ["Current Snapshot", "Stored History"], horizontal=True)
+        with col2:
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS.keys()))
+        
+        if export_scope == "Current Snapshot":
+            export_df, export_meta = df, meta
+            export_name = export_filename(symbol, export_format)
+            st.download_button("📥 Download Snapshot", data=lambda: export_to_file([(export_df, export_meta)], export_format),
+                              file_name=export_name, mime=EXPORT_FORMATS[export_format]['mime'])
+        else:
+            store = get_snapshot_store()
+            stored_expiries = store.expiries(symbol)
+            if not stored_expiries:
+                st.info("No stored snapshots for this symbol yet.")
+            else:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    export_expiry = st.selectbox("Expiry", ["All"] + stored_expiries,
+                                                 index=1 + stored_expiries.index(meta['expiry']) if meta['expiry'] in stored_expiries else 0)
+                with col2:
+                    start_date = st.date_input("From", value=datetime.now().date())
+                with col3:
+                    end_date = st.date_input("To", value=datetime.now().date())
+                range_start = datetime.combine(start_date, datetime.min.time())
+                range_end = datetime.combine(end_date, datetime.max.time())
+                range_expiry = None if export_expiry == "All" else export_expiry
+                n_snapshots = len(store.list_snapshots(symbol, range_expiry, range_start, range_end))
+                st.caption(f"{n_snapshots} stored snapshot(s) in range")
+                export_name = export_filename(symbol, export_format, f"{start_date:%Y%m%d}_{end_date:%Y%m%d}")
+                if st.button("🗂️ Build History Export", disabled=n_snapshots == 0):
+                    with st.spinner(f"Writing {n_snapshots} snapshot(s)..."), perf.span('export.history'):
+                        st.session_state.history_export = (str(export_to_path(
+                            store.iter_snapshots(symbol, range_expiry, range_start, range_end), export_format, export_name)), export_format)
+                export_path, built_format = st.session_state.get('history_export', (None, None))
+                if export_path and os.path.exists(export_path):
+                    size = os.path.getsize(export_path)
+                    if size <= EXPORT_DOWNLOAD_LIMIT:
+                        with open(export_path, 'rb') as f:
+                            st.download_button("📥 Download History", data=f.read(), file_name=os.path.basename(export_path),
+                                              mime=EXPORT_FORMATS[built_format]['mime'])
+                    else:
+                        st.info(f"📦 {size / 2**20:,.0f} MB is over the {EXPORT_DOWNLOAD_LIMIT >> 20} MB browser download "
+                                f"limit; collect it from {os.path.abspath(export_path)}")
     
-    with tabs[5]:
+    with tabs[5], perf.span('render.strategies'):
         st.markdown("### 💼 Trading Strategy Recommendations")
         gex_bias = metrics['gex_near_total']
         dex_bias = metrics['dex_near_total']
         atm_strike = meta['atm_strike']
         straddle = meta['atm_straddle']
         
-        if gex_bias > 50:
-            regime, regime_color = "Low Volatility / Mean Reversion", "#10b981"
-        elif gex_bias < -50:
-            regime, regime_color = "High Volatility / Trending", "#ef4444"
-        else:
-            regime, regime_color = "Transitional / Mixed", "#f59e0b"
+        regime, regime_color = classify_regime(gex_bias)
+        structures = recommend_structures(gex_bias, dex_bias)
         
         st.markdown(f"""<div class="strategy-card" style="border-left: 4px solid {regime_color};">
             <div class="strategy-title">🎯 Market Regime: {regime}</div>
@@ -1188,16 +5292,16 @@ def main():
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("### 📈 Recommended Strategies")
-            if gex_bias > 50:
+            if 'iron_condor' in structures:
                 st.markdown("""<div class="strategy-card"><div class="strategy-title">🎯 Iron Condor / Short Straddle</div>
                     <div class="strategy-detail">Positive GEX = Market makers suppress moves. Sell premium strategies work well.</div></div>""", unsafe_allow_html=True)
-            elif gex_bias < -50:
+            elif 'long_straddle' in structures:
                 st.markdown("""<div class="strategy-card"><div class="strategy-title">🎯 Long Straddle / Directional</div>
                     <div class="strategy-detail">Negative GEX = Volatility amplification. Buy premium or trade breakouts.</div></div>""", unsafe_allow_html=True)
-                if dex_bias > 20:
+                if 'bull_call_spread' in structures:
                     st.markdown("""<div class="strategy-card"><div class="strategy-title">🎯 Bull Call Spread</div>
                         <div class="strategy-detail">DEX bullish + High volatility = Upside momentum likely.</div></div>""", unsafe_allow_html=True)
-                elif dex_bias < -20:
+                elif 'bear_put_spread' in structures:
                     st.markdown("""<div class="strategy-card"><div class="strategy-title">🎯 Bear Put Spread</div>
                         <div class="strategy-detail">DEX bearish + High volatility = Downside momentum likely.</div></div>""", unsafe_allow_html=True)
             else:
@@ -1212,6 +5316,123 @@ def main():
                 <div class="strategy-detail">• Avoid 9:15-9:30 AM<br>• Best: 10:00-11:30 AM<br>• Days to Expiry: {meta['days_to_expiry']}</div></div>""", unsafe_allow_html=True)
             st.markdown(f"""<div class="strategy-card" style="border-left: 4px solid #8b5cf6;"><div class="strategy-title">🎯 Key Levels</div>
                 <div class="strategy-detail">• ATM: {atm_strike:,.0f}<br>• Upper BE: {atm_strike + straddle:,.0f}<br>• Lower BE: {atm_strike - straddle:,.0f}<br>• Max Pain: {key_levels['max_pain']:,.0f}</div></div>""", unsafe_allow_html=True)
+        
+        st.markdown("### 🧮 Strategy Lab")
+        strike_interval = symbol_config(symbol)['strike_interval']
+        lot_size = symbol_config(symbol)['lot_size']
+        lab_options = list(STRATEGY_STRUCTURES.keys())
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            lab_structure = st.selectbox("Structure", lab_options, format_func=lambda s: STRATEGY_NAMES[s],
+                                         index=lab_options.index(structures[0]) if structures else 0, key="lab_structure")
+        with col2:
+            lab_days = st.slider("Days Forward", min_value=0.0, max_value=float(meta['days_to_expiry']), value=0.0,
+                                 step=0.5, key="lab_days")
+        with col3:
+            lab_shift = st.slider("IV Shift (vol pts)", min_value=-10, max_value=10, value=0, key="lab_shift")
+        with col4:
+            lab_range = st.slider("Spot Range (±%)", min_value=1, max_value=15, value=5, key="lab_range")
+        
+        default_legs = build_structure_legs(lab_structure, df, atm_strike, strike_interval) or []
+        legs_df = st.data_editor(
+            pd.DataFrame([{'Type': l.option_type, 'Strike': l.strike, 'Lots': l.quantity, 'Entry': l.entry_price}
+                          for l in default_legs], columns=['Type', 'Strike', 'Lots', 'Entry']),
+            num_rows="dynamic", use_container_width=True, hide_index=True, key=f"lab_legs_{lab_structure}",
+            column_config={'Type': st.column_config.SelectboxColumn(options=['CE', 'PE'], required=True),
+                           'Strike': st.column_config.NumberColumn(step=strike_interval, format="%.0f"),
+                           'Lots': st.column_config.NumberColumn(step=1),
+                           'Entry': st.column_config.NumberColumn(format="%.2f")})
+        lab_legs = [StrategyLeg(row['Type'], float(row['Strike']), int(row['Lots']),
+                                float(row['Entry']) if pd.notna(row['Entry']) else (option_ltp(df, row['Type'], float(row['Strike'])) or 0.0))
+                    for _, row in legs_df.dropna(subset=['Type', 'Strike', 'Lots']).iterrows() if int(row['Lots']) != 0]
+        if not lab_legs:
+            st.info("Add at least one leg to evaluate.")
+        else:
+            futures = meta['futures_price']
+            spots = np.linspace(futures * (1 - lab_range / 100), futures * (1 + lab_range / 100), 201)
+            horizon_days, horizons = strategy_horizons(meta['days_to_expiry'], lab_days)
+            iv_shifts = np.arange(-10, 11) / 100
+            with perf.span('compute.strategy_cube'):
+                cube = evaluate_strategy(lab_legs, np.append(spots, futures), horizon_days, iv_shifts, leg_ivs(lab_legs, df),
+                                         lot_size, surface if iv_source == "SVI Surface" else None)
+            iv_index = lab_shift + 10
+            current = {k: v[-1] for k, v in cube.items()}
+            grid = {k: v[:-1] for k, v in cube.items()}
+            premium = sum(-l.quantity * l.entry_price for l in lab_legs) * lot_size
+            expiry_pnl = grid['pnl'][:, -1, iv_index]
+            cols = st.columns(6)
+            cols[0].metric("Net Premium", f"₹{premium:,.0f}", "credit" if premium > 0 else "debit", delta_color="off")
+            cols[1].metric(f"P&L {horizons[0]}", f"₹{current['pnl'][0, iv_index]:,.0f}")
+            cols[2].metric("Max Profit (range)", f"₹{expiry_pnl.max():,.0f}")
+            cols[3].metric("Max Loss (range)", f"₹{expiry_pnl.min():,.0f}")
+            cols[4].metric("Delta / Gamma", f"{current['delta'][0, iv_index]:,.1f} / {current['gamma'][0, iv_index]:.4f}")
+            cols[5].metric("Vega / Theta", f"₹{current['vega'][0, iv_index]:,.0f} / ₹{current['theta'][0, iv_index]:,.0f}")
+            breakevens = expiry_breakevens(spots, expiry_pnl)
+            show_chart(create_strategy_payoff_chart(
+                spots, grid, horizons, iv_index, futures,
+                f"{STRATEGY_NAMES[lab_structure]} | IV {lab_shift:+d} pts | Breakevens: "
+                f"{', '.join(f'{b:,.0f}' for b in breakevens) or '–'}"), 'strategy_payoff')
+            with st.expander("P&L at Current Spot by IV Shift"):
+                show_frame(pd.DataFrame(current['pnl'].T[::-1], index=[f"{x:+.0f}" for x in iv_shifts[::-1] * 100],
+                                        columns=horizons).style.format("₹{:,.0f}"), 'strategy_iv_grid')
+        
+        st.markdown("### 🧪 Backtest Strategy Rules")
+        store = get_snapshot_store()
+        stored_days = store.days(symbol)
+        if not stored_days:
+            st.info("No stored snapshots to replay yet.")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                bt_start = st.selectbox("From Day", stored_days, index=0)
+            with col2:
+                bt_end = st.selectbox("To Day", stored_days, index=len(stored_days) - 1)
+            with col3:
+                bt_workers = st.number_input("Workers", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+            with col4:
+                bt_exit_on_signal = st.checkbox("Exit on signal change", value=True)
+            if st.button("▶️ Run Backtest", use_container_width=True):
+                with st.spinner(f"Replaying {symbol} snapshots..."):
+                    st.session_state.backtest_result = run_backtest(
+                        symbol, bt_start, bt_end, params=BacktestParams(exit_on_signal_change=bt_exit_on_signal),
+                        workers=int(bt_workers), store_root=str(store.root))
+            
+            result = st.session_state.get('backtest_result')
+            if result and result['symbol'] == symbol:
+                stats = result['stats']
+                st.caption(f"{result['snapshots']:,} snapshots over {result['days']} day(s) replayed in "
+                           f"{result['elapsed']:.1f}s with {result['workers']} worker(s)")
+                cols = st.columns(6)
+                cols[0].metric("Trades", stats['trades'])
+                cols[1].metric("Total P&L", f"₹{stats['total_pnl']:,.0f}")
+                cols[2].metric("Win Rate", f"{stats['win_rate']:.1f}%")
+                cols[3].metric("Profit Factor", f"{stats['profit_factor']:.2f}")
+                cols[4].metric("Max Drawdown", f"₹{stats['max_drawdown']:,.0f}")
+                cols[5].metric("Sharpe (daily)", f"{stats['sharpe']:.2f}")
+                if stats['trades']:
+                    show_chart(create_backtest_chart(result['trades']), 'backtest')
+                    show_frame(stats['by_structure'], 'backtest_by_structure', hide_index=True)
+                    show_frame(result['trades'], 'backtest_trades', hide_index=True)
+    
+    perf.observe('refresh.total', time.perf_counter() - refresh_started)
+    metrics_file = os.environ.get("GEX_METRICS_FILE")
+    if metrics_file:
+        try:
+            perf.write_textfile(metrics_file)
+        except OSError as e:
+            perf.record_error('metrics.export', e)
+    
+    with st.sidebar:
+        st.markdown("---")
+        if st.checkbox("⏱️ Performance Panel", value=False):
+            st.dataframe(perf.summary().style.format({'Last (ms)': '{:.1f}', 'p50 (ms)': '{:.1f}',
+                                                      'p95 (ms)': '{:.1f}', 'Total (s)': '{:.2f}'}),
+                         use_container_width=True, hide_index=True)
+            st.dataframe(perf.counters(), use_container_width=True, hide_index=True)
+            for when, stage, message in reversed(perf.last_errors):
+                st.caption(f"⚠️ {when} {stage}: {message}")
+            with st.expander("Prometheus"):
+                st.code(perf.to_prometheus(), language="text")
     
     st.markdown("---")
     st.markdown(f"""<div style="text-align: center; padding: 20px; color: #64748b;">
@@ -0,0 +1,271 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Historical Backfill
+# Seeds the snapshot store from Dhan's expired-options (rolling strike) data
+# ============================================================================
+#
+#   python backfill.py --symbols NIFTY BANKNIFTY --start 2026-07-01 --end 2026-10-01 --interval 5
+#
+# The range is split into chunks of at most 30 days per symbol; every chunk needs one
+# request per (ATM offset, CE/PE) leg. Leg requests run in parallel and all draw on the
+# account-wide chart-API RateLimiter, so enough workers keep the budget saturated
+# without exceeding it. A chunk is checkpointed in <checkpoint-dir>/<symbol>.jsonl
+# once all its snapshots are in the store; re-running the same command resumes.
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+import app
+
+IST = timezone(timedelta(hours=5, minutes=30))
+BACKFILL_DIR = os.environ.get("GEX_BACKFILL_DIR", "backfill")
+ROLLING_FIELDS = ['close', 'iv', 'volume', 'oi', 'strike', 'spot']
+MAX_CHUNK_DAYS = 30
+MAX_ATTEMPTS = 5
+RISK_FREE_RATE = 0.07
+# (expiry flag, weekday before EXPIRY_DAY_CHANGE, weekday from it); monthly contracts
+# expire on the last such weekday of the month. A holiday moves expiry to the previous
+# trading day seen in the data.
+EXPIRY_CALENDAR = {'NIFTY': ('WEEK', 3, 1), 'SENSEX': ('WEEK', 1, 3)}
+DEFAULT_EXPIRY_RULE = ('MONTH', 3, 1)
+EXPIRY_DAY_CHANGE = date(2025, 9, 1)
+
+
+def fno_segment(symbol: str) -> str:
+    info = app.get_instrument_master().underlying(symbol)
+    exchange = info['exchange'] if info else ('BSE' if app.EXCHANGE_SEGMENTS.get(symbol, '').startswith('BSE') else 'NSE')
+    return f"{exchange}_FNO"
+
+
+def nominal_expiries(symbol: str, start: date, end: date) -> list:
+    flag, before, after = EXPIRY_CALENDAR.get(symbol, DEFAULT_EXPIRY_RULE)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 40)]
+    candidates = [d for d in days if d.weekday() == (before if d < EXPIRY_DAY_CHANGE else after)]
+    if flag == 'WEEK':
+        return candidates
+    last_in_month = {}
+    for d in candidates:
+        last_in_month[(d.year, d.month)] = d
+    return sorted(last_in_month.values())
+
+
+def expiry_map(symbol: str, trading_days: list, known_until: date) -> dict:
+    # Nearest expiry on or after each trading day; a nominal expiry inside the fetched
+    # range with no data was a holiday, so it moves back to the last trading day before it.
+    nominal = nominal_expiries(symbol, trading_days[0], trading_days[-1])
+    mapping = {}
+    for day in trading_days:
+        expiry = next(d for d in nominal if d >= day)
+        if expiry <= known_until:
+            expiry = max(d for d in trading_days if d <= expiry)
+        mapping[day] = expiry
+    return mapping
+
+
+def chunk_ranges(start: date, end: date, days: int = MAX_CHUNK_DAYS) -> list:
+    chunks = []
+    while start < end:
+        chunks.append((start, min(start + timedelta(days=days), end)))
+        start = chunks[-1][1]
+    return chunks
+
+
+class Checkpoint:
+    # Append-only JSON lines, one per finished chunk, flushed and fsynced before the
+    # next chunk is reported done.
+    def __init__(self, root: str, symbol: str):
+        self.path = os.path.join(root, f"{symbol}.jsonl")
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)['key'])
+                    except (ValueError, KeyError):
+                        continue
+
+    def mark(self, key: str, record: dict) -> None:
+        with self._lock, open(self.path, 'a') as f:
+            f.write(json.dumps({'key': key, **record}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self.done.add(key)
+
+
+def fetch_leg(source: app.DhanDataSource, payload: dict) -> dict:
+    perf = app.get_perf_recorder()
+    for attempt in range(MAX_ATTEMPTS):
+        perf.incr('api_calls', endpoint='rollingoption')
+        try:
+            with perf.span('api.rollingoption'):
+                status, body = source.post("charts/rollingoption", payload)
+        except (requests.RequestException, ValueError) as e:
+            perf.record_error('api.rollingoption', e)
+            status, body = None, {}
+        if status == 200:
+            data = body.get('data') or {}
+            return data.get('ce' if payload['drvOptionType'] == 'CALL' else 'pe') or {}
+        perf.incr('api_bad_responses', endpoint='rollingoption', status=status)
+        if status is not None and status < 500 and status != 429:
+            raise RuntimeError(f"rollingoption {payload['strike']} {payload['drvOptionType']}: HTTP {status} {body}")
+        time.sleep(2 ** attempt)
+    raise RuntimeError(f"rollingoption {payload['strike']} {payload['drvOptionType']}: gave up after {MAX_ATTEMPTS} attempts")
+
+
+def legs_frame(legs: dict) -> pd.DataFrame:
+    frames = []
+    for (offset, side), data in legs.items():
+        n = len(data.get('timestamp') or [])
+        if not n:
+            continue
+        frame = pd.DataFrame({f: data.get(f) or [np.nan] * n for f in ROLLING_FIELDS})
+        frame['ts'] = pd.to_datetime(np.asarray(data['timestamp'], dtype=np.int64), unit='s', utc=True).tz_convert(IST).tz_localize(None)
+        frame['side'] = side
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+    rows = pd.concat(frames, ignore_index=True).fillna({'close': 0, 'iv': 0, 'volume': 0, 'oi': 0})
+    rows = rows[rows['strike'] > 0].drop_duplicates(['ts', 'side', 'strike'], keep='last')
+    # Dhan's previous_oi is the prior session's closing OI; the first day of a chunk has
+    # no prior session here and shows zero OI change.
+    rows['day'] = rows['ts'].dt.date
+    days = sorted(rows['day'].unique())
+    closing = rows.sort_values('ts').groupby(['side', 'strike', 'day'])['oi'].last()
+    prior = pd.MultiIndex.from_arrays([rows['side'], rows['strike'], rows['day'].map(dict(zip(days[1:], days[:-1])))])
+    rows['previous_oi'] = closing.reindex(prior).to_numpy()
+    rows['previous_oi'] = rows['previous_oi'].fillna(rows['oi'])
+    return rows
+
+
+def snapshots(symbol: str, rows: pd.DataFrame, known_until: date):
+    contract_size = app.symbol_config(symbol)['contract_size']
+    expiries = expiry_map(symbol, sorted(rows['day'].unique()), known_until)
+    wide = rows.set_index(['ts', 'strike', 'side'])[['oi', 'previous_oi', 'volume', 'iv', 'close']].unstack('side').fillna(0)
+    wide = wide.reindex(columns=pd.MultiIndex.from_product([wide.columns.levels[0], ['ce', 'pe']]), fill_value=0)
+    spots = rows.groupby('ts')['spot'].max()
+    stamps = wide.index.get_level_values('ts')
+    all_strikes = wide.index.get_level_values('strike').to_numpy(dtype=np.float64)
+    columns = {(field, side): wide[(field, side)].to_numpy(dtype=np.float64) for field, side in wide.columns}
+    bounds = np.flatnonzero(stamps[1:] != stamps[:-1]) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(wide)]):
+        ts = stamps[start]
+        spot_price = float(spots[ts])
+        if not spot_price > 0:
+            continue
+        strikes = all_strikes[start:end]
+        raw = {'strikes': strikes}
+        for side in ('ce', 'pe'):
+            raw[side] = {name: columns[(field, side)][start:end]
+                         for name, field in (('oi', 'oi'), ('previous_oi', 'previous_oi'), ('volume', 'volume'), ('iv', 'iv'), ('ltp', 'close'))}
+        expiry = expiries[ts.date()]
+        days_to_expiry = max((datetime.combine(expiry, datetime.min.time()) - ts).days, 1)
+        futures_price = spot_price * np.exp(RISK_FREE_RATE * days_to_expiry / 365)
+        greeks = app.chain_greeks(futures_price, strikes, days_to_expiry / 365, RISK_FREE_RATE, raw['ce']['iv'], raw['pe']['iv'])
+        df = app.build_chain_frame(raw, greeks, futures_price, contract_size)
+        atm = int(np.argmin(np.abs(strikes - futures_price)))
+        yield df, {
+            'symbol': symbol, 'spot_price': spot_price, 'futures_price': futures_price,
+            'expiry': expiry.isoformat(), 'days_to_expiry': days_to_expiry,
+            'atm_strike': float(strikes[atm]), 'atm_call_premium': float(raw['ce']['ltp'][atm]),
+            'atm_put_premium': float(raw['pe']['ltp'][atm]),
+            'atm_straddle': float(raw['ce']['ltp'][atm] + raw['pe']['ltp'][atm]),
+            'expiry_list': [expiry.isoformat()], 'timestamp': ts.strftime(app.SNAPSHOT_TS_FORMAT),
+            'source': 'backfill',
+        }
+
+
+def chunk_payloads(symbol: str, start: date, end: date, interval: int, strikes: int, expiry_code: int) -> dict:
+    security_id, _ = app.underlying_scrip(symbol)
+    instrument = (app.get_instrument_master().underlying(symbol) or {}).get('instrument', 'OPTIDX')
+    flag = EXPIRY_CALENDAR.get(symbol, DEFAULT_EXPIRY_RULE)[0]
+    return {(offset, 'ce' if option_type == 'CALL' else 'pe'): {
+        'exchangeSegment': fno_segment(symbol), 'interval': str(interval), 'securityId': security_id,
+        'instrument': instrument, 'expiryFlag': flag, 'expiryCode': expiry_code,
+        'strike': 'ATM' if offset == 0 else f"ATM{offset:+d}", 'drvOptionType': option_type,
+        'requiredData': ROLLING_FIELDS, 'fromDate': start.isoformat(), 'toDate': end.isoformat(),
+    } for offset in range(-strikes, strikes + 1) for option_type in ('CALL', 'PUT')}
+
+
+def save_chunk(store, symbol: str, legs: dict, end: date) -> int:
+    rows = legs_frame(legs)
+    saved = 0
+    if not rows.empty:
+        for df, meta in snapshots(symbol, rows, end - timedelta(days=1)):
+            store.save(df, meta)
+            saved += 1
+    return saved
+
+
+def run(symbols, start: date, end: date, interval: int, strikes: int, expiry_code: int, workers: int,
+        chunk_days: int, checkpoint_dir: str, source: app.DhanDataSource = None):
+    # Every leg request of every pending chunk goes into one pool, so the rate limiter,
+    # not the chunk count, bounds throughput. A chunk is assembled and written once its
+    # last leg arrives; chunks with a failed leg are left for the next run.
+    source = source or app.LiveDataSource(app.DhanConfig())
+    store = app.open_snapshot_store()
+    checkpoints = {symbol: Checkpoint(checkpoint_dir, symbol) for symbol in symbols}
+    chunks = {}
+    for symbol in symbols:
+        for chunk_start, chunk_end in chunk_ranges(start, end, chunk_days):
+            key = f"{chunk_start}|{chunk_end}|{interval}|{strikes}|{expiry_code}"
+            if key not in checkpoints[symbol].done:
+                chunks[(symbol, key)] = {'end': chunk_end, 'payloads': chunk_payloads(symbol, chunk_start, chunk_end, interval, strikes, expiry_code),
+                                         'legs': {}, 'error': None}
+    total = sum(len(c['payloads']) for c in chunks.values())
+    print(f"{len(chunks)} chunks to fetch ({sum(len(c.done) for c in checkpoints.values())} already done), {total} requests")
+    started = time.perf_counter()
+    completed, failed = 0, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_leg, source, payload): (chunk_key, leg)
+                   for chunk_key, chunk in chunks.items() for leg, payload in chunk['payloads'].items()}
+        for future in as_completed(futures):
+            chunk_key, leg = futures[future]
+            symbol, key = chunk_key
+            chunk = chunks[chunk_key]
+            completed += 1
+            try:
+                chunk['legs'][leg] = future.result()
+            except RuntimeError as e:
+                chunk['error'] = chunk['error'] or str(e)
+                chunk['legs'][leg] = None
+            if len(chunk['legs']) < len(chunk['payloads']):
+                continue
+            if chunk['error']:
+                failed.append((symbol, key, chunk['error']))
+                print(f"  {symbol} {key}: FAILED {chunk['error']}")
+                continue
+            saved = save_chunk(store, symbol, chunk.pop('legs'), chunk['end'])
+            checkpoints[symbol].mark(key, {'symbol': symbol, 'requests': len(chunk['payloads']), 'snapshots': saved})
+            elapsed = time.perf_counter() - started
+            print(f"  {symbol} {key.split('|')[0]} → {key.split('|')[1]}: {saved} snapshots "
+                  f"| {completed}/{total} requests at {completed / elapsed:.2f} req/s")
+    print(f"Done in {time.perf_counter() - started:.1f}s, {len(failed)} chunk(s) failed"
+          + (" — re-run to retry" if failed else ""))
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill historical option chains into the snapshot store")
+    parser.add_argument("--symbols", nargs="+", default=["NIFTY"])
+    parser.add_argument("--start", required=True, type=date.fromisoformat)
+    parser.add_argument("--end", required=True, type=date.fromisoformat, help="exclusive")
+    parser.add_argument("--interval", type=int, default=5, choices=[1, 5, 15, 25, 60], help="minutes per snapshot")
+    parser.add_argument("--strikes", type=int, default=10, help="strikes either side of ATM (Dhan serves up to 10)")
+    parser.add_argument("--expiry-code", type=int, default=1, help="1 = nearest expiry")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--chunk-days", type=int, default=MAX_CHUNK_DAYS)
+    parser.add_argument("--checkpoint-dir", default=BACKFILL_DIR)
+    args = parser.parse_args()
+    failed = run(args.symbols, args.start, args.end, args.interval, args.strikes, args.expiry_code,
+                 args.workers, min(args.chunk_days, MAX_CHUNK_DAYS), args.checkpoint_dir)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,16 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Backtest Worker
+# Process-pool entry point for app.run_backtest
+# ============================================================================
+#
+# Lives outside app.py so pool workers are started with 'spawn' and import the
+# dashboard as the regular module `app`, never as the Streamlit script that the
+# server re-executes per rerun (whose classes do not pickle by name), and never
+# as a fork of a server process holding feed, bus and publisher threads.
+# Jobs carry only builtins; BacktestParams is rebuilt inside the worker.
+
+
+def backtest_day_job(args):
+    import app  # deferred: the parent only needs this module's name to pickle the job
+    store_root, symbol, day, expiry, params = args
+    return app.backtest_day(store_root, symbol, day, expiry, app.BacktestParams(**params) if params else None)
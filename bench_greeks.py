@@ -0,0 +1,78 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Greeks Kernel Benchmark
+# Marginal cost of the higher-order Greeks in the batched chain pass
+# ============================================================================
+#
+#   python bench_greeks.py --strikes 41 201 1001 --repeat 200
+#
+# Times chain_greeks with and without speed/zomma/color/vomma, the full
+# chain_columns pass built on it, and, for scale, the per-strike scalar
+# BlackScholesCalculator path the batched kernel replaced.
+
+import argparse
+import time
+
+import numpy as np
+
+import app
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def synthetic_chain(strikes: int, futures_price: float, interval: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    K = futures_price + interval * (np.arange(strikes) - strikes // 2)
+    moneyness = np.abs(np.log(K / futures_price))
+    raw = {'strikes': K}
+    for side in ('ce', 'pe'):
+        oi = rng.integers(1_000, 2_000_000, strikes).astype(np.float64)
+        raw[side] = {'oi': oi, 'previous_oi': oi * rng.uniform(0.9, 1.1, strikes),
+                     'volume': rng.integers(0, 500_000, strikes).astype(np.float64),
+                     'iv': 12 + 40 * moneyness + rng.uniform(-0.5, 0.5, strikes),
+                     'ltp': rng.uniform(1, 500, strikes)}
+    return raw
+
+
+def scalar_pass(F: float, raw, T: float, r: float):
+    bs = app.BlackScholesCalculator()
+    for K, call_iv, put_iv in zip(raw['strikes'], raw['ce']['iv'], raw['pe']['iv']):
+        for iv in (call_iv, put_iv):
+            sigma = iv / 100
+            bs.calculate_gamma(F, K, T, r, sigma)
+            bs.calculate_call_delta(F, K, T, r, sigma)
+            bs.calculate_vanna(F, K, T, r, sigma)
+            bs.calculate_charm(F, K, T, r, sigma)
+
+
+def run(strike_counts, repeat: int, futures_price: float, days: float, symbol: str):
+    config = app.symbol_config(symbol)
+    T, r = days / 365, 0.07
+    print(f"{'strikes':>8} {'base µs':>10} {'+higher µs':>11} {'marginal':>9} {'columns µs':>11} {'scalar µs':>11}")
+    for strikes in strike_counts:
+        raw = synthetic_chain(strikes, futures_price, config['strike_interval'])
+        call_iv, put_iv = raw['ce']['iv'], raw['pe']['iv']
+        base = best_of(lambda: app.chain_greeks(futures_price, raw['strikes'], T, r, call_iv, put_iv, higher_order=False), repeat)
+        full = best_of(lambda: app.chain_greeks(futures_price, raw['strikes'], T, r, call_iv, put_iv), repeat)
+        greeks = app.chain_greeks(futures_price, raw['strikes'], T, r, call_iv, put_iv)
+        columns = best_of(lambda: app.chain_columns(raw, greeks, futures_price, config['contract_size']), repeat)
+        scalar = best_of(lambda: scalar_pass(futures_price, raw, T, r), max(1, repeat // 20))
+        print(f"{strikes:>8} {base * 1e6:>10,.1f} {full * 1e6:>11,.1f} {(full / base - 1) * 100:>8.0f}% "
+              f"{columns * 1e6:>11,.1f} {scalar * 1e6:>11,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batched Greeks kernel")
+    parser.add_argument("--strikes", nargs="+", type=int, default=[41, 201, 1001])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--futures", type=float, default=25000.0)
+    parser.add_argument("--days", type=float, default=5.0)
+    parser.add_argument("--symbol", default="NIFTY")
+    args = parser.parse_args()
+    run(args.strikes, args.repeat, args.futures, args.days, args.symbol)
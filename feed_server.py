@@ -0,0 +1,53 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Local Feed Stand-in
+# Streams synthetic per-instrument OI/LTP/IV ticks for the streaming mode
+# ============================================================================
+#
+#   python feed_server.py --symbols NIFTY BANKNIFTY --rate 5000 --port 9100
+#
+# Chains are seeded from the latest stored snapshot of each symbol when one
+# exists, otherwise from a synthetic strike ladder around --spot.
+
+import argparse
+import time
+
+import numpy as np
+
+import app
+
+
+def seed_chains(symbols, spot: float, expiry: str):
+    store = app.open_snapshot_store()
+    chains = {}
+    for symbol in symbols:
+        df, meta = store.latest(symbol)
+        if df is not None:
+            chains[(symbol, meta['expiry'])] = (df['Strike'].to_numpy(), meta['spot_price'])
+            continue
+        interval = app.symbol_config(symbol)['strike_interval']
+        atm = round(spot / interval) * interval
+        chains[(symbol, expiry)] = (atm + interval * np.arange(-app.STREAM_STRIKES_RANGE, app.STREAM_STRIKES_RANGE + 1), spot)
+    return chains
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in tick feed for streaming ingestion")
+    parser.add_argument("--symbols", nargs="+", default=["NIFTY"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rate", type=float, default=2000, help="updates per second per client")
+    parser.add_argument("--spot", type=float, default=25000.0)
+    parser.add_argument("--expiry", default=time.strftime("%Y-%m-%d"))
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    chains = seed_chains(args.symbols, args.spot, args.expiry)
+    server = app.LocalFeedServer(chains, host=args.host, port=args.port, rate=args.rate, seed=args.seed).start()
+    print(f"Feed on {args.host}:{server.port} at {args.rate:,.0f} updates/s for "
+          + ", ".join(f"{s} {e}" for s, e in chains))
+    try:
+        while True:
+            time.sleep(5)
+            print(f"{server.sent:,} updates sent")
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,197 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Multi-Session Load Test
+# Drives concurrent simulated dashboard sessions against replayed Dhan responses
+# ============================================================================
+#
+# Record a session first with GEX_DATA_SOURCE=record, then:
+#   python loadtest.py --recordings recordings --sessions 30 --reruns 20 --symbols NIFTY BANKNIFTY
+#
+# Every session is a streamlit AppTest on its own thread, so reruns share the GIL,
+# st.cache_data and the cached resources the way sessions in one server process do.
+# Upstream calls are read from the app's Prometheus textfile (GEX_METRICS_FILE).
+
+import argparse
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+APP_PATH = str(Path(__file__).with_name("app.py"))
+
+# (action name, weight); weights roughly follow what analysts touch at the open
+ACTIONS = [('symbol', 3), ('strikes_range', 2), ('time_offset', 2), ('tab_widget', 3),
+           ('iv_source', 1), ('idle', 2), ('refresh_now', 1)]
+TAB_WIDGETS = {'heatmap_field': ['Net_GEX', 'Net_DEX', 'Hedging_Pressure'], 'iv_spot_beta': [-1.0, -0.5, 0.0],
+               'lab_shift': [-5, 0, 5], 'lab_days': [0.0, 1.0]}
+
+
+def rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def read_counters(path: str) -> dict:
+    counters = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith('#') or '_total' not in line:
+                    continue
+                name, value = line.rsplit(' ', 1)
+                counters[name] = counters.get(name, 0) + float(value)
+    except OSError:
+        pass
+    return counters
+
+
+def sum_counter(counters: dict, prefix: str) -> float:
+    return sum(v for k, v in counters.items() if k.split('{')[0] == prefix)
+
+
+def find(elements, label):
+    return next((e for e in elements if e.label == label), None)
+
+
+def apply_action(at, action: str, symbols, rng: random.Random) -> bool:
+    if action == 'symbol':
+        widget = find(at.selectbox, "📈 Select Underlying")
+        value = rng.choice(symbols)
+    elif action == 'strikes_range':
+        widget, value = find(at.slider, "📏 Strikes Range"), rng.randint(5, 20)
+    elif action == 'time_offset':
+        widget, value = find(at.slider, "⏰ Simulate Time Forward (hours)"), rng.choice([0.0, 0.5, 2.0, 6.0])
+    elif action == 'iv_source':
+        widget, value = find(at.radio, "🌊 IV for Greeks"), rng.choice(["Quoted", "SVI Surface"])
+    elif action == 'tab_widget':
+        present = {w.key: w for w in list(at.slider) + list(at.radio) if w.key in TAB_WIDGETS}
+        if not present:
+            return False
+        key = rng.choice(sorted(present))
+        widget, value = present[key], rng.choice(TAB_WIDGETS[key])
+    elif action == 'refresh_now':
+        widget = find(at.button, "🔄 Refresh Now")
+        if widget is None:
+            return False
+        widget.click()
+        return True
+    else:
+        return True
+    if widget is None:
+        return False
+    widget.set_value(value)
+    return True
+
+
+class Session(threading.Thread):
+    def __init__(self, index: int, reruns: int, symbols, think: float, timeout: float, seed: int):
+        super().__init__(name=f"session-{index}", daemon=True)
+        self.index = index
+        self.reruns = reruns
+        self.symbols = symbols
+        self.think = think
+        self.timeout = timeout
+        self.rng = random.Random(seed + index)
+        self.latencies = []
+        self.actions = []
+        self.exceptions = []
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+        names, weights = zip(*ACTIONS)
+        for i in range(self.reruns + 1):
+            action = 'open' if i == 0 else self.rng.choices(names, weights)[0]
+            if i and not apply_action(at, action, self.symbols, self.rng):
+                action = 'idle'
+            started = time.perf_counter()
+            try:
+                at.run()
+            except Exception as e:  # a timed-out or crashed rerun still counts against the session
+                self.exceptions.append(f"{action}: {type(e).__name__}: {e}")
+            self.latencies.append(time.perf_counter() - started)
+            self.actions.append(action)
+            self.exceptions.extend(f"{action}: {e.value}" for e in at.exception)
+            if self.think > 0:
+                time.sleep(self.rng.uniform(0, 2 * self.think))
+
+
+def run(recordings: str, sessions: int, reruns: int, symbols, think: float, ramp: float, timeout: float, seed: int):
+    metrics_file = os.path.join(tempfile.mkdtemp(prefix="gex-loadtest-"), "metrics.prom")
+    os.environ.update(GEX_DATA_SOURCE="replay", GEX_RECORDINGS_DIR=recordings, GEX_METRICS_FILE=metrics_file)
+    os.environ.setdefault("GEX_REPLAY_SPEED", "1.0")
+    if not Path(recordings).exists():
+        raise SystemExit(f"No recordings found under {recordings}")
+
+    peak_rss, rss_before = [rss_mb()], rss_mb()
+    done = threading.Event()
+    def sample_rss():
+        while not done.wait(0.2):
+            peak_rss.append(rss_mb())
+    threading.Thread(target=sample_rss, daemon=True).start()
+
+    workers = [Session(i, reruns, symbols, think, timeout, seed) for i in range(sessions)]
+    cpu_before, started = resource.getrusage(resource.RUSAGE_SELF), time.perf_counter()
+    for worker in workers:
+        worker.start()
+        time.sleep(ramp / max(sessions, 1))
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    done.set()
+
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    latencies = np.array([l for w in workers for l in w.latencies])
+    counters = read_counters(metrics_file)
+    api_calls = sum_counter(counters, 'gex_api_calls_total')
+    total_reruns = len(latencies)
+    print(f"{sessions} sessions x {reruns + 1} reruns in {elapsed:.1f}s wall, {cpu:.1f}s CPU "
+          f"({cpu / elapsed * 100:.0f}% of one core)")
+    print(f"rerun latency  p50 {np.percentile(latencies, 50) * 1000:,.0f} ms | p90 {np.percentile(latencies, 90) * 1000:,.0f} ms "
+          f"| p99 {np.percentile(latencies, 99) * 1000:,.0f} ms | max {latencies.max() * 1000:,.0f} ms")
+    print(f"throughput     {total_reruns / elapsed:.2f} reruns/s | CPU {cpu / total_reruns * 1000:,.0f} ms per rerun")
+    print(f"memory         RSS {rss_before:,.0f} MB before, {max(peak_rss):,.0f} MB peak, {rss_mb():,.0f} MB after "
+          f"({(max(peak_rss) - rss_before) / sessions:,.1f} MB per session)")
+    print(f"upstream       {api_calls:,.0f} API calls | {api_calls / sessions:.1f} per session | {api_calls / total_reruns:.2f} per rerun "
+          f"| fetch cache hits {sum_counter(counters, 'gex_cache_hits_total'):,.0f} / misses {sum_counter(counters, 'gex_cache_misses_total'):,.0f}")
+
+    print("\nlatency by action (ms)")
+    by_action = {}
+    for w in workers:
+        for action, latency in zip(w.actions, w.latencies):
+            by_action.setdefault(action, []).append(latency)
+    for action, values in sorted(by_action.items()):
+        print(f"  {action:<14} n={len(values):<5} p50 {np.percentile(values, 50) * 1000:>8,.0f}  p95 {np.percentile(values, 95) * 1000:>8,.0f}")
+
+    print("\nper session (ms)")
+    for w in workers:
+        values = np.array(w.latencies)
+        print(f"  #{w.index:<3} p50 {np.percentile(values, 50) * 1000:>8,.0f}  p95 {np.percentile(values, 95) * 1000:>8,.0f}  "
+              f"max {values.max() * 1000:>8,.0f}  errors {len(w.exceptions)}")
+    errors = [e for w in workers for e in w.exceptions]
+    for error in errors[:10]:
+        print(f"  ⚠️ {error}")
+    return {'latencies': latencies, 'cpu': cpu, 'elapsed': elapsed, 'peak_rss': max(peak_rss),
+            'api_calls': api_calls, 'errors': errors}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive concurrent dashboard sessions against replayed data")
+    parser.add_argument("--recordings", default=os.environ.get("GEX_RECORDINGS_DIR", "recordings"))
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--reruns", type=int, default=10, help="interactions per session after the first load")
+    parser.add_argument("--symbols", nargs="+", default=["NIFTY", "BANKNIFTY"])
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between interactions (s)")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which sessions start")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-rerun timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95", type=float, default=None, help="exit non-zero if rerun p95 exceeds this (ms)")
+    args = parser.parse_args()
+    result = run(args.recordings, args.sessions, args.reruns, args.symbols, args.think, args.ramp, args.timeout, args.seed)
+    failed = bool(result['errors']) or (args.max_p95 is not None and np.percentile(result['latencies'], 95) * 1000 > args.max_p95)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,50 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Offline Pipeline Profiler
+# Replays recorded Dhan responses through the compute pipeline
+# ============================================================================
+#
+# Record a session first with GEX_DATA_SOURCE=record, then:
+#   python profile_replay.py --recordings recordings --symbols NIFTY BANKNIFTY --steps 200
+
+import argparse
+import time
+
+import app
+
+
+def run(recordings: str, symbols, steps: int, expiry_index: int, strikes_range: int, speed: float):
+    source = app.ReplayDataSource(recordings, speed=speed)
+    if not len(source):
+        raise SystemExit(f"No recordings found under {recordings}")
+    fetcher = app.DhanAPIFetcher(app.DhanConfig(), source=source)
+    perf = app.get_perf_recorder()
+    started = time.perf_counter()
+    snapshots = 0
+    for _ in range(steps):
+        for symbol in symbols:
+            with perf.span('replay.process_option_chain'):
+                df, meta = fetcher.process_option_chain(symbol, expiry_index, strikes_range)
+            if df is None:
+                continue
+            with perf.span('replay.metrics'):
+                app.calculate_flow_metrics(df, meta['futures_price'])
+                app.detect_gamma_flip_zones(df)
+                app.calculate_key_levels(df, meta['futures_price'])
+            snapshots += 1
+    elapsed = time.perf_counter() - started
+    virtual = (source.now() - source.start_time).total_seconds()
+    print(f"{snapshots} snapshots in {elapsed:.2f}s wall | {virtual:.0f}s market time "
+          f"| {virtual / elapsed if elapsed > 0 else 0:.1f}x real time")
+    print(perf.summary().to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Dhan responses through the compute pipeline")
+    parser.add_argument("--recordings", default=app.RECORDINGS_DIR)
+    parser.add_argument("--symbols", nargs="+", default=["NIFTY"])
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--expiry-index", type=int, default=0)
+    parser.add_argument("--strikes-range", type=int, default=12)
+    parser.add_argument("--speed", type=float, default=0.0, help="0 = step through recordings as fast as possible")
+    args = parser.parse_args()
+    run(args.recordings, args.symbols, args.steps, args.expiry_index, args.strikes_range, args.speed)
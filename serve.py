@@ -0,0 +1,140 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Warm Server Launcher
+# Starts the dashboard, warms every tracked chain and answers readiness probes
+# ============================================================================
+#
+#   python serve.py --port 8501 --probe-port 8502 --symbols NIFTY BANKNIFTY --expiries 2
+#
+# Streamlit only executes app.py once a session connects, so the launcher makes one
+# headless run through Streamlit's script health check; that run starts the app's
+# warm-up (imports, pooled connections, every tracked symbol/expiry). GET /ready on
+# the probe port answers 503 until the first warm-up pass is done, then 200; point
+# the deploy's readiness probe there and /live at the liveness probe.
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+APP_PATH = str(Path(__file__).with_name("app.py"))
+
+
+def read_status(ready_file: str, pid: int) -> dict:
+    # A file left behind by an earlier server process never counts as ready
+    try:
+        with open(ready_file) as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return {'ready': False, 'stage': 'starting'}
+    if status.get('pid') != pid:
+        return {'ready': False, 'stage': 'starting'}
+    return status
+
+
+def wait_for(url: str, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def probe_handler(server: subprocess.Popen, ready_file: str):
+    class ProbeHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/live':
+                code, body = (200, {'live': True}) if server.poll() is None else (503, {'live': False})
+            elif self.path == '/ready':
+                status = read_status(ready_file, server.pid)
+                code, body = (200 if status.get('ready') and server.poll() is None else 503), status
+            else:
+                code, body = 404, {}
+            payload = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+    return ProbeHandler
+
+
+def run(port: int, probe_port: int, symbols, expiries: int, interval: float, timeout: float, streamlit_args) -> int:
+    ready_file = os.path.join(tempfile.mkdtemp(prefix="gex-serve-"), "ready.json")
+    env = dict(os.environ, GEX_READY_FILE=ready_file, GEX_WARMUP_EXPIRIES=str(expiries),
+               GEX_WARMUP_INTERVAL=str(interval))
+    if symbols:
+        env['GEX_WARMUP_SYMBOLS'] = ",".join(symbols)
+    server = subprocess.Popen([sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.port", str(port),
+                               "--server.headless", "true", "--server.scriptHealthCheckEnabled", "true",
+                               *streamlit_args], env=env)
+    signal.signal(signal.SIGTERM, lambda *_: server.terminate())
+
+    probe = ThreadingHTTPServer(("0.0.0.0", probe_port), probe_handler(server, ready_file))
+    threading.Thread(target=probe.serve_forever, daemon=True).start()
+
+    started = time.perf_counter()
+    base_url = f"http://127.0.0.1:{port}/_stcore"
+    if not wait_for(f"{base_url}/health", timeout):
+        print("❌ Streamlit did not come up", flush=True)
+        server.terminate()
+        return server.wait() or 1
+    # The health-check run executes app.py in a throwaway session, which starts the warm-up
+    threading.Thread(target=wait_for, args=(f"{base_url}/script-health-check", timeout), daemon=True).start()
+    degraded_passes = 0
+    while server.poll() is None and time.perf_counter() - started < timeout:
+        status = read_status(ready_file, server.pid)
+        if status.get('stage') == 'degraded' and status.get('passes', 0) > degraded_passes:
+            degraded_passes = status['passes']
+            print(f"⚠️ Warm-up pass {degraded_passes} got no chain at all (live or persisted); "
+                  f"/ready stays 503 and warm-up retries", flush=True)
+        if status.get('ready'):
+            stages = ", ".join(f"{k} {v:.1f}s" for k, v in status.get('stage_seconds', {}).items())
+            print(f"✅ Ready in {time.perf_counter() - started:.1f}s | {status['fetched']} fetched, "
+                  f"{status['persisted']} from disk, {status['failed']} failed | {stages}", flush=True)
+            for error in status.get('errors', []):
+                print(f"  ⚠️ {error}", flush=True)
+            break
+        time.sleep(0.5)
+    else:
+        if server.poll() is None:
+            print(f"⚠️ Warm-up not finished after {timeout:.0f}s; /ready stays 503 until it is", flush=True)
+
+    try:
+        return server.wait()
+    except KeyboardInterrupt:
+        server.terminate()
+        return server.wait()
+    finally:
+        probe.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the dashboard with a start-up warm-up and readiness probe",
+                                     epilog="Arguments after -- are passed to streamlit run")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--probe-port", type=int, default=8502)
+    parser.add_argument("--symbols", nargs="+", default=None, help="tracked symbols (default: every configured one)")
+    parser.add_argument("--expiries", type=int, default=1, help="nearest expiries to warm per symbol")
+    parser.add_argument("--interval", type=float, default=150.0, help="re-warm period (s); 0 warms once")
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for the server and warm-up")
+    args, streamlit_args = parser.parse_known_args()
+    streamlit_args = [a for a in streamlit_args if a != "--"]
+    raise SystemExit(run(args.port, args.probe_port, args.symbols, args.expiries, args.interval, args.timeout,
+                         streamlit_args))
@@ -0,0 +1,46 @@
+# ============================================================================
+# NYZTrade GEX/DEX - Snapshot Subscriber
+# Prints processed snapshots pushed by a dashboard running with GEX_PUBLISH_ADDR
+# ============================================================================
+#
+#   GEX_PUBLISH_ADDR=127.0.0.1:9200 streamlit run app.py
+#   python subscribe.py --address 127.0.0.1:9200 --symbols NIFTY BANKNIFTY
+#
+# Reference consumer for the wire format described in app.py (SNAPSHOT PUBLISHER);
+# bots and notebooks can use app.subscribe_snapshots directly, or read the
+# length-prefixed Arrow IPC frames with any Arrow library.
+
+import argparse
+import time
+
+import app
+
+
+def run(address: str, symbols, expiries, count: int, timeout: float) -> int:
+    received = 0
+    started = time.perf_counter()
+    try:
+        for df, meta, signals in app.subscribe_snapshots(address, symbols, expiries, timeout):
+            received += 1
+            print(f"{meta['timestamp']} {meta['symbol']:<10} {meta['expiry']} | {len(df)} strikes | "
+                  f"futures {meta['futures_price']:,.2f} | near GEX {signals.get('gex_near_total', float('nan')):+.4f}B | "
+                  f"PCR {signals.get('pcr', float('nan')):.2f} | flips {signals.get('flip_count', 0):.0f}", flush=True)
+            if count and received >= count:
+                break
+    except OSError as e:
+        print(f"❌ Connection lost: {e}")
+    print(f"{received} snapshots in {time.perf_counter() - started:.1f}s")
+    return 0 if received else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Subscribe to processed GEX/DEX snapshots")
+    parser.add_argument("--address", default=app.PUBLISH_ADDRESS or "127.0.0.1:9200",
+                        help="host:port or unix:<path> (default: GEX_PUBLISH_ADDR)")
+    parser.add_argument("--symbols", nargs="+", default=None)
+    parser.add_argument("--expiries", nargs="+", default=None)
+    parser.add_argument("--count", type=int, default=0, help="exit after this many snapshots (0 runs until closed)")
+    parser.add_argument("--timeout", type=float, default=3 * app.PUBLISH_HEARTBEAT,
+                        help="seconds without a frame or heartbeat before giving up")
+    args = parser.parse_args()
+    raise SystemExit(run(args.address, args.symbols, args.expiries, args.count, args.timeout))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the dashboard and its scripts as plain modules from the repo root,
+# and never reach the network for the instrument master.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEX_INSTRUMENT_URL", "")
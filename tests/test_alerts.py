@@ -0,0 +1,79 @@
+import pytest
+
+import app
+
+
+class ListSink(app.AlertSink):
+    def __init__(self):
+        self.alerts = []
+
+    def emit(self, alert):
+        self.alerts.append(alert)
+
+
+def engine(*rules):
+    sink = ListSink()
+    return app.AlertEngine(list(rules), [sink]), sink
+
+
+def test_threshold_rule_fires_only_on_the_inactive_to_active_edge():
+    alerts, sink = engine(app.AlertRule("GEX high", "gex_near_total", "above", 50))
+    seen = [len(alerts.evaluate("NIFTY", "2026-10-22", {'gex_near_total': v})) for v in (10, 60, 70, 80, 40, 55)]
+    # The first snapshot only seeds the state; 60 crosses, 70/80 stay active, 40 resets, 55 crosses again
+    assert seen == [0, 1, 0, 0, 0, 1]
+    assert [a['value'] for a in sink.alerts] == [60.0, 55.0]
+
+
+def test_already_active_on_the_first_snapshot_does_not_fire():
+    alerts, sink = engine(app.AlertRule("GEX high", "gex_near_total", "above", 50))
+    assert alerts.evaluate("NIFTY", "2026-10-22", {'gex_near_total': 90}) == []
+    assert alerts.evaluate("NIFTY", "2026-10-22", {'gex_near_total': 95}) == []
+    assert sink.alerts == []
+
+
+def test_below_rules_and_state_are_per_symbol_and_expiry():
+    alerts, _ = engine(app.AlertRule("PCR low", "pcr", "below", 0.8))
+    alerts.evaluate("NIFTY", "2026-10-22", {'pcr': 1.0})
+    alerts.evaluate("NIFTY", "2026-10-29", {'pcr': 0.7})
+    assert len(alerts.evaluate("NIFTY", "2026-10-22", {'pcr': 0.7})) == 1
+    assert alerts.evaluate("NIFTY", "2026-10-29", {'pcr': 0.6}) == []
+
+
+def test_rules_limited_to_symbols_ignore_others():
+    alerts, _ = engine(app.AlertRule("BN only", "gex_near_total", "above", 0, symbols=["BANKNIFTY"]))
+    for symbol in ("NIFTY", "BANKNIFTY"):
+        alerts.evaluate(symbol, "2026-10-22", {'gex_near_total': -1})
+    assert alerts.evaluate("NIFTY", "2026-10-22", {'gex_near_total': 1}) == []
+    assert len(alerts.evaluate("BANKNIFTY", "2026-10-22", {'gex_near_total': 1})) == 1
+
+
+def test_new_flip_rule_fires_for_zones_not_seen_on_the_previous_snapshot():
+    alerts, _ = engine(app.AlertRule("New flip", "flip_zones", "new_flip"))
+    zone_a, zone_b = (24950.0, 25000.0, "Positive to Negative"), (25100.0, 25150.0, "Negative to Positive")
+    assert alerts.evaluate("NIFTY", "2026-10-22", {'flip_zones': [zone_a]}) == []
+    assert alerts.evaluate("NIFTY", "2026-10-22", {'flip_zones': [zone_a]}) == []
+    fired = alerts.evaluate("NIFTY", "2026-10-22", {'flip_zones': [zone_a, zone_b]})
+    assert [a['value'] for a in fired] == [25125.0]
+
+
+def test_unknown_condition_is_rejected():
+    with pytest.raises(ValueError, match="bellow"):
+        app.AlertRule("PCR low", "pcr", "bellow", 0.8)
+
+
+def test_failing_sink_is_recorded_and_does_not_starve_the_others():
+    class BrokenSink(app.AlertSink):
+        name = "broken"
+
+        def emit(self, alert):
+            raise OSError("disk full")
+
+    sink = ListSink()
+    alerts = app.AlertEngine([app.AlertRule("GEX high", "gex_near_total", "above", 50)], [BrokenSink(), sink])
+    recorder = app.get_perf_recorder()
+    before = len(recorder.last_errors)
+    alerts.evaluate("NIFTY", "2026-10-22", {'gex_near_total': 10})
+    assert len(alerts.evaluate("NIFTY", "2026-10-22", {'gex_near_total': 60})) == 1
+    assert len(sink.alerts) == 1
+    assert len(recorder.last_errors) == before + 1
+    assert recorder.last_errors[-1][1] == "alerts.broken"
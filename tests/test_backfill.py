@@ -0,0 +1,35 @@
+from datetime import date
+
+import app
+import backfill
+
+
+def test_checkpoint_reloads_finished_chunks_and_skips_torn_lines(tmp_path):
+    checkpoint = backfill.Checkpoint(str(tmp_path), "NIFTY")
+    checkpoint.mark("2026-07-01|2026-07-31|5|10|1", {'symbol': 'NIFTY', 'requests': 40, 'snapshots': 1575})
+    checkpoint.mark("2026-07-31|2026-08-30|5|10|1", {'symbol': 'NIFTY', 'requests': 40, 'snapshots': 1600})
+    with open(checkpoint.path, 'a') as f:
+        f.write('{"key": "2026-08-30|2026')  # killed mid-write
+    resumed = backfill.Checkpoint(str(tmp_path), "NIFTY")
+    assert resumed.done == {"2026-07-01|2026-07-31|5|10|1", "2026-07-31|2026-08-30|5|10|1"}
+    assert backfill.Checkpoint(str(tmp_path), "BANKNIFTY").done == set()
+
+
+def test_run_resumes_from_the_first_unfinished_chunk(tmp_path, monkeypatch):
+    start, end = date(2026, 7, 1), date(2026, 9, 29)
+    chunks = backfill.chunk_ranges(start, end, 30)
+    assert len(chunks) == 3
+    first = f"{chunks[0][0]}|{chunks[0][1]}|5|10|1"
+    backfill.Checkpoint(str(tmp_path / "ckpt"), "NIFTY").mark(first, {'symbol': 'NIFTY'})
+    requested = []
+
+    def chunk_payloads(symbol, chunk_start, chunk_end, interval, strikes, expiry_code):
+        requested.append((chunk_start, chunk_end))
+        return {}
+
+    monkeypatch.setattr(backfill, "chunk_payloads", chunk_payloads)
+    monkeypatch.setattr(app, "open_snapshot_store", lambda: app.SnapshotStore(str(tmp_path / "store")))
+    failed = backfill.run(["NIFTY"], start, end, 5, 10, 1, workers=1, chunk_days=30,
+                          checkpoint_dir=str(tmp_path / "ckpt"), source=object())
+    assert failed == []
+    assert requested == chunks[1:]
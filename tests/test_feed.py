@@ -0,0 +1,62 @@
+import json
+import socket
+import time
+
+import numpy as np
+
+import app
+
+
+def live_chain(strikes: int = 5):
+    K = 25000.0 + 50.0 * (np.arange(strikes) - strikes // 2)
+    raw = {'strikes': K}
+    for side in ('ce', 'pe'):
+        raw[side] = {'oi': np.full(strikes, 1000.0), 'previous_oi': np.full(strikes, 1000.0),
+                     'volume': np.zeros(strikes), 'iv': np.full(strikes, 15.0), 'ltp': np.full(strikes, 100.0)}
+    return app.LiveChain("NIFTY", "2026-10-22", raw, 25000.0)
+
+
+def consumer():
+    feed = app.FeedConsumer("127.0.0.1:1")
+    chain = live_chain()
+    feed.track(chain)
+    return feed, chain
+
+
+def test_malformed_lines_are_counted_and_skipped():
+    feed, chain = consumer()
+    for line in (b'{not json', b'[1, "x"]', b'{"s": "NIFTY", "t": "IDX"}', b'"NIFTY"'):
+        feed.apply_line(line)
+    assert feed.stats['bad_messages'] == 5
+    assert chain.version == 0
+
+
+def test_good_updates_in_a_batch_survive_a_bad_element():
+    feed, chain = consumer()
+    batch = [{'s': 'NIFTY', 't': 'IDX'}, {'s': 'NIFTY', 't': 'IDX', 'ltp': 25100.0},
+             {'s': 'NIFTY', 'e': '2026-10-22', 't': 'CE', 'k': 25000.0, 'oi': 5000.0}]
+    feed.apply_line(json.dumps(batch).encode())
+    assert feed.stats['bad_messages'] == 1
+    assert chain.spot_price == 25100.0
+    assert chain.raw['ce']['oi'][2] == 5000.0
+
+
+def test_read_loop_keeps_the_connection_through_bad_lines():
+    server = socket.create_server(("127.0.0.1", 0))
+    feed, chain = consumer()
+    feed.port = server.getsockname()[1]
+    feed.start()
+    try:
+        conn, _ = server.accept()
+        with conn:
+            good = json.dumps({'s': 'NIFTY', 't': 'IDX', 'ltp': 25200.0}).encode()
+            conn.sendall(b'{bad\n[7]\n' + good + b'\n')
+            deadline = time.monotonic() + 5
+            while chain.spot_price != 25200.0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert chain.spot_price == 25200.0
+            assert feed.stats['bad_messages'] == 2
+            assert feed.connected and feed.stats['connects'] == 1
+    finally:
+        feed.stop()
+        server.close()
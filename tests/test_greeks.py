@@ -0,0 +1,50 @@
+import numpy as np
+
+import app
+
+F, T, R = 25010.0, 6 / 365, 0.07
+K = np.array([24400.0, 24800.0, 25000.0, 25200.0, 25700.0])
+IV = np.array([17.5, 15.0, 14.0, 13.6, 14.8])
+
+
+def greeks(F=F, T=T, iv=IV):
+    return app.chain_greeks(F, K, T, R, iv, iv)
+
+
+def vega(F=F, T=T, iv=IV):
+    # Vega per 1.00 of vol, from the same Black-Scholes on the futures level
+    return app.bs_price_greeks(F, K, T, R, iv / 100, True)['vega'] * 100
+
+
+def central(f, x, h):
+    return (f(x + h) - f(x - h)) / (2 * h)
+
+
+def test_speed_is_the_spot_derivative_of_gamma():
+    for side in ('call', 'put'):
+        expected = central(lambda x: greeks(F=x)[f'{side}_gamma'], F, 0.5)
+        np.testing.assert_allclose(greeks()[f'{side}_speed'], expected, rtol=1e-5)
+
+
+def test_zomma_is_the_vol_derivative_of_gamma():
+    # chain_greeks takes IV in percent; zomma is per 1.00 of vol
+    expected = central(lambda x: greeks(iv=IV + x)['call_gamma'], 0.0, 0.01) * 100
+    np.testing.assert_allclose(greeks()['call_zomma'], expected, rtol=1e-5)
+
+
+def test_color_is_gamma_decay_per_calendar_day():
+    expected = -central(lambda x: greeks(T=x)['call_gamma'], T, 1e-6) / 365
+    np.testing.assert_allclose(greeks()['call_color'], expected, rtol=1e-4)
+    np.testing.assert_allclose(greeks()['put_color'], greeks()['call_color'])
+
+
+def test_vomma_is_the_vol_derivative_of_vega():
+    expected = central(lambda x: vega(iv=IV + x), 0.0, 0.01) * 100
+    np.testing.assert_allclose(greeks()['call_vomma'], expected, rtol=1e-5)
+
+
+def test_higher_order_greeks_are_zero_for_dead_strikes():
+    dead = app.chain_greeks(F, np.array([0.0, 25000.0]), T, R, np.array([14.0, 0.0]), np.array([14.0, 0.0]))
+    for name in ('speed', 'zomma', 'color', 'vomma'):
+        assert not np.any(np.isnan(dead[f'call_{name}']))
+    assert dead['call_color'][0] == 0.0 and dead['call_vomma'][0] == 0.0
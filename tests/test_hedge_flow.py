@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+import app
+
+META = {'symbol': 'NIFTY', 'futures_price': 25010.0, 'days_to_expiry': 3, 'timestamp': '2026-10-19 11:00:00'}
+
+
+def chain():
+    strikes = np.arange(24500.0, 25550.0, 50.0)
+    moneyness = np.abs(np.log(strikes / META['futures_price']))
+    return pd.DataFrame({'Strike': strikes, 'Call_IV': 13 + 30 * moneyness, 'Put_IV': 14 + 35 * moneyness,
+                         'Call_OI': np.linspace(2e5, 8e5, strikes.size), 'Put_OI': np.linspace(9e5, 1e5, strikes.size)})
+
+
+def test_components_add_up_to_the_total_and_the_direct_delta_change():
+    df = chain()
+    flow = app.estimate_hedge_flow(df, META, iv_spot_beta=-0.5)
+    np.testing.assert_allclose(flow['gamma'] + flow['vanna'] + flow['charm'], flow['total'], rtol=1e-12)
+    np.testing.assert_allclose(flow['by_strike'].sum(axis=1), flow['total'], rtol=1e-12)
+    # Total equals one re-pricing straight from the current state to the shocked one
+    s = flow['shocks'][:, None, None]
+    F, K = META['futures_price'], df['Strike'].to_numpy()[None, None, :]
+    sigma = app.iv_to_decimal(np.stack([df['Call_IV'].to_numpy(), df['Put_IV'].to_numpy()]))[None]
+    is_call = np.array([True, False])[None, :, None]
+    T = META['days_to_expiry'] / 365
+    T_after = T - app.session_fraction_left(META['timestamp']) / 365
+    before = app.bs_price_greeks(F, K, T, app.HEDGE_RISK_FREE_RATE, sigma, is_call)['delta']
+    after = app.bs_price_greeks(F * (1 + s), K, T_after, app.HEDGE_RISK_FREE_RATE,
+                                np.maximum(sigma - 0.5 * s, 0.005), is_call)['delta']
+    position = np.stack([df['Call_OI'].to_numpy(), -df['Put_OI'].to_numpy()])[None] * app.symbol_config('NIFTY')['contract_size']
+    direct = -((after - before) * position).sum(axis=(1, 2)) * F * (1 + s[:, 0, 0]) / 1e9
+    np.testing.assert_allclose(flow['total'], direct, rtol=1e-10)
+
+
+def test_vanna_vanishes_without_an_iv_response_and_charm_at_the_close():
+    df = chain()
+    assert np.allclose(app.estimate_hedge_flow(df, META, iv_spot_beta=0.0)['vanna'], 0.0)
+    closed = app.estimate_hedge_flow(df, {**META, 'timestamp': '2026-10-19 15:30:00'})
+    assert np.allclose(closed['charm'], 0.0)
+
+
+def test_long_gamma_dealers_sell_rallies_and_buy_dips():
+    df = chain().assign(Put_OI=0.0)
+    flow = app.estimate_hedge_flow(df, META, iv_spot_beta=0.0)
+    assert (flow['gamma'][flow['shocks'] > 0] < 0).all()
+    assert (flow['gamma'][flow['shocks'] < 0] > 0).all()
@@ -0,0 +1,95 @@
+import threading
+
+import numpy as np
+
+import app
+
+FIELDS = ['gex', 'futures']
+
+
+def brute_zscore(ts, values, now, seconds):
+    inside = values[ts > now - seconds]
+    mean, std = inside.mean(axis=0), inside.std(axis=0)
+    return (values[-1] - mean) / std
+
+
+def test_window_sums_match_a_brute_force_recomputation():
+    rng = np.random.default_rng(7)
+    series = app.RingSeries(FIELDS, capacity=1000, windows={'5m': 300, '15m': 900})
+    ts = 1_760_000_000 + np.cumsum(rng.integers(5, 60, 200)).astype(float)
+    values = np.column_stack([rng.normal(0, 1, 200), 25000 + np.cumsum(rng.normal(0, 5, 200))])
+    for i, (t, row) in enumerate(zip(ts, values)):
+        assert series.append(t, row)
+        if i >= 20:
+            for window, seconds in series.windows.items():
+                np.testing.assert_allclose(series.zscore(window), brute_zscore(ts[:i + 1], values[:i + 1], t, seconds),
+                                           rtol=1e-6)
+
+
+def test_capacity_evicts_the_oldest_samples_from_buffer_and_windows():
+    series = app.RingSeries(FIELDS, capacity=8, windows={'all': 10 ** 9})
+    for i in range(20):
+        series.append(1000.0 + i, [float(i), 100.0 + i * i])
+    assert len(series) == 8
+    frame = series.to_frame()
+    assert frame['gex'].tolist() == [float(i) for i in range(12, 20)]
+    kept = frame[FIELDS].to_numpy()
+    np.testing.assert_allclose(series.zscore('all'), (kept[-1] - kept.mean(axis=0)) / kept.std(axis=0), rtol=1e-9)
+    np.testing.assert_allclose(series.change('all'), kept[-1] - kept[0])
+
+
+def test_out_of_order_and_duplicate_timestamps_are_rejected():
+    series = app.RingSeries(FIELDS, capacity=4)
+    assert series.append(10.0, [1.0, 2.0])
+    assert not series.append(10.0, [5.0, 5.0])
+    assert not series.append(9.0, [5.0, 5.0])
+    assert len(series) == 1 and series.latest().tolist() == [1.0, 2.0]
+
+
+def test_missing_values_are_left_out_of_the_window():
+    series = app.RingSeries(FIELDS, capacity=16, windows={'all': 10 ** 9})
+    for i, gex in enumerate([1.0, np.nan, 3.0, 5.0]):
+        series.append(100.0 + i, [gex, 1.0 + i])
+    kept = np.array([1.0, 3.0, 5.0])
+    assert np.isclose(series.zscore('all')[0], (5.0 - kept.mean()) / kept.std())
+
+
+def test_hydration_does_not_block_other_series():
+    hydrating, release = threading.Event(), threading.Event()
+
+    class SlowHistory(app.ExposureHistory):
+        def _hydrate(self, series, symbol, expiry, day):
+            if symbol == "NIFTY":
+                hydrating.set()
+                release.wait(5)
+            series.append(1.0, np.ones(len(series.fields)))
+
+    history = SlowHistory(store=object())
+    results = {}
+    slow = threading.Thread(target=lambda: results.update(nifty=history.series("NIFTY", "2026-10-22", "2026-10-19")))
+    slow.start()
+    assert hydrating.wait(5)
+    assert len(history.series("BANKNIFTY", "2026-10-28", "2026-10-19")) == 1
+    assert slow.is_alive()
+    release.set()
+    slow.join(5)
+    assert history.series("NIFTY", "2026-10-22", "2026-10-19") is results['nifty']
+
+
+def test_reads_see_a_consistent_buffer_while_appending():
+    series = app.RingSeries(FIELDS, capacity=64, windows={'all': 10 ** 9})
+    done = threading.Event()
+
+    def writer():
+        for i in range(5000):
+            series.append(1_760_000_000.0 + i, [float(i), float(i)])
+        done.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        frame = series.to_frame()
+        assert frame['Time'].is_monotonic_increasing
+        assert (frame['gex'].diff().dropna() == 1.0).all()
+        series.rolling_summary()
+    thread.join()
@@ -0,0 +1,51 @@
+import numpy as np
+
+import app
+import bench_greeks
+
+STRIKES_RANGE = 8
+
+
+def synthetic_chains():
+    chains = []
+    for seed, (symbol, futures_price, strikes) in enumerate([('NIFTY', 25012.0, 41), ('BANKNIFTY', 56030.0, 31),
+                                                             ('FINNIFTY', 26980.0, 25), ('SENSEX', 81890.0, 35)]):
+        interval = app.symbol_config(symbol)['strike_interval']
+        atm = round(futures_price / interval) * interval
+        raw = bench_greeks.synthetic_chain(strikes, atm, interval, seed=seed)
+        meta = {'symbol': symbol, 'expiry': '2026-10-28', 'futures_price': futures_price,
+                'days_to_expiry': 3 + seed, 'timestamp': '2026-10-19 10:00:00'}
+        chains.append((raw, meta))
+    return chains
+
+
+def per_symbol_row(raw, meta):
+    # The single-index page: full frame, sliced to the strikes slider, then the scalar metrics
+    F = meta['futures_price']
+    greeks = app.chain_greeks(F, raw['strikes'], meta['days_to_expiry'] / 365, 0.07, raw['ce']['iv'], raw['pe']['iv'])
+    df = app.build_chain_frame(raw, greeks, F, app.symbol_config(meta['symbol'])['contract_size'])
+    df = app.slice_strikes(df, meta, STRIKES_RANGE)
+    metrics = app.calculate_flow_metrics(df, F)
+    atm = df.loc[(df['Strike'] - F).abs().idxmin()]
+    return {'Net_GEX': metrics['gex_total'], 'Near_GEX': metrics['gex_near_total'],
+            'Net_DEX': metrics['dex_total'],
+            'Flip_Level': app.nearest_flip_level(app.detect_gamma_flip_zones(df), F),
+            'PCR': df['Put_OI'].sum() / df['Call_OI'].sum(), 'ATM_Strike': atm['Strike'],
+            'Straddle': atm['Call_LTP'] + atm['Put_LTP']}
+
+
+def test_batch_overview_matches_the_per_symbol_pipeline():
+    chains = synthetic_chains()
+    overview = app.batch_overview(chains, STRIKES_RANGE)
+    assert list(overview['Symbol']) == [meta['symbol'] for _, meta in chains]
+    for (raw, meta), (_, row) in zip(chains, overview.iterrows()):
+        for column, expected in per_symbol_row(raw, meta).items():
+            np.testing.assert_allclose(row[column], expected, rtol=1e-9, atol=1e-12, err_msg=f"{meta['symbol']} {column}")
+
+
+def test_overview_weights_and_aggregate():
+    overview = app.batch_overview(synthetic_chains(), STRIKES_RANGE)
+    assert np.isclose(overview['Weight'].sum(), 1.0)
+    aggregate = app.overview_aggregate(overview)
+    assert np.isclose(aggregate['net_gex'], overview['Net_GEX'].sum())
+    assert aggregate['regime'] == app.exposure_regime(aggregate['gex_share'])
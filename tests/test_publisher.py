@@ -0,0 +1,64 @@
+import json
+import socket
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import app
+
+
+def sample_snapshot():
+    df = pd.DataFrame({'Strike': [24950.0, 25000.0, 25050.0], 'Net_GEX': [0.12, -0.03, np.nan],
+                       'Call_OI': np.array([1200, 800, 50], dtype=np.int64)})
+    meta = {'symbol': 'NIFTY', 'expiry': '2026-10-22', 'timestamp': '2026-10-19 09:20:00',
+            'futures_price': 25010.5, 'spot_price': 24990.0, 'expiry_list': ['2026-10-22', '2026-10-29']}
+    signals = {'gex_near_total': 1.25, 'pcr': float('nan'), 'flip_count': 1.0,
+               'flip_zones': [(24950.0, 25000.0, 'Positive to Negative')]}
+    return df, meta, signals
+
+
+def test_snapshot_frame_round_trip():
+    df, meta, signals = sample_snapshot()
+    frame = app.encode_snapshot_frame(df, meta, signals)
+    (length,) = app.FRAME_HEADER.unpack(frame[:app.FRAME_HEADER.size])
+    assert length == len(frame) - app.FRAME_HEADER.size
+    got_df, got_meta, got_signals = app.decode_snapshot_frame(frame[app.FRAME_HEADER.size:])
+    pd.testing.assert_frame_equal(got_df, df)
+    assert got_meta == meta
+    assert got_signals['gex_near_total'] == 1.25
+    assert np.isnan(got_signals['pcr'])
+    assert got_signals['flip_zones'] == [[24950.0, 25000.0, 'Positive to Negative']]
+
+
+def test_snapshot_frame_metadata_is_strict_json():
+    df, meta, signals = sample_snapshot()
+    frame = app.encode_snapshot_frame(df, {**meta, 'futures_price': np.float32('nan')}, signals)
+    metadata = pa.ipc.open_stream(frame[app.FRAME_HEADER.size:]).schema.metadata
+
+    def reject(constant):
+        raise ValueError(constant)
+
+    assert json.loads(metadata[b'gex.signals'], parse_constant=reject)['pcr'] is None
+    assert json.loads(metadata[b'gex.meta'], parse_constant=reject)['futures_price'] is None
+
+
+def test_subscribe_request_must_be_an_object_of_string_lists():
+    assert app.parse_subscribe_request(b'{"symbols": ["NIFTY"], "expiries": null}\n') == (["NIFTY"], None)
+    assert app.parse_subscribe_request(b'{}\n') == (None, None)
+    for line in (b'', b'{bad\n', b'[]\n', b'"NIFTY"\n', b'1\n', b'{"symbols": "NIFTY"}\n', b'{"expiries": [[1]]}\n'):
+        assert app.parse_subscribe_request(line) is None
+
+
+def test_publisher_closes_connections_with_malformed_requests():
+    publisher = app.SnapshotPublisher("127.0.0.1:0").start()
+    try:
+        family, address = app.parse_socket_address(publisher.address)
+        for request in (b'[]\n', b'"NIFTY"\n', b'{"symbols": 1}\n'):
+            with socket.create_connection(address, timeout=2) as sock:
+                sock.sendall(request)
+                assert sock.recv(64) == b''
+        assert publisher.stats['connections'] == 0
+        assert publisher.subscriptions == set()
+    finally:
+        publisher.stop()
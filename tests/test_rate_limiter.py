@@ -0,0 +1,56 @@
+import threading
+import time
+
+import app
+
+
+class FakeClock:
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += max(seconds, 0.0)
+
+
+def test_back_to_back_acquires_are_spaced_one_interval_apart(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(app.time, "sleep", clock.sleep)
+    limiter = app.RateLimiter(rate=4)
+    released = []
+    for _ in range(6):
+        limiter.acquire()
+        released.append(clock.now)
+    gaps = [b - a for a, b in zip(released, released[1:])]
+    assert gaps == [0.25] * 5
+    assert limiter.acquired == 6
+
+
+def test_idle_limiter_does_not_delay():
+    limiter = app.RateLimiter(rate=2)
+    assert limiter.acquire() < 0.05
+
+
+def test_threads_sharing_a_limiter_never_exceed_the_rate():
+    rate, per_thread, threads = 50, 5, 4
+    limiter = app.RateLimiter(rate)
+    released, lock = [], threading.Lock()
+
+    def worker():
+        for _ in range(per_thread):
+            limiter.acquire()
+            with lock:
+                released.append(time.monotonic())
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    released.sort()
+    assert limiter.acquired == per_thread * threads
+    # Releases are reserved interval-spaced, so n of them span at least n - 1 intervals
+    assert released[-1] - released[0] >= (len(released) - 1) / rate * 0.95
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+import app
+
+
+def synthetic_raw(seed: int, strikes: int = 41):
+    rng = np.random.default_rng(seed)
+    K = 25000.0 + 50.0 * (np.arange(strikes) - strikes // 2)
+    raw = {'strikes': K}
+    for side in ('ce', 'pe'):
+        oi = rng.integers(1_000, 2_000_000, strikes).astype(np.float64)
+        raw[side] = {'oi': oi, 'previous_oi': oi * rng.uniform(0.9, 1.1, strikes),
+                     'volume': rng.integers(0, 500_000, strikes).astype(np.float64),
+                     'iv': 12 + 40 * np.abs(np.log(K / 25000.0)) + rng.uniform(-0.5, 0.5, strikes),
+                     'ltp': rng.uniform(1, 500, strikes)}
+    return raw
+
+
+def chain_snapshot(seed: int, futures_price: float, minute: int):
+    raw = synthetic_raw(seed)
+    greeks = app.chain_greeks(futures_price, raw['strikes'], 5 / 365, 0.07, raw['ce']['iv'], raw['pe']['iv'])
+    df = app.build_chain_frame(raw, greeks, futures_price, 25)
+    meta = {'symbol': 'NIFTY', 'expiry': '2026-10-22', 'timestamp': f"2026-10-19 09:{minute:02d}:00",
+            'futures_price': futures_price, 'spot_price': futures_price - 20, 'days_to_expiry': 5}
+    return df, meta
+
+
+def test_delta_store_round_trips_like_the_parquet_store(tmp_path):
+    # Keyframes every 3 records, alternating chains so updates carry real differences
+    delta = app.DeltaSnapshotStore(str(tmp_path / "delta"), keyframe_interval=3)
+    parquet = app.SnapshotStore(str(tmp_path / "parquet"))
+    saved = []
+    for i in range(8):
+        df, meta = chain_snapshot(i % 2, 25000.0 + i * 3.5, 20 + i)
+        saved.append((delta.save(df, meta), parquet.save(df, meta), meta))
+    # Read back out of order so records decode from the log, not the writer's cursor
+    for delta_path, parquet_path, meta in reversed(saved):
+        got, got_meta = delta.load(delta_path)
+        want, _ = parquet.load(parquet_path)
+        pd.testing.assert_frame_equal(got, want, check_exact=True)
+        assert got_meta == meta
+
+
+def test_delta_store_lists_and_reopens_snapshots(tmp_path):
+    root = str(tmp_path / "delta")
+    store = app.DeltaSnapshotStore(root, keyframe_interval=2)
+    for i in range(5):
+        store.save(*chain_snapshot(i, 25000.0 + i, 30 + i))
+    reopened = app.DeltaSnapshotStore(root, keyframe_interval=2)
+    paths = [p for _, _, p in reopened.list_snapshots('NIFTY', '2026-10-22')]
+    assert [p.stem for p in paths] == [f"09{30 + i:02d}00" for i in range(5)]
+    df, meta = reopened.latest('NIFTY', '2026-10-22')
+    assert meta['timestamp'] == "2026-10-19 09:34:00"
+    assert np.isclose(meta['futures_price'], 25004.0)
+    assert len(df) == 41
@@ -0,0 +1,54 @@
+import math
+
+import numpy as np
+
+import app
+
+R = app.STRATEGY_RISK_FREE_RATE
+
+
+def scalar_price(S, K, T, sigma, is_call):
+    if T <= 0:
+        return max(S - K, 0.0) if is_call else max(K - S, 0.0)
+    N = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    d1 = (math.log(S / K) + (R + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    call = S * N(d1) - K * math.exp(-R * T) * N(d2)
+    return call if is_call else call - S + K * math.exp(-R * T)
+
+
+def test_evaluate_strategy_matches_scalar_black_scholes_per_leg():
+    legs = [app.StrategyLeg('CE', 25100.0, -2, 120.0), app.StrategyLeg('PE', 24900.0, 1, 95.0),
+            app.StrategyLeg('CE', 25300.0, 1, 40.0)]
+    leg_iv = np.array([0.14, 0.16, 0.13])
+    spots, days, shifts = np.array([24700.0, 25000.0, 25350.0]), np.array([6.0, 2.5, 0.0]), np.array([-0.02, 0.0, 0.03])
+    result = app.evaluate_strategy(legs, spots, days, shifts, leg_iv, multiplier=25)
+    assert result['pnl'].shape == (3, 3, 3)
+    for i, S in enumerate(spots):
+        for j, d in enumerate(days):
+            for k, shift in enumerate(shifts):
+                value = sum(leg.quantity * scalar_price(S, leg.strike, d / 365, iv + shift, leg.option_type == 'CE')
+                            for leg, iv in zip(legs, leg_iv))
+                pnl = value - sum(leg.quantity * leg.entry_price for leg in legs)
+                assert math.isclose(result['value'][i, j, k], value * 25, rel_tol=1e-9, abs_tol=1e-6)
+                assert math.isclose(result['pnl'][i, j, k], pnl * 25, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def test_evaluate_strategy_delta_is_the_price_slope():
+    legs = [app.StrategyLeg('CE', 25000.0, 1), app.StrategyLeg('PE', 25000.0, 1)]
+    h = 0.5
+    result = app.evaluate_strategy(legs, np.array([25040.0 - h, 25040.0, 25040.0 + h]), np.array([4.0]),
+                                   np.array([0.0]), np.array([0.15, 0.15]))
+    slope = (result['value'][2, 0, 0] - result['value'][0, 0, 0]) / (2 * h)
+    assert math.isclose(result['delta'][1, 0, 0], slope, rel_tol=1e-5)
+
+
+def test_horizons_add_dated_curves_between_now_and_expiry():
+    days, labels = app.strategy_horizons(7, 0)
+    assert days.tolist() == [7.0, 3.5, 1.0, 0.0]
+    assert labels == ["Now", "Halfway (3.5d left)", "1d to Expiry", "Expiry"]
+    days, labels = app.strategy_horizons(7, 2)
+    assert days.tolist() == [5.0, 2.5, 1.0, 0.0] and labels[0] == "T+2d"
+    # Curves within half a day of the previous one are dropped
+    assert app.strategy_horizons(1, 0)[0].tolist() == [1.0, 0.0]
+    assert app.strategy_horizons(3, 2.5)[0].tolist() == [0.5, 0.0]
@@ -0,0 +1,48 @@
+import numpy as np
+
+import app
+
+TRUE_PARAMS = np.array([0.002, 0.04, -0.4, 0.01, 0.08])
+
+
+def test_fit_svi_recovers_a_known_smile():
+    k = np.linspace(-0.12, 0.1, 25)
+    w = app.svi_total_variance(TRUE_PARAMS, k)
+    params, rmse, nfev = app.fit_svi(k, w)
+    assert rmse < 1e-6
+    np.testing.assert_allclose(app.svi_total_variance(params, k), w, atol=1e-6)
+    # Warm-starting from the answer converges immediately
+    _, warm_rmse, warm_nfev = app.fit_svi(k, w, params)
+    assert warm_rmse < 1e-6 and warm_nfev <= nfev
+
+
+def surface(spot=25000.0, r=0.07):
+    fits = []
+    for T, scale in ((7 / 365, 1.0), (35 / 365, 1.6)):
+        params = TRUE_PARAMS * np.array([scale, scale, 1, 1, 1])
+        fits.append(app.SVIFit(f"T{T:.3f}", T, spot * np.exp(r * T), params, 0.0, 25, 10, False))
+    return app.VolSurface("NIFTY", spot, fits, risk_free_rate=r), fits
+
+
+def test_surface_reproduces_each_fitted_smile():
+    vol, fits = surface()
+    for fit in fits:
+        K = fit.forward * np.exp(np.linspace(-0.1, 0.1, 9))
+        np.testing.assert_allclose(vol.iv(K, fit.T), fit.iv(K), rtol=1e-10)
+
+
+def test_surface_interpolates_total_variance_linearly_in_time():
+    vol, (near, far) = surface()
+    T = (near.T + far.T) / 2
+    k = np.linspace(-0.08, 0.08, 7)
+    K = vol.forward(T) * np.exp(k)
+    expected = (near.total_variance(k) + far.total_variance(k)) / 2
+    np.testing.assert_allclose(vol.total_variance(K, T), expected, rtol=1e-10)
+
+
+def test_surface_holds_implied_vol_flat_outside_the_fitted_expiries():
+    vol, (near, far) = surface()
+    k = np.array([-0.05, 0.0, 0.05])
+    for fit, T in ((near, near.T / 2), (far, far.T * 2)):
+        np.testing.assert_allclose(vol.iv(vol.forward(T) * np.exp(k), T),
+                                   np.sqrt(fit.total_variance(k) / fit.T), rtol=1e-10)